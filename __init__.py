@@ -7,7 +7,7 @@
 # Copyright (c) 2011, Roger Lew [see LICENSE.txt]
 # This software is funded in part by NIH Grant P20 RR016454.
 
-from base import PyvtTbl, DataFrame
+from base import PyvtTbl, SparsePyvtTbl, DataFrame
 
 from misc import *
 from plotting import *
@@ -8,16 +8,20 @@ import sys
 if sys.version_info[0] == 2:
     _strobj = basestring
     _xrange = xrange
+    from StringIO import StringIO
 elif sys.version_info[0] == 3:
     _strobj = str
     _xrange = range
+    from io import StringIO
 
 import collections
 import csv
 import itertools
 import inspect
 import math
+import os
 import sqlite3
+import tempfile
 import warnings
 
 from pprint import pprint as pp
@@ -41,8 +45,186 @@ import plotting
 # this file is a bit long but they can't be split without
 # running into circular import complications
 
+def _draw_rows(fid, tt, row, nrows, max_rows, sample=1000):
+    """
+    private function to write the rows of a table through a TextTable
+
+       args:
+          fid: file-like object the table is written to
+
+          tt: TextTable with the header, footer and formatting set
+
+          row: function returning the cells of the ith row
+
+          nrows: number of rows in the table
+
+          max_rows: maximum number of rows to write. If the table is
+                    longer the first and last rows are written separated
+                    by a row of ellipses. 0 writes every row.
+
+       kwds:
+          sample: number of leading rows used to determine the column
+                  widths when every row is written
+
+    |   Only the rows being written are formatted and at most
+        max(max_rows, sample) rows are held in memory.
+    """
+    if max_rows and nrows > max_rows:
+        tail = max_rows // 2
+        for i in _xrange(max_rows - tail):
+            tt.add_row(row(i))
+        tt.add_row(['...'] * tt._row_size)
+        for i in _xrange(nrows - tail, nrows):
+            tt.add_row(row(i))
+        tt.write(fid)
+    else:
+        sample = min(nrows, sample)
+        for i in _xrange(sample):
+            tt.add_row(row(i))
+        tt.write(fid, (row(i) for i in _xrange(sample, nrows)))
+
+def _melted_dataframe(val, rnames, cnames, ridx, cidx, values):
+    """
+    private function to build a long format DataFrame from pivoted data
+
+       args:
+          val: label of the pivoted data
+
+          rnames: row labels of the table
+
+          cnames: column labels of the table
+
+          ridx: row index of each value
+
+          cidx: column index of each value
+
+          values: list of values
+
+       returns:
+          a :class:`DataFrame` with a column for each row and column
+          factor and a column holding the values
+    """
+    df = DataFrame()
+    
+    if rnames != [1]:
+        for k, (f, c) in enumerate(rnames[0]):
+            levels = [L[k][1] for L in rnames]
+            df[f] = [levels[i] for i in ridx]
+
+    if cnames != [1]:
+        for k, (f, c) in enumerate(cnames[0]):
+            levels = [L[k][1] for L in cnames]
+            df[f] = [levels[j] for j in cidx]
+
+    df[(val, 'Value')[val == None]] = values
+
+    return df
+
+# Aggregates whose row, column, and grand totals can be derived from
+# aggregates of the individual cells. Maps each aggregate to the partial
+# aggregates pivot queries for every cell.
+_DECOMPOSABLE = {'count' : ['count'],
+                 'sum' : ['count', 'total'],
+                 'total' : ['total'],
+                 'avg' : ['count', 'total'],
+                 'min' : ['min'],
+                 'max' : ['max'],
+                 'datarange' : ['min', 'max'],
+                 'var' : ['count', 'avg', 'var'],
+                 'varp' : ['count', 'avg', 'var'],
+                 'stdev' : ['count', 'avg', 'var'],
+                 'stdevp' : ['count', 'avg', 'var'],
+                 'sem' : ['count', 'avg', 'var'],
+                 'ci' : ['count', 'avg', 'var']}
+
+def _combine_partials(aggregate, P, axis=None):
+    """
+    private function to derive totals from partial aggregates of cells
+
+       args:
+          aggregate: an aggregate in _DECOMPOSABLE
+
+          P: dict mapping the partials of aggregate to 2-d masked arrays
+             (rows x cols) with the empty cells masked
+
+       kwds:
+          axis: None for the grand total, 1 for the row totals, and 0 for
+                the column totals
+
+       returns:
+          a masked scalar (axis=None) or a masked array of totals
+
+    |   The variance based aggregates pool the cell means and variances
+        (Chan et al.) instead of using raw sums of squares to avoid
+        cancellation.
+    """
+    if aggregate == 'count':
+        return P['count'].sum(axis)
+
+    if aggregate == 'total':
+        return P['total'].sum(axis)
+
+    if aggregate in ['sum', 'avg']:
+        n = np.ma.masked_equal(P['count'].sum(axis), 0)
+        total = P['total'].sum(axis)
+        if aggregate == 'sum':
+            return total + 0*n
+        return total / n
+
+    if aggregate == 'min':
+        return P['min'].min(axis)
+
+    if aggregate == 'max':
+        return P['max'].max(axis)
+
+    if aggregate == 'datarange':
+        return P['max'].max(axis) - P['min'].min(axis)
+
+    # pool the cell means and variances
+    n_i, mean_i = P['count'], P['avg']
+    n = np.ma.masked_equal(n_i.sum(axis), 0)
+    mean = (n_i * mean_i).sum(axis) / n
+    
+    if axis != None:
+        mean = np.ma.expand_dims(mean, axis)
+
+    # cells with a single observation have a var of None
+    ss = (P['var'] * (n_i - 1.)).filled(0.).sum(axis) + \
+         (n_i * (mean_i - mean)**2).sum(axis)
+
+    if aggregate == 'varp':
+        return ss / n
+    
+    var = ss / np.ma.masked_less(n - 1., 1.)
+    if aggregate == 'var':
+        return var
+    if aggregate == 'stdev':
+        return np.ma.sqrt(var)
+    if aggregate == 'stdevp':
+        return np.ma.sqrt(ss / n)
+    if aggregate == 'sem':
+        return np.ma.sqrt(var / n)
+    if aggregate == 'ci':
+        return np.ma.sqrt(var / n) * 1.96
+
+def _unmask(x, cast=float):
+    """
+    private function to convert a masked array element to None or cast
+    """
+    if x is np.ma.masked:
+        return None
+    return cast(x)
+
 class DataFrame(OrderedDict):
     """holds the data in a dummy-coded group format"""
+
+    #: maximum number of rows rendered by __str__ and draw. Longer
+    #: tables only show their first and last rows. 0 shows every row.
+    MAXROWS = 1000
+
+    #: number of rows moved at a time between the columns and sqlite3
+    CHUNKSIZE = 10000
+    
     def __init__(self, *args, **kwds):
         """
         initialize a :class:`DataFrame` object.
@@ -83,6 +265,10 @@ class DataFrame(OrderedDict):
         #: dict to map keys to sqlite3 types
         self._sqltypesdict = {}
 
+        #: directory holding the memory-mapped columns
+        #: (None keeps the columns in memory)
+        self.backing = None
+
         super(DataFrame, self).update(*args, **kwds)
 
     def bind_aggregate(self, name, arity, func):
@@ -109,6 +295,177 @@ class DataFrame(OrderedDict):
         self.aggregates.append(name)
         self.aggregates = tuple(self.aggregates)
 
+    def memmap(self, dirname):
+        """
+        moves the columns of the table to memory-mapped files so tables
+        larger than the available memory can be analyzed
+
+           args:
+              dirname: directory to hold the column files, it is created
+                       if it does not exist
+
+           returns:
+              None
+
+        |   Columns assigned after calling memmap and the columns loaded
+            by read_tbl are also memory-mapped. read_tbl reads the file
+            twice, once to determine the column types and once to fill
+            the columns. Masks and columns of 'null' type stay in memory.
+
+        |   The sqlite3 tables built by pivot, select_col, where,
+            descriptives, etc. are stored in temporary files and are
+            filled :attr:`DataFrame.CHUNKSIZE` rows at a time, so only
+            the columns they need are read.
+
+        |   The column files are unlinked once they are mapped. They are
+            removed when the table is deleted.
+        """
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+            
+        self.backing = dirname
+        self._execute('PRAGMA temp_store = FILE')
+
+        for k in self.keys():
+            super(DataFrame, self).__setitem__(k, self._memmap_col(self[k]))
+
+    def _memmap_empty(self, dtype, n):
+        """
+        private method that returns a memory-mapped array of length n
+        in a new file in self.backing
+        """
+        fd, fname = tempfile.mkstemp(suffix='.npy', dir=self.backing)
+        os.close(fd)
+        x = np.lib.format.open_memmap(fname, mode='w+', dtype=dtype, shape=(n,))
+
+        # the mapping keeps the data around on posix systems
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+        
+        return x
+
+    def _memmap_col(self, x):
+        """
+        private method that copies the array x to a memory-mapped array
+
+        |   Returns x if the table is not memory-mapped or x is an
+            object array
+        """
+        if self.backing == None or x.dtype == np.object or \
+           isinstance(np.ma.getdata(x), np.memmap):
+            return x
+
+        mm = self._memmap_empty(x.dtype, len(x))
+        for i in _xrange(0, len(x), self.CHUNKSIZE):
+            mm[i:i+self.CHUNKSIZE] = np.ma.getdata(x[i:i+self.CHUNKSIZE])
+        mm.flush()
+
+        if isinstance(x, np.ma.MaskedArray):
+            return np.ma.array(mm, mask=np.ma.getmaskarray(x))
+        return mm
+
+    def _set_col(self, key, x, sqltype):
+        """
+        private method that assigns the array x to key without
+        converting or copying it
+        """
+        if key in self.keys():
+            del self[key]
+            
+        self._sqltypesdict[key] = sqltype
+        super(DataFrame, self).__setitem__(key, x)
+        self.conditions[key] = self[key]
+
+    def _iter_rows(self, keys):
+        """
+        private generator that yields the rows of the columns in keys
+        as tuples of python objects. Masked values become None.
+
+        |   Only :attr:`DataFrame.CHUNKSIZE` rows are converted at a time
+        """
+        n = self.shape()[1]
+        for i in _xrange(0, n, self.CHUNKSIZE):
+            chunk = []
+            for k in keys:
+                x = self[k][i:i+self.CHUNKSIZE]
+                y = np.ma.getdata(x).astype(np.object)
+                if isinstance(x, np.ma.MaskedArray):
+                    y[np.ma.getmaskarray(x)] = None
+                chunk.append(y)
+
+            for row in zip(*chunk):
+                yield row
+
+    def _fetch_sqlite3_tbl(self, keys):
+        """
+        private method that reads TBL into a new memory-mapped
+        :class:`DataFrame` :attr:`DataFrame.CHUNKSIZE` rows at a time
+
+           args:
+              keys: the keys of the columns in TBL
+
+           returns:
+              a new :class:`DataFrame`
+
+        |   The columns keep the types of the columns in self. NULL
+            values are masked.
+        """
+        new = DataFrame()
+        new.memmap(self.backing)
+
+        for k, x in zip(keys, self._fetch_sqlite3_cols(keys)):
+            new._set_col(k, x, self._get_sqltype(k))
+
+        return new
+
+    def _fetch_sqlite3_cols(self, keys):
+        """
+        private method that reads the columns keys of TBL into arrays
+        :attr:`DataFrame.CHUNKSIZE` rows at a time
+
+           args:
+              keys: the keys of the columns in TBL
+
+           returns:
+              a list of arrays, memory-mapped if the table is
+
+        |   The arrays keep the types of the columns in self. NULL
+            values are masked.
+        """
+        self._execute('select count(*) from TBL')
+        n = list(self.cur)[0][0]
+
+        data, mask = [], []
+        for k in keys:
+            if self.backing == None or self[k].dtype == np.object:
+                data.append(np.empty(n, dtype=self[k].dtype))
+            else:
+                data.append(self._memmap_empty(self[k].dtype, n))
+            mask.append(np.zeros(n, dtype=bool))
+        
+        self._execute('select %s from TBL'%', '.join(_sha1(k) for k in keys))
+        i = 0
+        while 1:
+            rows = self.cur.fetchmany(self.CHUNKSIZE)
+            if len(rows) == 0:
+                break
+
+            for k, x, m, values in zip(keys, data, mask, zip(*rows)):
+                fill_val = self._get_mafillvalue(k)
+                m[i:i+len(rows)] = [v == None for v in values]
+                x[i:i+len(rows)] = [(v, fill_val)[v == None] for v in values]
+            i += len(rows)
+
+        cols = []
+        for x, m in zip(data, mask):
+            if m.any():
+                x = np.ma.array(x, mask=m)
+            cols.append(x)
+
+        return cols
+        
     def _get_sqltype(self, key):
         """
         returns the sqlite3 type associated with the provided key
@@ -193,7 +550,13 @@ class DataFrame(OrderedDict):
               
         |   Checks and renames duplicate column labels as well as checking
         |   for missing cells. readTbl will warn and skip over missing lines.
+
+        |   If the table is memory-mapped (see :meth:`DataFrame.memmap`) the
+            file is streamed into the memory-mapped columns.
         """
+        if self.backing != None:
+            self._read_tbl_memmap(fname, skip, delimiter, labels)
+            return
         
         # open and read dummy coded data results file to data dictionary
         fid = open(fname, 'r')
@@ -265,6 +628,145 @@ class DataFrame(OrderedDict):
             
         del data
 
+    def _read_tbl_memmap(self, fname, skip, delimiter, labels):
+        """
+        private method that streams a plain text file into memory-mapped
+        columns. Called by read_tbl when the table is memory-mapped.
+
+        |   The first pass determines the type, length and width of
+            each column, the second pass fills the columns
+            :attr:`DataFrame.CHUNKSIZE` rows at a time.
+        """
+        def read_rows():
+            fid = open(fname, 'r')
+            for i, row in enumerate(csv.reader(fid, delimiter=delimiter)):
+                if i == skip and labels:
+                    yield i, None
+                elif i >= skip:
+                    yield i, row
+            fid.close()
+
+        # figure out the column labels
+        fid = open(fname, 'r')
+        for i, row in enumerate(csv.reader(fid, delimiter=delimiter)):
+            if i == skip:
+                break
+        fid.close()
+
+        if labels:
+            colnames = []
+            colnameCounter = Counter()
+            for colname in row:
+                colname = colname.strip()
+                colnameCounter[colname] += 1
+                if colnameCounter[colname] > 1:
+                    warnings.warn("Duplicate label '%s' found"
+                                  %colname,
+                                  RuntimeWarning)
+                    colname += '_%i'%colnameCounter[colname]
+                colnames.append(colname)
+        else:
+            colnames = ['COL_%s'%(k+1) for k in range(len(row))]
+
+        #  1. First pass, determine the types and widths
+        ##############################################################
+        m = len(colnames)
+        n = 0
+        isint, isfloat = [True]*m, [True]*m
+        nvalid, width = [0]*m, [1]*m
+        for i, row in read_rows():
+            if row == None:
+                continue
+            
+            if len(row) != m:
+                warnings.warn('Skipping line %i of file. '
+                              'Expected %i cells found %i'\
+                              %(i+1, m, len(row)),
+                              RuntimeWarning)
+                continue
+
+            n += 1
+            for j, v in enumerate(row):
+                if v == '':
+                    continue
+                
+                nvalid[j] += 1
+                if _isfloat(v):
+                    v = float(v)
+                    isint[j] = isint[j] and _isint(v)
+                else:
+                    isint[j] = isfloat[j] = False
+                width[j] = max(width[j], len(str(v)))
+
+        types = []
+        for j in _xrange(m):
+            if nvalid[j] == 0:
+                types.append('null')
+            elif isint[j]:
+                types.append('integer')
+            elif isfloat[j]:
+                types.append('real')
+            else:
+                types.append('text')
+
+        #  2. Allocate the columns
+        ##############################################################
+        self.clear()
+
+        data, mask, fill_vals = [], [], []
+        for colname, sqltype, w, nv in zip(colnames, types, width, nvalid):
+            self._sqltypesdict[colname] = sqltype
+            fill_vals.append(self._get_mafillvalue(colname))
+            
+            if sqltype == 'null':
+                data.append(np.empty(n, dtype=np.object))
+            elif sqltype == 'text':
+                if nv < n:
+                    w = max(w, len(fill_vals[-1]))
+                data.append(self._memmap_empty('S%i'%w, n))
+            else:
+                data.append(self._memmap_empty(self._get_nptype(colname), n))
+            mask.append(np.zeros(n, dtype=bool))
+
+        #  3. Second pass, fill the columns
+        ##############################################################
+        def fill(i, chunk):
+            for j, values in enumerate(zip(*chunk)):
+                mask[j][i:i+len(chunk)] = [v == '' for v in values]
+
+                col = []
+                for v in values:
+                    if v == '':
+                        col.append(fill_vals[j])
+                    elif types[j] == 'text':
+                        if _isfloat(v):
+                            v = str(float(v))
+                        col.append(v)
+                    else:
+                        col.append(float(v))
+                data[j][i:i+len(chunk)] = col
+            
+        i, chunk = 0, []
+        for k, row in read_rows():
+            if row == None or len(row) != m:
+                continue
+            
+            chunk.append(row)
+            if len(chunk) == self.CHUNKSIZE:
+                fill(i, chunk)
+                i, chunk = i + len(chunk), []
+                
+        if len(chunk) > 0:
+            fill(i, chunk)
+
+        for colname, sqltype, x, msk in zip(colnames, types, data, mask):
+            if isinstance(x, np.memmap):
+                x.flush()
+                
+            if msk.any():
+                x = np.ma.array(x, mask=msk)
+            self._set_col(colname, x, sqltype)
+
     def __setitem__(self, key, item, mask=None):
         """
         assign a column in the table
@@ -332,8 +834,8 @@ class DataFrame(OrderedDict):
                 
                 # call super.__setitem__
                 super(DataFrame, self).\
-                    __setitem__(key, \
-                        np.ma.array(x, mask=mask, dtype=self._get_nptype(key)))
+                    __setitem__(key, self._memmap_col(
+                        np.ma.array(x, mask=mask, dtype=self._get_nptype(key))))
 
                 # set or update self.conditions DictSet
                 self.conditions[key] = self[key]
@@ -344,7 +846,8 @@ class DataFrame(OrderedDict):
         # no mask provided or mask is all true
         self._sqltypesdict[key] = self._determine_sqlite3_type(item)
         super(DataFrame, self).\
-            __setitem__(key, np.array(item, dtype=self._get_nptype(key)))
+            __setitem__(key, self._memmap_col(
+                np.array(item, dtype=self._get_nptype(key))))
             
         self.conditions[key] = self[key]
 
@@ -388,6 +891,17 @@ class DataFrame(OrderedDict):
         del self._sqltypesdict[key]
         del self.conditions[key]
         super(DataFrame, self).__delitem__(key)
+
+    def __reduce__(self):
+        """
+        pickles the columns and their types. The sqlite3 connection
+        can not be pickled and is rebuilt on unpickling. Memory-mapped
+        columns are unpickled into memory.
+        """
+        state = {'_sqltypesdict' : self._sqltypesdict,
+                 'PRINTQUERIES' : self.PRINTQUERIES,
+                 'TESTMODE' : self.TESTMODE}
+        return (self.__class__, (list(self.items()),), state)
         
     def __str__(self):
         """
@@ -400,9 +914,45 @@ class DataFrame(OrderedDict):
               string with easy to read representation of table
 
         |   df.__str__() <==> str(df)
+
+        |   Tables longer than :attr:`DataFrame.MAXROWS` only show their
+            first and last rows.
         """
         if self == {}:
             return '(table is empty)'
+
+        fid = StringIO()
+        self.draw(fid)
+
+        # output the table
+        return fid.getvalue()[:-1]
+
+    def draw(self, fid=None, max_rows=None):
+        """
+        writes a human friendly representation of the table to fid
+
+           kwds:
+              fid: file-like object to write to (default = sys.stdout)
+
+              max_rows: maximum number of rows to write. If the table is
+                        longer the first and last rows are written. 0
+                        writes every row. (default = DataFrame.MAXROWS)
+
+           returns:
+              None
+
+        |   The table is written line by line, only the rows being
+            written are formatted.
+        """
+        if fid == None:
+            fid = sys.stdout
+            
+        if max_rows == None:
+            max_rows = self.MAXROWS
+            
+        if self == {}:
+            fid.write('(table is empty)\n')
+            return
         
         tt = TextTable(max_width=100000000)
         dtypes = [t[0] for t in self.types()]
@@ -413,12 +963,11 @@ class DataFrame(OrderedDict):
         tt.set_cols_align(aligns)
         
         tt.header(self.keys())
-        if self.shape()[1] > 0:
-            tt.add_rows(zip(*list(self.values())), header=False)
         tt.set_deco(TextTable.HEADER)
 
-        # output the table
-        return tt.draw()
+        cols = list(self.values())
+        _draw_rows(fid, tt, lambda i: [c[i] for c in cols],
+                   self.shape()[1], max_rows)
 
     def row_iter(self):
         """
@@ -551,8 +1100,12 @@ class DataFrame(OrderedDict):
             as fast for building tables as the execute method.
         """
         if self.PRINTQUERIES:
+            tlist = iter(tlist)
+            first = next(tlist)
+            tlist = itertools.chain([first], tlist)
+            
             print(query)
-            print('  ', tlist[0])
+            print('  ', first)
             print('   ...\n')
 
         self.cur.executemany(query, tlist)
@@ -600,7 +1153,7 @@ class DataFrame(OrderedDict):
         # build insert query
         query = 'insert into GTBL values ('
         query += ','.join('?' for n in nsubset2) + ')'
-        self._executemany(query, zip(*[self[n] for n in nsubset2]))
+        self._executemany(query, self._iter_rows(nsubset2))
         self.conn.commit()
 
         super(DataFrame, self).__delitem__(('INDICES','integer'))
@@ -630,7 +1183,8 @@ class DataFrame(OrderedDict):
 
         |   where can also be a list of strings. or a single string.
 
-        |   sqlite3 table is built in memory and has the id TBL
+        |   sqlite3 table has the id TBL. It is built in memory unless
+            the table is memory-mapped.
         """
         if where == None:
             where = []
@@ -677,8 +1231,8 @@ class DataFrame(OrderedDict):
         query += ','.join('?' for n in nsubset2) + ')'
 
         # because sqlite3 does not understand numpy datatypes we need to recast them
-        # using astype to numpy.object
-        self._executemany(query, zip(*[self[n].astype(np.object) for n in nsubset2]))
+        # using astype to numpy.object. The rows are inserted in chunks.
+        self._executemany(query, self._iter_rows(nsubset2))
         self.conn.commit()
 
         #  4. If where == None then we are done. Otherwise we need
@@ -789,9 +1343,15 @@ class DataFrame(OrderedDict):
 
                  'full': return full factorial combinations of the
                          conditions specified by rows and cols
+
+                 'sparse': only stores the cells with valid entries.
+                         Intended for high cardinality rows and cols
+                         where most of the cells are empty.
                          
            returns:
               :class:`PyvtTbl` object
+
+              :class:`SparsePyvtTbl` object if method is 'sparse'
         """
         
         if rows == None:
@@ -864,6 +1424,10 @@ class DataFrame(OrderedDict):
 
         if aggregate not in self.aggregates:
             raise ValueError("supplied aggregate '%s' is not valid"%aggregate)
+
+        # check method
+        if method not in ['valid', 'full', 'sparse']:
+            raise ValueError("supplied method '%s' is not valid"%method)
         
         # check to make sure where is properly formatted
         # todo
@@ -877,10 +1441,17 @@ class DataFrame(OrderedDict):
         #  3. Build rnames and cnames lists
         ##############################################################
         
-        # Refresh conditions list so we can build row and col list
-        self._execute('select %s from TBL'
-                      %', '.join(_sha1(n) for n in [val] + rows + cols))
-        Zconditions = DictSet(zip([val]+rows+cols, zip(*list(self.cur))))
+        # The levels of the factors and the combinations with valid
+        # entries are queried from TBL so the memory used only grows
+        # with the number of levels (not with the number of rows)
+        Zconditions = DictSet()
+        for n in rows + cols:
+            self._execute('select distinct %s from TBL'%_sha1(n))
+            Zconditions[n] = [tup[0] for tup in self.cur]
+
+        # sparse tables are built from the valid cells alone
+        if method == 'sparse':
+            return self._pivot_sparse(val, rows, cols, aggregate, Zconditions)
 
         # rnames_mask and cnanes_mask specify which unique combinations of
         # factor conditions have valid entries in the table.
@@ -895,7 +1466,7 @@ class DataFrame(OrderedDict):
             rnames = []
             rnames_mask = []
 
-            conditions_set = set(zip(*[self[n] for n in rows]))
+            conditions_set = self._valid_combinations(rows)
             for vals in Zconditions.unique_combinations(rows):
                 rnames_mask.append(tuple(vals) in conditions_set)                    
                 rnames.append(zip(rows,vals))
@@ -908,7 +1479,7 @@ class DataFrame(OrderedDict):
             cnames = []
             cnames_mask = []
 
-            conditions_set = set(zip(*[self[n] for n in cols]))
+            conditions_set = self._valid_combinations(cols)
             for vals in Zconditions.unique_combinations(cols):
                 cnames_mask.append(tuple(vals) in conditions_set)
                 cnames.append(zip(cols,vals))
@@ -927,6 +1498,19 @@ class DataFrame(OrderedDict):
             agg = 'group_concat'
         else:
             agg = aggregate
+
+        val_type = self._get_sqltype(val)
+
+        # The totals of decomposable aggregates are derived from partial
+        # aggregates of the cells that are queried along with the cells.
+        # Other aggregates need to rescan TBL to find the totals.
+        if aggregate in ['tolist', 'group_concat', 'arbitrary']:
+            partials = []
+        elif aggregate in _DECOMPOSABLE and \
+             (aggregate == 'count' or val_type in ['real', 'integer']):
+            partials = _DECOMPOSABLE[aggregate]
+        else:
+            partials = None
             
         query = ['select ']            
         if rnames == [1] and cnames == [1]:
@@ -938,17 +1522,19 @@ class DataFrame(OrderedDict):
                 query.append(', '.join(_sha1(r) for r in rows))
 
             if cnames == [1]:
-                query.append('\n  , %s( %s )'%(agg, _sha1(val)))
+                cells = [_sha1(val)]
             else:
+                cells = []
                 for cs in cnames:
-                    query.append('\n  , %s( case when '%agg)
                     if all(map(_isfloat, zip(*cols)[1])):
-                        query.append(
-                        ' and '.join(('%s=%s'%(_sha1(k), v) for k, v in cs)))
+                        cond = ' and '.join(('%s=%s'%(_sha1(k), v) for k, v in cs))
                     else:
-                        query.append(
-                        ' and '.join(('%s="%s"'%(_sha1(k) ,v) for k, v in cs)))
-                    query.append(' then %s end )'%_sha1(val))
+                        cond = ' and '.join(('%s="%s"'%(_sha1(k) ,v) for k, v in cs))
+                    cells.append('case when %s then %s end'%(cond, _sha1(val)))
+
+            for a in [agg] + (partials or []):
+                for cell in cells:
+                    query.append('\n  , %s( %s )'%(a, cell))
 
             if rnames == [1]:
                 query.append('\nfrom TBL')
@@ -964,11 +1550,21 @@ class DataFrame(OrderedDict):
         ##############################################################
         self._execute(''.join(query))
 
+        # split the partial aggregates from the cells as the rows of
+        # the table are read from the cursor
+        npartials = len(partials or []) * len(cnames)
+        if rnames == [1] and cnames == [1]:
+            npartials = 0
+
+        results, partial_results = [], []
+        for row in self.cur:
+            results.append(row[:len(row)-npartials])
+            partial_results.append(row[len(row)-npartials:])
+
         #  6. Read data from cursor into a list of lists
         ##############################################################
 
         data, mask = [],[]
-        val_type = self._get_sqltype(val)
         fill_val = self._get_mafillvalue(val)
 
         # keep the columns with the row labels
@@ -979,7 +1575,7 @@ class DataFrame(OrderedDict):
         if aggregate == 'tolist':
             if method=='full':
                 i=0
-                for row in self.cur:
+                for row in results:
                     while not rnames_mask[i]:
                         data.append([[fill_val] for j in _xrange(len(cnames))])
                         mask.append([[True] for j in _xrange(len(cnames))])
@@ -1002,7 +1598,7 @@ class DataFrame(OrderedDict):
                                 mask[-1].append([False for j in _xrange(len(split))])
                     i+=1
             else:
-                for row in self.cur:
+                for row in results:
                     data.append([])
                     mask.append([])
                     for cell, _mask in zip(list(row)[-len(cnames):], cnames_mask):
@@ -1032,7 +1628,7 @@ class DataFrame(OrderedDict):
         else:
             if method=='full':
                 i=0
-                for row in self.cur:
+                for row in results:
                     while not rnames_mask[i]:
                         data.append([fill_val for j in _xrange(len(cnames))])
                         mask.append([True for j in _xrange(len(cnames))])
@@ -1043,7 +1639,7 @@ class DataFrame(OrderedDict):
                     mask.append([not m for v,m in zip(row_data, cnames_mask)])
                     i+=1
             else:
-                for row in self.cur:
+                for row in results:
                     row_data = list(row)[-len(cnames):]
                     data.append([v for v,m in zip(row_data, cnames_mask) if m])
                     mask.append([False for m in cnames_mask if m])
@@ -1053,7 +1649,59 @@ class DataFrame(OrderedDict):
         row_tots, col_tots, grand_tot = [], [], np.nan
         row_mask, col_mask = [], []
         
-        if aggregate not in ['tolist', 'group_concat', 'arbitrary']:
+        if partials == []:
+            pass
+        
+        elif rnames == [1] and cnames == [1]:
+            # the only cell is the grand total
+            grand_tot = results[0][-1]
+            
+        elif partials != None:
+            # rows x cols arrays of each partial with empty cells masked
+            P = {}
+            nc = len(cnames)
+            for k, name in enumerate(partials):
+                P[name] = np.ma.masked_invalid(
+                    np.array([row[k*nc:(k+1)*nc] for row in partial_results],
+                             dtype=float).reshape(-1, nc))
+
+            cast = (float, int)[aggregate == 'count' or
+                                (val_type == 'integer' and
+                                 aggregate in ['sum', 'min', 'max'])]
+
+            grand_tot = _unmask(_combine_partials(aggregate, P), cast)
+
+            if cnames != [1] and rnames != [1]:
+                row_vals = _combine_partials(aggregate, P, axis=1)
+                row_vals = [_unmask(v, cast) for v in row_vals]
+                
+                if method=='full':
+                    i=0
+                    for v in row_vals:
+                        while not rnames_mask[i]:
+                            row_tots.append(fill_val)
+                            row_mask.append(True)
+                            i+=1
+                            
+                        row_tots.append(v)
+                        row_mask.append(False)
+                        i+=1
+                else:
+                    row_tots = row_vals
+                    row_mask = [False for z in row_tots]
+
+                # col_vals has an entry for every column, including the
+                # columns masked by cnames_mask
+                col_vals = _combine_partials(aggregate, P, axis=0)
+                col_vals = [_unmask(v, cast) for v in col_vals]
+
+                for v, m in zip(col_vals, cnames_mask):
+                    if method=='full' or m:
+                        invalid = not m or v == None
+                        col_tots.append((v, fill_val)[invalid])
+                        col_mask.append(invalid)
+                    
+        else:
             query = 'select %s( %s ) from TBL'%(agg, _sha1(val))
             self._execute(query)
             grand_tot = list(self.cur)[0][0]
@@ -1132,6 +1780,202 @@ class DataFrame(OrderedDict):
                        row_tots=row_tots, col_tots=col_tots, grand_tot=grand_tot,
                        attach_rlabels=attach_rlabels)
             
+    def _valid_combinations(self, factors):
+        """
+        private method that returns the set of the combinations of
+        the levels of factors that have entries in TBL
+
+        |   The combinations are found by grouping TBL by the factors
+            so only one tuple per combination is read from sqlite3
+        """
+        keys = ', '.join(_sha1(n) for n in factors)
+        self._execute('select %s from TBL group by %s'%(keys, keys))
+        return set(self.cur)
+            
+    def _pivot_sparse(self, val, rows, cols, aggregate, conditions):
+        """
+        private method to build the :class:`SparsePyvtTbl` returned by
+        pivot when method is 'sparse'. Expects TBL to already be built.
+
+        |   A single query grouped by the row and column factors finds the
+            valid cells. The full cartesian product of the conditions is
+            never built.
+        """
+        if aggregate == 'tolist':
+            agg = 'group_concat'
+        else:
+            agg = aggregate
+
+        val_type = self._get_sqltype(val)
+        fill_val = self._get_mafillvalue(val)
+
+        # find the unique combinations of conditions with valid entries
+        def combinations(factors):
+            if factors == []:
+                return [()]
+            self._execute('select distinct %s from TBL'
+                          %', '.join(_sha1(n) for n in factors))
+            return sorted(self.cur)
+
+        rlabels = combinations(rows)
+        clabels = combinations(cols)
+        rdict = dict((L, i) for i, L in enumerate(rlabels))
+        cdict = dict((L, j) for j, L in enumerate(clabels))
+
+        if rows == []:
+            rnames = [1]
+        else:
+            rnames = [zip(rows, L) for L in rlabels]
+            
+        if cols == []:
+            cnames = [1]
+        else:
+            cnames = [zip(cols, L) for L in clabels]
+
+        # query the valid cells
+        keys = ', '.join(_sha1(n) for n in rows + cols)
+        if keys == '':
+            query = 'select %s( %s ) from TBL'%(agg, _sha1(val))
+        else:
+            query = 'select %s, %s( %s ) from TBL group by %s'\
+                    %(keys, agg, _sha1(val), keys)
+        self._execute(query)
+
+        nr = len(rows)
+        rindex, cindex, data, mask = [], [], [], []
+        for tup in self.cur:
+            rindex.append(rdict[tup[:nr]])
+            cindex.append(cdict[tup[nr:-1]])
+            cell = tup[-1]
+
+            if aggregate == 'tolist':
+                split = cell.split(',')
+                if val_type == 'real' or val_type == 'integer':
+                    split = map(float, split)
+                data.append(split)
+                mask.append(False)
+            elif cell == None:
+                data.append(fill_val)
+                mask.append(True)
+            else:
+                data.append(cell)
+                mask.append(False)
+
+        if aggregate == 'tolist':
+            # cells hold lists of varying lengths
+            cells = np.empty(len(data), dtype=object)
+            cells[:] = data
+            data = np.ma.array(cells, mask=mask)
+        else:
+            data = np.ma.array(data, mask=mask)
+
+        # get totals
+        row_tots, col_tots, grand_tot = [], [], np.nan
+        
+        if aggregate not in ['tolist', 'group_concat', 'arbitrary']:
+            self._execute('select %s( %s ) from TBL'%(agg, _sha1(val)))
+            grand_tot = list(self.cur)[0][0]
+
+            if rows != [] and cols != []:
+                tots = []
+                for factors, index in [(rows, rdict), (cols, cdict)]:
+                    keys = ', '.join(_sha1(n) for n in factors)
+                    self._execute('select %s, %s( %s ) from TBL group by %s'
+                                  %(keys, agg, _sha1(val), keys))
+
+                    t = [fill_val for i in _xrange(len(index))]
+                    m = [True for i in _xrange(len(index))]
+                    for tup in self.cur:
+                        if tup[-1] != None:
+                            t[index[tup[:-1]]] = tup[-1]
+                            m[index[tup[:-1]]] = False
+                    tots.append(np.ma.array(t, mask=m))
+                row_tots, col_tots = tots
+                
+        self.conn.commit()
+        
+        return SparsePyvtTbl(data, rindex, cindex, val, conditions,
+                             rnames, cnames, aggregate,
+                             row_tots=row_tots, col_tots=col_tots,
+                             grand_tot=grand_tot)
+            
+    def _pivot_many(self, vals, rows, cols, aggregate='avg', counts=False):
+        """
+        private method that pivots several columns over the same rows
+        and cols with a single sqlite3 table and query
+
+           args:
+              vals: list of column labels to pivot
+
+              rows: list of row factors
+
+              cols: list of column factors
+
+           kwds:
+              aggregate: aggregate applied to the cells (default = 'avg')
+
+              counts: if True the numbers of observations in the cells
+                      are also returned
+
+           returns:
+              a list of :class:`PyvtTbl` objects (without totals), one
+              for each item in vals. If counts is True also a list of
+              arrays with the number of observations in each of their
+              cells
+
+        |   Like pivot with method='valid', columns without any data are
+            dropped. Empty cells are nan.
+        """
+        rows, cols = list(rows), list(cols)
+        factors = rows + cols
+        self._build_sqlite3_tbl(factors + list(vals))
+
+        # labels and indices of rows and columns
+        rlevels = [sorted(self.conditions[f]) for f in rows]
+        clevels = [sorted(self.conditions[f]) for f in cols]
+        rkeys = list(itertools.product(*rlevels))
+        ckeys = list(itertools.product(*clevels))
+        ridx = dict((k, i) for i, k in enumerate(rkeys))
+        cidx = dict((k, j) for j, k in enumerate(ckeys))
+
+        query = ['select ']
+        query.append(', '.join(_sha1(f) for f in factors))
+        for v in vals:
+            query.append('\n  , %s( %s )'%(aggregate, _sha1(v)))
+        if counts:
+            for v in vals:
+                query.append('\n  , count( %s )'%_sha1(v))
+        query.append('\nfrom TBL group by ')
+        query.append(', '.join(_sha1(f) for f in factors))
+        self._execute(''.join(query))
+
+        data = np.empty((len(vals), len(rkeys), len(ckeys)))
+        data.fill(np.nan)
+        n = np.zeros(data.shape)
+        nr, nf, nv = len(rows), len(factors), len(vals)
+        for row in self.cur:
+            i = ridx[tuple(row[:nr])]
+            j = cidx[tuple(row[nr:nf])]
+            data[:, i, j] = [(v, np.nan)[v == None] for v in row[nf:nf+nv]]
+            if counts:
+                n[:, i, j] = row[nf+nv:]
+
+        conditions = DictSet([(f, self.conditions[f]) for f in factors])
+        rnames = [zip(rows, k) for k in rkeys]
+        cnames = [zip(cols, k) for k in ckeys]
+
+        pts, ns = [], []
+        for val, x, c in zip(vals, data, n):
+            keep = [j for j in _xrange(len(ckeys))
+                    if not np.all(np.isnan(x[:, j]))]
+            pts.append(PyvtTbl(x[:, keep], val, conditions,
+                               rnames, [cnames[j] for j in keep], aggregate))
+            ns.append(c[:, keep])
+
+        if counts:
+            return pts, ns
+        return pts
+            
     def select_col(self, key, where=None):
         """
         determines rows in table that satisfy the conditions given by where and returns
@@ -1145,6 +1989,11 @@ class DataFrame(OrderedDict):
 
            returns:
                a list
+
+        |   If the table is memory-mapped (see :meth:`DataFrame.memmap`)
+            an array is returned instead. Without where it is a view of
+            the memory-mapped column. Otherwise it is a new memory-mapped
+            array filled :attr:`DataFrame.CHUNKSIZE` rows at a time.
                
            example:
               >>> ...
@@ -1181,19 +2030,70 @@ class DataFrame(OrderedDict):
 ##            warnings.warn("where is not a subset of table conditions",
 ##                          RuntimeWarning)
             
-        if where == []: 
+        if where == []:
+            if self.backing != None:
+                return self[key][:]
             return copy(self[key])             
         else:
             self._build_sqlite3_tbl([key], where)
+            if self.backing != None:
+                return self._fetch_sqlite3_cols([key])[0]
             self._execute('select * from TBL')
             return [r[0] for r in self.cur]
 
-    def sort(self, order=None):
+    def _select_cols(self, keys, where=None, floats=None):
         """
-        sort the table in-place
+        private method that returns a dict mapping the keys to arrays
+        of their values in the rows that satisfy where. The table is
+        only queried once.
+
+           args:
+              keys: column labels of data to return
 
            kwds:
-              order: is a list of factors to sort by
+              where: constraints to apply to table before returning data
+
+              floats: column labels of numerical data to return as
+                      float arrays with missing values as nan
+
+           returns:
+              a dict
+
+        |   The other columns keep their types and are masked arrays
+            if they have missing values.
+        """
+        if where == None:
+            where = []
+
+        if floats == None:
+            floats = []
+
+        for k in keys:
+            if k not in self.keys():
+                raise KeyError(k)
+
+        # a column can only be selected once
+        keys = [k for i, k in enumerate(keys) if k not in keys[:i]]
+
+        if where == []:
+            cols = [self[k] for k in keys]
+        else:
+            self._build_sqlite3_tbl(keys, where)
+            cols = self._fetch_sqlite3_cols(keys)
+
+        data = {}
+        for k, x in zip(keys, cols):
+            if k in floats and self._get_sqltype(k) in ['integer', 'real']:
+                x = np.ma.filled(np.ma.asarray(x).astype(np.float64), np.nan)
+            data[k] = x
+        return data
+        
+    def sort(self, order=None):
+        """
+        sort the table in-place
+
+           kwds:
+              order: is a list of factors to sort by
               to reverse order append " desc" to the factor
 
            returns:
@@ -1302,9 +2202,12 @@ class DataFrame(OrderedDict):
               Megan   Whittington    26   female 
               >>> 
         """
-        new = DataFrame()
-        
         self._build_sqlite3_tbl(self.keys(), where)
+        
+        if self.backing != None:
+            return self._fetch_sqlite3_tbl(self.keys())
+        
+        new = DataFrame()
         self._execute('select * from TBL')
         for n, values in zip(self.keys(), zip(*list(self.cur))):
             new[n] = list(values)        
@@ -1321,6 +2224,12 @@ class DataFrame(OrderedDict):
            returns:
               None
         """
+        if self.backing != None:
+            new = self.where(where)
+            for n in new.keys():
+                self._set_col(n, new[n], new._get_sqltype(n))
+            return
+        
         self._build_sqlite3_tbl(self.keys(), where)
         self._execute('select * from TBL')
         for n, values in zip(self.keys(), zip(*list(self.cur))):
@@ -1605,7 +2514,7 @@ class DataFrame(OrderedDict):
                 self._execute('select * from TBL')
                 wtr.writerows(list(self.cur))
 
-    def descriptives(self, key, where=None):
+    def descriptives(self, key, where=None, by=None):
         """
         Conducts a descriptive statistical analysis of the data in self[key].
 
@@ -1615,8 +2524,13 @@ class DataFrame(OrderedDict):
            kwds:
               where: criterion to apply to table before running analysis
 
+              by: list of column labels of factors. If specified the
+                  analysis is conducted for each combination of their
+                  levels
+
            returns:
               a :mod:`pyvttbl.stats`. :class:`Descriptives` object
+              (:class:`GroupedDescriptives` object if by is specified)
         """
 
         if where == None:
@@ -1631,6 +2545,15 @@ class DataFrame(OrderedDict):
 
         if key not in self.keys():
             raise KeyError(key)
+
+        if by != None:
+            if isinstance(by, _strobj):
+                by = [by]
+                
+            data = self._select_cols([key] + list(by), where, [key])
+            d = stats.GroupedDescriptives()
+            d.run(data[key], [data[f] for f in by], key, by)
+            return d
         
         V = self.select_col(key, where=where)
         d = stats.Descriptives()
@@ -1674,7 +2597,8 @@ class DataFrame(OrderedDict):
 
     marginals.__doc__ = stats.Marginals.__doc__
     
-    def anova1way(self, val, factor, posthoc='tukey', where=None):
+    def anova1way(self, val, factor, posthoc='tukey', where=None,
+                  permutations=0, n_jobs=1, seed=None):
         """
         Conducts a one-way analysis of variance
         on val over the conditions in factor. The conditions do not necessarily
@@ -1694,6 +2618,16 @@ class DataFrame(OrderedDict):
             where:
                conditions to apply before running analysis
 
+            permutations:
+               number of random permutations used to calculate a
+               non-parametric p-value ('p_perm')
+
+            n_jobs:
+               number of processes running the permutations
+
+            seed:
+               seed of the permutations
+
            return:
               an :class:`pyvttbl.stats.Anova1way` object 
         """
@@ -1719,11 +2653,13 @@ class DataFrame(OrderedDict):
         conditions_list = [tup[1] for [tup] in pt.rnames]
 
         a = stats.Anova1way()
-        a.run(list_of_lists, val, factor, conditions_list, posthoc=posthoc)
+        a.run(list_of_lists, val, factor, conditions_list, posthoc=posthoc,
+              permutations=permutations, n_jobs=n_jobs, seed=seed)
         return a
     
     def chisquare1way(self, observed, expected_dict=None,
-                      alpha=0.05, where=None):
+                      alpha=0.05, where=None,
+                      simulate=0, n_jobs=1, seed=None):
         """
         conducts a one-way chi-square goodness-of-fit test on the data in observed
 
@@ -1743,6 +2679,16 @@ class DataFrame(OrderedDict):
                where:
                   conditions to apply before running analysis
 
+               simulate:
+                  number of random samples used to calculate a Monte
+                  Carlo p-value ('p_sim')
+
+               n_jobs:
+                  number of processes running the simulations
+
+               seed:
+                  seed of the simulations
+
            return:
               an :class:`pyvttbl.stats.ChiSquare1way` object 
         """
@@ -1779,11 +2725,13 @@ class DataFrame(OrderedDict):
         # run analysis
         x = stats.ChiSquare1way()
         x.run(observed_list, expected_list, conditions_list=conditions_list,
-              measure=observed, alpha=alpha)
+              measure=observed, alpha=alpha,
+              simulate=simulate, n_jobs=n_jobs, seed=seed)
 
         return x
 
-    def chisquare2way(self, rfactor, cfactor, alpha=0.05, where=None):
+    def chisquare2way(self, rfactor, cfactor, alpha=0.05, where=None,
+                      simulate=0, n_jobs=1, seed=None):
         """
         conducts a two-way chi-square goodness-of-fit test on the data in observed
 
@@ -1798,6 +2746,16 @@ class DataFrame(OrderedDict):
                where:
                   conditions to apply before running analysis
 
+               simulate:
+                  number of random tables used to calculate a Monte
+                  Carlo p-value ('p_sim')
+
+               n_jobs:
+                  number of processes running the simulations
+
+               seed:
+                  seed of the simulations
+
            return:
               an :class:`pyvttbl.stats.ChiSquare2way` object 
         """
@@ -1805,7 +2763,8 @@ class DataFrame(OrderedDict):
         col_factor = self.select_col(cfactor, where)
 
         x2= stats.ChiSquare2way()
-        x2.run(row_factor, col_factor, alpha=alpha)
+        x2.run(row_factor, col_factor, alpha=alpha,
+               simulate=simulate, n_jobs=n_jobs, seed=seed)
         return x2
 
 
@@ -1897,9 +2856,114 @@ class DataFrame(OrderedDict):
               paired=paired, equal_variance=equal_variance,
               aname=aname, bname=bname)
         return t
+
+    def ttest_many(self, columns, by=None, pop_mean=0., paired=False,
+                   equal_variance=True, alpha=0.05, correction=None,
+                   where=None):
+        """
+        conducts a batch of t-tests with vectorized computations
+
+           args:
+              columns: column keys or (aname, bname) tuples of column
+                       keys.
+
+                 column keys: one-sample t-tests comparing the values
+                              of each column with pop_mean. If by is
+                              specified, the levels of by are compared
+                              pairwise for each column.
+
+                 tuples: t-tests comparing aname with bname
+
+           kwds:
+               by: column key of the factor defining the groups
+
+               pop_mean: specifies the null population mean for one-sample
+                    t-tests.
+
+               paired:
+                  True: paired t-tests are conducted (only for tuples)
+
+                  False: independent samples t-tests are conducted
+
+               equal_variance:
+                  True: assumes equal variances
+
+                  False: assumes unequal variances
+
+               alpha: the type-I error probability
+
+               correction:
+                  None, 'holm', or 'fdr' (Benjamini-Hochberg) adjustment
+                  of the p-values for multiple comparisons
+
+               where:
+                  conditions to apply before running analysis
+
+           return:
+              an :class:`pyvttbl.stats.TtestMany` object
+
+        |   The data of all of the columns are extracted with one query.
+        """
+        if where == None:
+            where = []
+
+        if self == {}:
+            raise Exception('Table must have data to conduct t-tests')
+
+        # check to see if data columns have equal lengths
+        if not self._are_col_lengths_equal():
+            raise Exception('columns have unequal lengths')
+
+        pairs = [c for c in columns if isinstance(c, tuple)]
+        if len(pairs) not in [0, len(columns)]:
+            raise Exception('columns must be all column keys or all tuples')
+
+        if pairs != [] and by != None:
+            raise Exception('by can only be used with column keys')
+
+        if by != None and paired:
+            raise Exception('groups defined by by cannot be paired')
+
+        # extract the data once
+        keys = []
+        for c in _flatten([list(c) for c in pairs] or list(columns)):
+            if c not in keys:
+                keys.append(c)
+        if by != None and by not in keys:
+            keys.append(by)
+
+        data = self._select_cols(keys, where, [k for k in keys if k != by])
+
+        A, B, comparisons = [], [], []
+        if pairs != []:
+            for a, b in pairs:
+                A.append(data[a])
+                B.append(data[b])
+                comparisons.append((a, b))
+
+        elif by != None:
+            levels = sorted(set(np.ma.compressed(data[by])))
+            for c in columns:
+                groups = [data[c][np.ma.filled(data[by] == L, False)]
+                          for L in levels]
+                for i, j in _xunique_combinations(range(len(levels)), 2):
+                    A.append(groups[i])
+                    B.append(groups[j])
+                    comparisons.append((c, levels[i], levels[j]))
+
+        else:
+            A = [data[c] for c in columns]
+            B = None
+            comparisons = list(columns)
+
+        t = stats.TtestMany()
+        t.run(A, B, pop_mean=pop_mean, paired=paired,
+              equal_variance=equal_variance, alpha=alpha,
+              correction=correction, comparisons=comparisons)
+        return t
         
-    def histogram(self, key, where=None, bins=10,
-                  range=None, density=False, cumulative=False):
+    def histogram(self, key, where=None, bins=10, range=None,
+                  density=False, cumulative=False, by=None, weights=None):
 
         """
         Conducts a histogram analysis of the data in self[key].
@@ -1914,8 +2978,19 @@ class DataFrame(OrderedDict):
 
               range: list of length 2 defining min and max bin edges
 
+              density: normalize the histogram to integrate to 1
+
+              cumulative: accumulate the histogram over the bins
+
+              by: list of column labels of factors. If specified a
+                  histogram is generated for each combination of their
+                  levels (all with the same bins)
+
+              weights: column label of the weights of the observations
+
            returns:
-              a :mod:`pyvttbl.stats`. :class:`Descriptives` object
+              a :mod:`pyvttbl.stats`. :class:`Histogram` object
+              (:class:`GroupedHistogram` object if by is specified)
         """
         if where == None:
             where = []
@@ -1930,15 +3005,39 @@ class DataFrame(OrderedDict):
         if key not in self.keys():
             raise KeyError(key)
         
-        V = sorted(self.select_col(key, where=where))
+        if by != None:
+            if isinstance(by, _strobj):
+                by = [by]
+
+            if weights != None:
+                data = self._select_cols([key, weights] + list(by), where,
+                                         [key, weights])
+                W = data[weights]
+            else:
+                data = self._select_cols([key] + list(by), where, [key])
+                W = None
+
+            h = stats.GroupedHistogram()
+            h.run(data[key], [data[f] for f in by], key, by, bins=bins,
+                  range=range, density=density, cumulative=cumulative,
+                  weights=W)
+            return h
+
+        if weights != None:
+            data = self._select_cols([key, weights], where, [key, weights])
+            V, W = data[key], data[weights]
+        else:
+            V, W = self.select_col(key, where=where), None
+            
         h = stats.Histogram()
         h.run(V, cname=key, bins=bins, range=range,
-              density=density, cumulative=cumulative)
+              density=density, cumulative=cumulative, weights=W)
         
         return h
 
     def anova(self, dv, sub='SUBJECT', wfactors=None, bfactors=None,
-              measure='', transform='', alpha=0.05):
+              measure='', transform='', alpha=0.05,
+              permutations=0, n_jobs=1, seed=None):
         """
         conducts a betweeen, within, or mixed, analysis of variance
 
@@ -1969,11 +3068,45 @@ class DataFrame(OrderedDict):
                  'arcsine', 'arcsin'      numpy.arcsin(X)
                  'windsor 10'             windsor(X, 10)   10% windosr trim
                  =======================  ===============  ==================
+
+              permutations: number of random permutations used to
+                     calculate non-parametric p-values ('p_perm') of
+                     the effects (0 skips the permutation test)
+
+              n_jobs: number of processes running the permutations
+
+              seed: seed of the permutations
         """
         aov=stats.Anova()
         aov.run(self, dv, sub=sub, wfactors=wfactors, bfactors=bfactors,
-                measure=measure, transform=transform, alpha=alpha)
+                measure=measure, transform=transform, alpha=alpha,
+                permutations=permutations, n_jobs=n_jobs, seed=seed)
         return aov
+
+    def anova_many(self, dvs, sub='SUBJECT', wfactors=None, bfactors=None,
+                   measure='', transform='', alpha=0.05):
+        """
+        conducts the same betweeen, within, or mixed, analysis of
+        variance on each of several dependent variables
+
+           args:
+              dvs: list of labels containing dependent variables
+
+           kwds:
+              see :meth:`DataFrame.anova`
+
+           returns:
+              an OrderedDict mapping each label in dvs to a
+              :mod:`pyvttbl.stats`. :class:`Anova` object
+
+        |   The dependent variables are pivoted together and their sums
+            of squares, epsilons, p-values and power are computed with
+            array operations over all of them, which is much faster than
+            calling anova for each of them.
+        """
+        return stats.Anova.run_many(self, dvs, sub=sub, wfactors=wfactors,
+                                    bfactors=bfactors, measure=measure,
+                                    transform=transform, alpha=alpha)
         
     def histogram_plot(self, val, **kwargs):
         return plotting.histogram_plot(self, val, **kwargs)
@@ -2064,6 +3197,10 @@ class PyvtTbl(np.ma.MaskedArray, object):
     container holding the pivoted data
     """
 
+    #: maximum number of rows rendered by __str__ and draw. Longer
+    #: tables only show their first and last rows. 0 shows every row.
+    MAXROWS = 1000
+
     def __new__(cls, data, val, conditions, rnames, cnames, aggregate, **kwds):
         """
         creates a new PyvtTbl from scratch
@@ -2312,68 +3449,79 @@ class PyvtTbl(np.ma.MaskedArray, object):
         else:
             return [str(k) for (k, v) in self.cnames[0]]
 
-    def to_dataframe(self):
+    def to_dataframe(self, melt=False):
         """
         returns a DataFrame excluding row and column totals
+
+           kwds:
+              melt: bool specifying the layout of the DataFrame
+
+                 False: the layout of the table is preserved (default)
+
+                 True: returns the table in long format with a column for
+                       each row and column factor and a column holding the
+                       values of the valid cells. Tables built with the
+                       'tolist' aggregate get one row per element.
+
+           returns:
+              a :class:`DataFrame` object
+
+        |   Each column of the DataFrame is built as a single array and
+            assigned once, so the conversion is linear in the number of
+            cells.
         """
         if self == []:
             return DataFrame()
 
-        
-        rows = self._get_rows()
-        cols = self._get_cols()
+        if melt:
+            return self._to_melted_dataframe()
+
+        if self.ndim != 2:
+            raise ValueError('tables with lists in their cells can only '
+                             'be converted with melt=True')
+
+        data = np.ma.getdata(self)
+        mask = np.ma.getmaskarray(self)
 
         # initialize DataFrame
         df = DataFrame()
-        
-        # no rows or cols were specified
-        if self.rnames == [1] and self.cnames == [1]:
-            # build the header
+
+        # row labels
+        if self.rnames != [1]:
+            for k, f in enumerate(self._get_rows()):
+                df[f] = [L[k][1] for L in self.rnames]
+
+        # build the header
+        if self.cnames == [1]:
             header = ['Value']
-            
-        elif self.rnames == [1]: # no rows were specified
-            # build the header
+        else:
             header = [',\n'.join('%s=%s'%(f, c) for (f, c) in L) \
                       for L in self.cnames]
-            
-            if self.ndim == 2:
-                rdata = self[0,:].flatten().tolist()
-            else:
-                rdata = [self[0,j].flatten().tolist()
-                         for j in _xrange(len(self.cnames))]
-                
-            df.insert(zip(header, rdata))
-                
-        elif self.cnames == [1]: # no cols were specified
-            # build the header
-            header = rows + ['Value']
 
-            for i, L in enumerate(self.rnames):
-                if isinstance(self[i,0], PyvtTbl):
-                    rdata = [c for (f, c) in L] + [self[i,0].flatten().tolist()]
-                else:
-                    rdata = [c for (f, c) in L] + [self[i,0]]
-                    
-                df.insert(zip(header, rdata))
-                
-        else: # table has rows and cols
-            # build the header
-            header = copy(rows)
-            for L in self.cnames:
-                header.append(',\n'.join('%s=%s'%(f, c) for (f, c) in L))
-            
-            for i, L in enumerate(self.rnames):
-                
-                if self.ndim == 2:
-                    rdata =[c for (f, c) in L] + self[i,:].flatten().tolist()
-                else:
-                    rdata = [self[i,j].flatten().tolist()
-                             for j in _xrange(len(self.cnames))]
-                    
-                df.insert(zip(header, rdata))
+        # cells
+        for j, h in enumerate(header):
+            df.__setitem__(h, data[:,j].tolist(), mask[:,j].tolist())
 
         return df
 
+    def _to_melted_dataframe(self):
+        """
+        private method to build the long format DataFrame for to_dataframe
+        """
+        nrows, ncols = len(self.rnames), len(self.cnames)
+        depth = (1, self.shape[-1])[self.ndim == 3]
+
+        data = np.ma.getdata(self).ravel()
+        valid = np.invert(np.ma.getmaskarray(self).ravel())
+
+        # index of the row and column conditions for every element
+        # in the flattened data
+        ridx = np.repeat(np.arange(nrows), ncols*depth)[valid]
+        cidx = np.tile(np.repeat(np.arange(ncols), depth), nrows)[valid]
+
+        return _melted_dataframe(self.val, self.rnames, self.cnames,
+                                 ridx, cidx, data[valid].tolist())
+
     def __getitem__(self, indx):
         """
         Return the item described by indx, as a PyvtTbl
@@ -2443,6 +3591,9 @@ class PyvtTbl(np.ma.MaskedArray, object):
     def __str__(self):
         """
         returns a human friendly string representation of the table
+
+        |   Tables with more rows than :attr:`PyvtTbl.MAXROWS` only show
+            their first and last rows.
         """
 ##        return 'PyvtTbl:\n'+'\n\n'.join(
 ##            [super(PyvtTbl, self).__str__(),
@@ -2452,6 +3603,36 @@ class PyvtTbl(np.ma.MaskedArray, object):
         if self == []:
             return '(table is empty)'
 
+        fid = StringIO()
+        self.draw(fid)
+
+        # return the formatted table
+        return fid.getvalue()[:-1]
+
+    def draw(self, fid=None, max_rows=None):
+        """
+        writes a human friendly representation of the table to fid
+
+           kwds:
+              fid: file-like object to write to (default = sys.stdout)
+
+              max_rows: maximum number of rows to write. If the table is
+                        longer the first and last rows are written. 0
+                        writes every row. (default = PyvtTbl.MAXROWS)
+
+           returns:
+              None
+        """
+        if fid == None:
+            fid = sys.stdout
+            
+        if max_rows == None:
+            max_rows = self.MAXROWS
+            
+        if self == []:
+            fid.write('(table is empty)\n')
+            return
+
         show_col_tots = any(np.invert(self.col_tots.mask))
         show_row_tots = any(np.invert(self.col_tots.mask))
         show_grand_tot = _isfloat(self.grand_tot) and not math.isnan(self.grand_tot)
@@ -2470,7 +3651,8 @@ class PyvtTbl(np.ma.MaskedArray, object):
             # initialize the texttable and add stuff
             tt.set_cols_dtype(['t'])
             tt.set_cols_dtype(['l'])
-            tt.add_row(self)
+            row = lambda i: self
+            nrows = 1
             
         elif self.rnames == [1]: # no rows were specified
             
@@ -2487,13 +3669,13 @@ class PyvtTbl(np.ma.MaskedArray, object):
             tt.set_cols_align(['r'] * (len(self.cnames)+show_grand_tot))
 
             if self.ndim == 2:
-                tt.add_row(self[0,:].flatten().tolist()+
-                           ([],[self.grand_tot])[show_grand_tot])
+                row = lambda i: (self[0,:].flatten().tolist() +
+                                 ([],[self.grand_tot])[show_grand_tot])
             else:
-                rdata = [self[0,j].flatten().tolist()
-                         for j in _xrange(len(self.cnames))]
-                
-                tt.add_row(rdata + ([],[self.grand_tot])[show_grand_tot])
+                row = lambda i: ([self[0,j].flatten().tolist()
+                                  for j in _xrange(len(self.cnames))] +
+                                 ([],[self.grand_tot])[show_grand_tot])
+            nrows = 1
                         
         elif self.cnames == [1]: # no cols were specified
             
@@ -2503,11 +3685,14 @@ class PyvtTbl(np.ma.MaskedArray, object):
             # initialize the texttable and add stuff
             tt.set_cols_dtype(['t'] * len(rows) + ['a'])
             tt.set_cols_align(['l'] * len(rows) + ['r'])
-            for i, L in enumerate(self.rnames):
+
+            def row(i):
+                L = self.rnames[i]
                 if isinstance(self[i,0], PyvtTbl):
-                    tt.add_row([c for (f, c) in L] + [self[i,0].flatten().tolist()])
+                    return [c for (f, c) in L] + [self[i,0].flatten().tolist()]
                 else:
-                    tt.add_row([c for (f, c) in L] + [self[i,0]])
+                    return [c for (f, c) in L] + [self[i,0]]
+            nrows = len(self.rnames)
 
             if show_grand_tot:
                 tt.footer(['Total'] + 
@@ -2530,34 +3715,31 @@ class PyvtTbl(np.ma.MaskedArray, object):
             tt.set_cols_dtype(dtypes)
             tt.set_cols_align(aligns)
             if show_col_tots:
-                for i, L in enumerate(self.rnames):
-                    
-                    tt.add_row([c for (f, c) in L] +
-                               self[i,:].flatten().tolist() +
-                               [self.row_tots[i]])
+                row = lambda i: ([c for (f, c) in self.rnames[i]] +
+                                 self[i,:].flatten().tolist() +
+                                 [self.row_tots[i]])
 
                 tt.footer(['Total'] + 
                           ['']*(len(rows)-1) +
                           self.col_tots.tolist() +
                           [self.grand_tot])
                 
+            elif self.ndim == 2:
+                row = lambda i: ([c for (f, c) in self.rnames[i]] +
+                                 self[i,:].flatten().tolist())
             else:
-                for i, L in enumerate(self.rnames):
-                    if self.ndim == 2:
-                        tt.add_row([c for (f, c) in L] +
-                                   self[i,:].flatten().tolist())
-                    else:
-                        rdata = [self[i,j].flatten().tolist()
-                                 for j in _xrange(len(self.cnames))]
-                        
-                        tt.add_row([c for (f, c) in L] + rdata)
+                row = lambda i: ([c for (f, c) in self.rnames[i]] +
+                                 [self[i,j].flatten().tolist()
+                                  for j in _xrange(len(self.cnames))])
+            nrows = len(self.rnames)
 
         # add header and decoration
         tt.header(header)
         tt.set_deco(TextTable.HEADER | TextTable.FOOTER)
 
-        # return the formatted table
-        return '%s(%s)\n%s'%(self.aggregate, self.val, tt.draw())
+        # write the formatted table
+        fid.write('%s(%s)\n'%(self.aggregate, self.val))
+        _draw_rows(fid, tt, row, nrows, max_rows)
 
     def __repr__(self):
         """
@@ -2705,6 +3887,312 @@ class PyvtTbl(np.ma.MaskedArray, object):
 ##    any = _tsaxismethod('any')
 ##
 
+class _spmathmethod(object):
+    """
+    Defines a wrapper for arithmetic methods of SparsePyvtTbl with scalars
+    """
+    def __init__ (self, methodname):
+        self.__name__ = methodname
+        self.__doc__ = getattr(np.ma.MaskedArray, methodname).__doc__
+
+    def __get__(self, obj, objtype=None):
+        "Gets the calling object."
+        return lambda other: self(obj, other)
+
+    def __call__ (self, instance, other):
+        "Execute the call behavior."
+        if not _isfloat(other) or isinstance(other, _strobj):
+            return NotImplemented
+
+        if instance.aggregate == 'tolist':
+            raise TypeError('arithmetic is not supported on tables '
+                            "built with the 'tolist' aggregate")
+
+        func = getattr(instance.data, self.__name__)
+        data = func(other)
+        
+        func = getattr(instance.row_tots, self.__name__)
+        row_tots = func(other)
+
+        func = getattr(instance.col_tots, self.__name__)
+        col_tots = func(other)
+
+        func = getattr(np.ma.array([instance.grand_tot]), self.__name__)
+        grand_tot = func(other)[0]
+
+        return SparsePyvtTbl(data,
+                             instance.rindex,
+                             instance.cindex,
+                             val=instance.val,
+                             conditions=instance.conditions,
+                             rnames=instance.rnames,
+                             cnames=instance.cnames,
+                             aggregate='N/A',
+                             row_tots=row_tots,
+                             col_tots=col_tots,
+                             grand_tot=grand_tot,
+                             where=instance.where)
+
+class SparsePyvtTbl(object):
+    """
+    container holding pivoted data in coordinate format
+
+    |   Only the cells with valid entries are stored. The kth cell is in
+        row rindex[k] and column cindex[k] and holds data[k]. Empty cells
+        behave as masked cells of a :class:`PyvtTbl`.
+    """
+    
+    #: maximum number of cells rendered by __str__. Longer
+    #: tables only show their first and last cells. 0 shows every cell.
+    MAXROWS = 1000
+
+    def __init__(self, data, rindex, cindex, val, conditions,
+                 rnames, cnames, aggregate, **kwds):
+        """
+        creates a new SparsePyvtTbl
+
+           args:
+              data: 1-d np.ma.array holding the values of the valid cells
+
+              rindex: row index of each cell
+
+              cindex: column index of each cell
+
+              val: string label for the data in the table
+
+              conditions: Dictset representing the factors and levels in the table
+
+              rnames: list of row labels
+
+              cnames: list of column labels
+
+              aggregate: string describing the aggregate function applied to the data
+
+           kwds:
+              row_tots: row totals in a MaskedArray
+
+              col_tots: column totals in a MaskedArray
+
+              grand_tot: float holding grand total
+
+              where: criterion applied to the data before pivoting
+        """
+        self.data = np.ma.array(data)
+        self.rindex = np.array(rindex, dtype=int)
+        self.cindex = np.array(cindex, dtype=int)
+        
+        self.val = val
+        self.conditions = conditions
+        self.rnames = rnames
+        self.cnames = cnames
+        self.aggregate = aggregate
+
+        # totals always carry a full mask so PyvtTbl can print them
+        row_tots = kwds.get('row_tots', [])
+        col_tots = kwds.get('col_tots', [])
+        self.row_tots = np.ma.array(row_tots, mask=np.ma.getmaskarray(row_tots))
+        self.col_tots = np.ma.array(col_tots, mask=np.ma.getmaskarray(col_tots))
+        self.grand_tot = kwds.get('grand_tot', np.ma.masked)
+        self.where = kwds.get('where', [])
+
+    def _get_shape(self):
+        return (len(self.rnames), len(self.cnames))
+
+    shape = property(_get_shape, doc='tuple (number of rows, number of columns)')
+
+    def _get_nnz(self):
+        return len(self.data)
+
+    nnz = property(_get_nnz, doc='number of stored cells')
+
+    def __len__(self):
+        return len(self.rnames)
+
+    def transpose(self):
+        """
+        returns a transposed SparsePyvtTbl object
+        """
+        return SparsePyvtTbl(self.data,
+                             self.cindex,
+                             self.rindex,
+                             self.val,
+                             self.conditions,
+                             self.cnames,
+                             self.rnames,
+                             self.aggregate,
+                             row_tots=self.col_tots,
+                             col_tots=self.row_tots,
+                             grand_tot=self.grand_tot,
+                             where=self.where)
+
+    def _row_order(self):
+        """
+        returns the indices that sort the cells by row then column
+        """
+        return np.lexsort((self.cindex, self.rindex))
+
+    def ndenumerate(self):
+        """
+        Index iterator over the stored cells.
+        
+        returns:
+           returns an iterator yielding pairs of array coordinates and
+           values in row-major order.
+        """
+        for k in self._row_order():
+            yield (self.rindex[k], self.cindex[k]), self.data[k]
+
+    def __iter__(self):
+        """
+        iterate over the rows of the table
+
+           returns:
+              iterator yielding each row as a 1-d MaskedArray with the
+              empty cells masked
+        """
+        order = self._row_order()
+        bounds = np.searchsorted(self.rindex[order],
+                                 np.arange(len(self.rnames) + 1))
+        
+        for i in _xrange(len(self.rnames)):
+            row = np.ma.masked_all(len(self.cnames), dtype=self.data.dtype)
+            for k in order[bounds[i]:bounds[i+1]]:
+                row[self.cindex[k]] = self.data[k]
+            yield row
+
+    def todense(self, method='valid'):
+        """
+        converts the table to a :class:`PyvtTbl`
+
+           kwds:
+              method:
+                 'valid': only returns rows or columns with valid entries.
+
+                 'full': return full factorial combinations of the
+                         conditions specified by rows and cols
+
+           returns:
+              :class:`PyvtTbl` object
+        """
+        rnames, cnames = self.rnames, self.cnames
+        rindex, cindex = self.rindex, self.cindex
+        row_tots, col_tots = self.row_tots, self.col_tots
+
+        if method == 'full':
+            rnames, rindex, row_tots = \
+                    self._full_factorial(self.rnames, rindex, row_tots)
+            cnames, cindex, col_tots = \
+                    self._full_factorial(self.cnames, cindex, col_tots)
+        elif method != 'valid':
+            raise ValueError("supplied method '%s' is not valid"%method)
+
+        shape = (len(rnames), len(cnames))
+        
+        if self.aggregate == 'tolist':
+            # pad cells to the length of the longest list
+            depth = max([1] + [len(L) for L in np.ma.getdata(self.data)])
+            values = list(itertools.chain(*np.ma.getdata(self.data)))
+            dtype = np.array(values[:1]).dtype
+            
+            data = np.ma.masked_all(shape + (depth,), dtype=dtype)
+            for i, j, L in zip(rindex, cindex, np.ma.getdata(self.data)):
+                data[i, j, :len(L)] = L
+        else:
+            data = np.ma.masked_all(shape, dtype=self.data.dtype)
+            data[rindex, cindex] = self.data
+
+        return PyvtTbl(data, self.val, self.conditions, rnames, cnames,
+                       self.aggregate,
+                       mask=np.ma.getmaskarray(data),
+                       row_tots=row_tots, col_tots=col_tots,
+                       grand_tot=self.grand_tot)
+
+    def _full_factorial(self, names, index, tots):
+        """
+        private method that maps row or column labels, the cell indices
+        and totals to the full factorial combinations of the conditions
+        """
+        if names == [1]:
+            return names, index, tots
+
+        factors = [f for (f, c) in names[0]]
+        full = [zip(factors, vals) for vals in
+                self.conditions.unique_combinations(factors)]
+        lookup = dict((tuple(L), i) for i, L in enumerate(full))
+        remap = np.array([lookup[tuple(L)] for L in names], dtype=int)
+
+        if len(tots) > 0:
+            new_tots = np.ma.masked_all(len(full), dtype=tots.dtype)
+            new_tots[remap] = tots
+            tots = new_tots
+            
+        return full, remap[index], tots
+
+    def to_dataframe(self, melt=False):
+        """
+        returns a DataFrame excluding row and column totals
+
+           kwds:
+              melt: bool specifying the layout of the DataFrame
+
+                 False: returns the table layout (default). The table
+                        is converted to a :class:`PyvtTbl` first.
+
+                 True: returns the table in long format with a column for
+                       each row and column factor and a column holding the
+                       values of the valid cells. Built directly from the
+                       stored cells.
+
+           returns:
+              a :class:`DataFrame` object
+        """
+        if not melt:
+            return self.todense().to_dataframe()
+
+        order = self._row_order()
+        data = np.ma.getdata(self.data)[order]
+        
+        if self.aggregate == 'tolist':
+            counts = [len(L) for L in data]
+            ridx = np.repeat(self.rindex[order], counts)
+            cidx = np.repeat(self.cindex[order], counts)
+            values = list(itertools.chain(*data))
+        else:
+            valid = np.invert(np.ma.getmaskarray(self.data)[order])
+            ridx = self.rindex[order][valid]
+            cidx = self.cindex[order][valid]
+            values = data[valid].tolist()
+
+        return _melted_dataframe(self.val, self.rnames, self.cnames,
+                                 ridx, cidx, values)
+
+    def __str__(self):
+        """
+        returns a human friendly string representation of the table
+
+        |   The valid cells are listed in long format.
+        """
+        if self.nnz == 0:
+            return '(table is empty)'
+
+        df = self.to_dataframe(melt=True)
+        df.MAXROWS = self.MAXROWS
+        return '%s(%s)\n%s'%(self.aggregate, self.val, df)
+    
+    __add__ = _spmathmethod('__add__')
+    __radd__ = _spmathmethod('__add__')
+    __sub__ = _spmathmethod('__sub__')
+    __rsub__ = _spmathmethod('__rsub__')
+    __pow__ = _spmathmethod('__pow__')
+    __mul__ = _spmathmethod('__mul__')
+    __rmul__ = _spmathmethod('__mul__')
+    __div__ = _spmathmethod('__div__')
+    __rdiv__ = _spmathmethod('__rdiv__')
+    __truediv__ = _spmathmethod('__truediv__')
+    __rtruediv__ = _spmathmethod('__rtruediv__')
+    __floordiv__ = _spmathmethod('__floordiv__')
+    __rfloordiv__ = _spmathmethod('__rfloordiv__')
+
 
     
 ##df = DataFrame()
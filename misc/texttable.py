@@ -26,6 +26,8 @@ from __future__ import print_function
 #      - a private method to format the cells (_str)
 #      - a private array to hold the formatting information (self._dtype)
 #      - some modifications to add_row()
+#      - a public method to write the table line by line to a file-like
+#        object (write)
 
 """module for creating simple ASCII tables
 
@@ -80,6 +82,7 @@ Roger Lew:
 import sys
 import string
 import math
+import itertools
 
 try:
     if sys.version >= '2.3':
@@ -210,6 +213,12 @@ class Texttable:
         - cells can contain newlines and tabs
         """
 
+        self._rows.append(self._format_row(array))
+
+    def _format_row(self, array):
+        """Format the cells of a row according to the column datatypes
+        """
+
         self._check_row_size(array)
         
         if not hasattr(self, "_dtype"):
@@ -218,7 +227,7 @@ class Texttable:
         cells=[]
         for i,x in enumerate(array):
             cells.append(_str(x,self._dtype[i], self._float_precision))
-        self._rows.append(cells)
+        return cells
 
     def add_rows(self, rows, header=True):
         """Add several rows in the rows stack
@@ -352,28 +361,51 @@ class Texttable:
 
         if not self._header and not self._rows:
             return
+        out = []
+        self._write(out.append)
+        return "".join(out)[:-1]
+
+    def write(self, fid, rows=None):
+        """Write the table to the file-like object fid line by line
+
+        - 'rows' is an optional iterable of additional rows. They are
+          formatted and written as they are consumed instead of being
+          stored, so the column widths are computed from the header,
+          the footer and the rows already added. Cells of these rows
+          that are wider than their column are not wrapped.
+        """
+
+        if rows is None:
+            rows = []
+        self._write(fid.write, rows)
+
+    def _write(self, write, rows=None):
+        """Pass each line of the table to the write function
+        """
+
+        if rows is None:
+            rows = []
+        rows = itertools.chain(
+                   ((row, True) for row in self._rows),
+                   ((self._format_row(row), False) for row in rows))
         self._compute_cols_width()
         self._check_align()
-        out = ""
         if self._has_border():
-            out += self._hline()
+            write(self._hline())
         if self._header:
-            out += self._draw_line(self._header, isheader=True)
+            write(self._draw_line(self._header, isheader=True))
             if self._has_header():
-                out += self._hline_header()
-        length = 0
-        for row in self._rows:
-            length += 1
-            out += self._draw_line(row)
-            if self._has_hlines() and length < len(self._rows):
-                out += self._hline()
+                write(self._hline_header())
+        for i, (row, wrap) in enumerate(rows):
+            if self._has_hlines() and i > 0:
+                write(self._hline())
+            write(self._draw_line(row, wrap=wrap))
         if self._footer:
             if self._has_footer():
-                out += self._hline_header()
-            out += self._draw_line(self._footer)
+                write(self._hline_header())
+            write(self._draw_line(self._footer))
         if self._has_border():
-            out += self._hline()
-        return out[:-1]
+            write(self._hline())
 
     def _check_row_size(self, array):
         """Check that the specified array fits the previous rows size
@@ -507,13 +539,13 @@ class Texttable:
         if not hasattr(self, "_valign"):
             self._valign = ["t"]*self._row_size
 
-    def _draw_line(self, line, isheader=False):
+    def _draw_line(self, line, isheader=False, wrap=True):
         """Draw a line
 
         Loop over a single cell length, over all the cells
         """
 
-        line = self._splitit(line, isheader)
+        line = self._splitit(line, isheader, wrap)
         space = " "
         out  = ""
         for i in range(len(line[0])):
@@ -538,7 +570,7 @@ class Texttable:
             out += "%s\n" % ['', self._char_vert][self._has_border()]
         return out
 
-    def _splitit(self, line, isheader):
+    def _splitit(self, line, isheader, wrap=True):
         """Split each element of line to fit the column width
 
         Each element is turned into a list, result of the wrapping of the
@@ -549,7 +581,10 @@ class Texttable:
         for cell, width in zip(line, self._width):
             array = []
             for c in cell.split('\n'):
-                array.extend(textwrap.wrap(unicode(c, 'utf'), width))
+                if wrap:
+                    array.extend(textwrap.wrap(unicode(c, 'utf'), width))
+                else:
+                    array.append(unicode(c, 'utf'))
             line_wrapped.append(array)
         max_cell_lines = reduce(max, map(len, line_wrapped))
         for cell, valign in zip(line_wrapped, self._valign):
@@ -1,13 +1,16 @@
 
 from _anova import Anova
 from _anova1way import Anova1way
+from _power import AnovaPower
 from _chisquare1way import ChiSquare1way
 from _chisquare2way import ChiSquare2way
 from _correlation import Correlation
-from _descriptives import Descriptives
-from _histogram import Histogram
+from _descriptives import Descriptives, GroupedDescriptives, \
+     StreamingDescriptives
+from _histogram import Histogram, GroupedHistogram
 from _marginals import Marginals
 from _ttest import Ttest
+from _ttest_many import TtestMany
 from _stats import *
 from _pstat import *
 from qsturng import *
@@ -48,6 +48,13 @@ def epsLB(y, df1)
 
     see __docstring__ for function for more information
 
+def sphericity(y, df1)
+
+    given data matrix y returns Greenhouse-Geisser's, Huynh-Feldt's,
+    and Box's epsilons
+
+    see __docstring__ for function for more information
+
 def windsor(X, percent)
 
     given vector X returns the Windsorized trimmed samples, in which the
@@ -190,6 +197,7 @@ elif sys.version_info[0] == 3:
     _xrange = range
 
 import csv
+import itertools
 import numpy
 import scipy
 import pylab
@@ -197,9 +205,9 @@ import pylab
 from collections import OrderedDict
 from copy import copy
 from numpy import any,array,asarray,concatenate, \
-                  cov,diag,dot,eye,fix,floor,isnan, \
-                  kron,min,max,mean,ones,prod,shape, \
-                  sqrt,std,trace,where,zeros 
+                  cov,diag,dot,einsum,eye,fix,floor,isnan, \
+                  kron,min,max,mean,ones,prod,rollaxis,shape, \
+                  sqrt,std,tensordot,trace,where,zeros 
 from numpy import remainder as rem
 from numpy import sum as nsum
 from numpy.random import uniform
@@ -216,6 +224,7 @@ from sets import Set
 from pyvttbl.misc.SimpleHTML import *
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
+from pyvttbl.stats._permutation import map_permutations, pvalue
 
 def observed_power(df,dfe,nc,alpha=0.05,eps=1.0):
     """
@@ -232,8 +241,11 @@ def observed_power(df,dfe,nc,alpha=0.05,eps=1.0):
     # 05.17.2012 validated against G*Power
     # epsilon scales critical F, degrees of freedom,
     # and non-centrality parameter
-    crit_f = scipy.stats.f(df*eps, dfe*eps).ppf(1.-alpha)
-    return scipy.stats.ncf(df*eps, dfe*eps, nc*eps).sf(crit_f)
+    #
+    # the arguments can also be arrays (freezing the distributions
+    # is slow)
+    crit_f = scipy.stats.f.ppf(1.-alpha, df*eps, dfe*eps)
+    return scipy.stats.ncf.sf(crit_f, df*eps, dfe*eps, nc*eps)
 
 def f2s(L):
     """Turns a list of floats into a list of strings"""
@@ -271,6 +283,68 @@ def shape(X, i=-1):
 def std_error(X):
     return std(X)/sqrt(len(X))
 
+# contrast and mean components keyed by number of levels
+_contrasts_cache = {}
+
+def _contrasts(n):
+    """
+    Returns the main effect and interaction contrast components and the
+    matching mean components of a factor with n levels. The interaction
+    mean component is None, meaning the identity.
+    """
+    if n not in _contrasts_cache:
+        _contrasts_cache[n] = (ones((n,1)),
+                               detrend(eye(n),type='constant'),
+                               ones((n,1))/n,
+                               None)
+    return _contrasts_cache[n]
+
+def _kron_dot(X, D, blocks):
+    """
+    Returns dot(X, kron(blocks[0], kron(blocks[1], ...))) without
+    building the Kronecker product. The columns of X hold the prod(D)
+    conditions with the first factor rotating slowest. Each block is
+    contracted with its factor's axis of X reshaped to (Nr, D1, ..., Df),
+    starting with the last (contiguous) axis. None blocks are the identity.
+    """
+    Nr = shape(X,0)
+    Y = asarray(X).reshape([Nr] + list(D))
+    for i in reversed(xrange(len(blocks))):
+        B = blocks[i]
+        if B is not None:
+            Y = rollaxis(tensordot(Y, B, axes=([i+1],[0])), -1, i+1)
+    return Y.reshape(Nr, -1)
+
+def _cell_means(X, W, D, axes):
+    """
+    Returns the means of the cells of X (Nr x prod(D)) averaged over
+    the factor axes in axes and weighted by W, the number of
+    observations in each cell (0 for empty cells). The result has a
+    row for every replication and a column for every combination of
+    the remaining factors. These are the means of the observations in
+    the combinations. Combinations without observations are NaN.
+    """
+    Nr = shape(X,0)
+    N = asarray(W, dtype=numpy.float64).reshape([Nr] + list(D))
+    X = where(N > 0., X.reshape(N.shape)*N, 0.)
+    for axis in sorted(axes, reverse=True):
+        X = nsum(X, axis=axis+1)
+        N = nsum(N, axis=axis+1)
+    return (X/where(N==0, numpy.nan, N)).reshape(Nr, -1)
+
+def _effect_contrasts(D, cw):
+    """
+    Returns the per-factor contrast blocks and mean blocks of the
+    effect coded by cw (see Anova._num2binvec)
+    """
+    Nf = len(D)
+    c, cy = [], []
+    for f in xrange(1,Nf+1):
+        sc1, sc2, sy1, sy2 = _contrasts(D[f-1])
+        c.append((sc1, sc2)[cw[Nf-f] == 2.])
+        cy.append((sy1, sy2)[cw[Nf-f] == 2.])
+    return c, cy
+
 def _xunique_combinations(items, n):
     if n==0: yield []
     else:
@@ -278,6 +352,169 @@ def _xunique_combinations(items, n):
             for cc in _xunique_combinations(items[i+1:],n-1):
                 yield [items[i]]+cc
 
+def _permute_conditions(X, Nw, Nb, within, rs):
+    """
+    Returns a random permutation of X (Nr x Nw*Nb) within its
+    exchangeability blocks. The columns hold the within conditions
+    (slowest) by the between conditions. If within is True the within
+    conditions are shuffled separately for each replication. Otherwise
+    the replications are shuffled across the between conditions.
+    Missing (NaN) cells move with their replication.
+    """
+    Nr = shape(X,0)
+    X = X.reshape(Nr, Nw, Nb)
+    ri = numpy.arange(Nr)
+    
+    if within:
+        idx = numpy.argsort(rs.rand(Nr, Nw), axis=1)
+        return X[ri[:,None], idx, :].reshape(Nr, -1)
+
+    # between condition of each replication
+    b = numpy.argmax(any(~isnan(X), axis=1), axis=1)
+    Y = numpy.empty_like(X)
+    Y.fill(numpy.nan)
+    Y[ri, :, b[rs.permutation(Nr)]] = X[ri, :, b]
+    return Y.reshape(Nr, -1)
+
+def _permuted(X, P):
+    """
+    Returns the cells of X at the flat indices in P. NaN indices give
+    NaN cells.
+    """
+    valid = ~isnan(P)
+    Y = numpy.empty(P.shape)
+    Y.fill(numpy.nan)
+    Y[valid] = X.flat[P[valid].astype(numpy.int64)]
+    return Y
+
+def _permutation_F(X, W, D, codes, wfactors, bfactors, sub, dfs):
+    """
+    Returns a dict mapping the effects to arrays with the F ratios of
+    the K pivots stacked in X (K x replications x prod(D) conditions,
+    empty cells filled like Anova.pt_asarray). W holds the number of
+    observations in each cell of X (see Anova._prepare). dfs maps the
+    keys of the observed results to their (df, dfe); the degrees of
+    freedom do not change when the data are permuted, so only the sums
+    of squares are calculated (the same way as Anova._between,
+    Anova._within, and Anova._mixed).
+    """
+    K,Nr,Nd = shape(X)
+    factors = wfactors+bfactors
+    Nf = len(D)
+    Nw = prod(D[:len(wfactors)])*1.
+    Nb = prod(D[len(wfactors):])*1.
+
+    ss, F = {}, {}
+    proj = _project_effects(X, D, codes, spherical=False)
+    for cw, p in zip(codes, proj):
+        efs = tuple(asarray(factors)[Nf-1-where(asarray(cw)==2.)[0][::-1]])
+        c, cy = _effect_contrasts(D, cw)
+        Nc = prod([shape(sc,1) for sc in c])
+        No = Nd/Nc*1.
+
+        if len(wfactors) == 0:
+            ss[efs] = p['yb']*Nc
+        elif len(bfactors) == 0:
+            df, dfe = dfs[efs]
+            F[efs] = (p['yb']/df)/((p['yy']-p['yb'])/dfe)
+        else:
+            ss[efs] = p['yb']/(No/Nb)
+
+    if len(wfactors) == 0:
+        X_mean = mean(X.reshape(K, -1), 1)
+        ss_error = nsum((X.reshape(K, -1)-X_mean[:,None])**2, 1)
+        for efs in ss:
+            ss_error -= ss[efs]
+        for efs in ss:
+            df, dfe = dfs[efs]
+            F[efs] = (ss[efs]/df)/(ss_error/dfe)
+
+    if len(wfactors) == 0 or len(bfactors) == 0:
+        return F
+
+    # error terms of the mixed design, the cell means of all the
+    # permutations are marginalized at once
+    X_mean = mean(X.reshape(K, -1), 1)[:,None]
+    Xr, Wr = X.reshape(K*Nr, Nd), W.reshape(K*Nr, Nd)
+    def cell_ss(axes):
+        M = _cell_means(Xr, Wr, D, axes).reshape(K, -1)
+        return numpy.nansum((M-X_mean)**2, 1)
+
+    ss_bsub = cell_ss(range(Nf))*Nw
+    sse_b = ss_bsub.copy()
+    befs = []
+    for i in xrange(1,len(bfactors)+1):
+        for efs in _xunique_combinations(bfactors, i):
+            sse_b -= ss[tuple(efs)]
+            befs.append(efs)
+    ss[(sub,)] = ss_bsub
+
+    for i in xrange(1, len(wfactors)+1):
+        for efs in _xunique_combinations(wfactors, i):
+            efs += [sub]
+            r  = cell_ss([i for i,f in enumerate(factors) if f not in efs])
+            r *= prod([D[i] for i,f in enumerate(wfactors) if f not in efs])
+
+            for j in xrange(1, len(efs+bfactors)+1):
+                for efs2 in _xunique_combinations(efs+bfactors, j):
+                    if efs2 not in befs and efs2!=efs:
+                        if not (sub in efs2 and
+                                len(Set(efs2).intersection(Set(bfactors)))>0):
+                            r -= ss[tuple(efs2)]
+            ss[tuple(efs)] = r
+
+    for i in xrange(1,len(factors)+1):
+        for efs in _xunique_combinations(factors, i):
+            df, dfe = dfs[tuple(efs)]
+            if efs in befs:
+                F[tuple(efs)] = (ss[tuple(efs)]/df)/(sse_b/dfe)
+            else:
+                err = tuple([f for f in efs if f not in bfactors]+[sub])
+                F[tuple(efs)] = (ss[tuple(efs)]/df)/(ss[err]/dfs[err][0])
+    return F
+
+def _anova_permutations(args):
+    """
+    Returns the F ratios of the effects (columns) of each permutation
+    (rows) of the pivoted data. Called through map_permutations by
+    Anova._permutation_test. The permutations of a batch are gathered
+    from the flat cell indices and analyzed together (see
+    _permutation_F).
+    """
+    (X, C, fill, D, codes, wfactors, bfactors, sub, dfs, groups), batches = args
+
+    Nw = int(prod(D[:len(wfactors)]))
+    Nb = int(prod(D[len(wfactors):]))
+
+    # the flat indices of the cells are permuted so that the cell
+    # counts move with the cells
+    I = where(isnan(X), numpy.nan, numpy.arange(X.size).reshape(X.shape))
+    
+    F = []
+    for seed, size in batches:
+        rs = numpy.random.RandomState(seed)
+        P = [[] for g in groups]
+        for i in xrange(size):
+            for j, (within, effects) in enumerate(groups):
+                P[j].append(_permute_conditions(I, Nw, Nb, within, rs))
+
+        cols = []
+        for j, (within, effects) in enumerate(groups):
+            P_j = array(P[j]).reshape(size, shape(X,0), shape(X,1))
+            Y = _permuted(X, P_j)
+            valid = ~isnan(Y)
+            if C is None:
+                W = valid*1.
+            else:
+                W = where(valid, _permuted(C, P_j), 0.)
+            Y[~valid] = fill
+            
+            F_j = _permutation_F(Y, W, D, codes, wfactors, bfactors, sub, dfs)
+            cols.extend([F_j[efs] for efs in effects])
+        F.append(array(cols, dtype=numpy.float64).T)
+            
+    return concatenate(F, axis=0).reshape(-1, len(cols))
+
 def epsGG(y, df1):
     """
     (docstring is adapted from Trujillo-Ortiz (2006); see references)
@@ -381,10 +618,7 @@ def epsGG(y, df1):
           http://www.mathworks.com/matlabcentral/fileexchange
           /loadFile.do?objectId=12839
     """
-    if df1 == 1. : return 1.
-    
-    V = cov(y) # sample covariance
-    return trace(V)**2 / (df1*trace(dot(V.T,V)))      
+    return sphericity(y, df1)[0]
 
 def epsHF(y, df1):
     """
@@ -452,18 +686,7 @@ def epsHF(y, df1):
           http://www.mathworks.com/matlabcentral/fileexchange
           /loadFile.do?objectId=12839
     """
-    if df1 == 1. : return 1.
-    
-    k,n = shape(y)      # number of treatments
-    eGG = epsGG(y, df1) # Greenhouse-Geisser epsilon
-
-    N = n*(k-1.)*eGG-2.
-    D = (k-1.)*((n-1.)-(k-1.)*eGG)
-    eHF = N/D                 # Huynh-Feldt epsilon estimation
-
-    if   eHF < eGG : return eGG
-    elif eHF > 1.  : return 1.
-    else           : return eHF
+    return sphericity(y, df1)[1]
 
 def epsLB(y, df1):
     """
@@ -511,14 +734,135 @@ def epsLB(y, df1):
           http://www.mathworks.com/matlabcentral/fileexchange
           /loadFile.do?objectId=12839
     """
-    if df1 == 1. : return 1.
-        
-    k = shape(y,0)  # number of treatments
-    box = 1./(k-1.) # Box's conservative epsilon estimation
+    return sphericity(y, df1)[2]
 
-    if box*df1 < 1. : box = 1. / df1
+def sphericity(y, df1):
+    """
+    Returns the Greenhouse-Geisser, Huynh-Feldt, and Box's conservative
+    epsilons of data matrix y as a tuple (see epsGG, epsHF, and epsLB)
+    from a single covariance calculation.
+
+    y and df1 can also be lists of data matrices and degrees of freedom
+    (e.g. the projections of many effects), in which case a list of
+    tuples is returned.
+    """
+    if isinstance(y, list):
+        return [sphericity(_y, _df1) for _y, _df1 in zip(y, df1)]
     
-    return box
+    if df1 == 1. : return (1., 1., 1.)
+
+    y = asarray(y, dtype=numpy.float64)
+    return tuple(e[0] for e in _sphericity_many(y[None], df1))
+
+def _sphericity_many(y, df1):
+    """
+    Returns arrays with the Greenhouse-Geisser, Huynh-Feldt, and Box's
+    conservative epsilons (see sphericity) of each of the K data
+    matrices stacked in y (K x n-data x k-treatments).
+    """
+    K,k,n = shape(y)
+
+    if df1 == 1. :
+        return ones(K), ones(K), ones(K)
+
+    # The epsilons only need trace(V) and trace(dot(V,V)) of the sample
+    # covariance V = cov(y). Both are invariant to the scaling of V and
+    # equal for either Gram matrix of the centered data, so the smaller
+    # one is used.
+    yc = y - mean(y, axis=2)[:,:,None]
+    if n < k:
+        V = einsum('kij,kil->kjl', yc, yc)
+    else:
+        V = einsum('kji,kli->kjl', yc, yc)
+
+    # Greenhouse-Geisser epsilon
+    eGG = einsum('kii->k', V)**2 / (df1*einsum('kij,kji->k', V, V))
+
+    # Huynh-Feldt epsilon estimation
+    N = n*(k-1.)*eGG-2.
+    D = (k-1.)*((n-1.)-(k-1.)*eGG)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        eHF = N/D
+
+    eHF = where(eHF < eGG, eGG, where(eHF > 1., 1., eHF))
+
+    # Box's conservative epsilon estimation
+    eLB = 1./(k-1.)
+    if eLB*df1 < 1. : eLB = 1. / df1
+    
+    return eGG, eHF, eLB*ones(K)
+
+def _project_effects(X, D, codes, spherical=True):
+    """
+    Projects the data of the K dependent variables stacked in X
+    (K x replications x prod(D) conditions) onto the contrasts of each
+    effect in codes (see Anova._num2binvec).
+
+    Returns a list with a dict for each effect. The dicts hold arrays
+    with an element for each dependent variable: the component means
+    ('y2'), the sums of the projections weighted by their means ('yb'),
+    the sums of the squared projections ('yy') and, if spherical is
+    True, the epsilons ('eps_gg', 'eps_hf', 'eps_lb'). All of the
+    dependent variables are projected with one _kron_dot per effect.
+    """
+    K,Nr,Nd = shape(X)
+    Nf = len(D)
+    X_mean = mean(X, 1)
+    X = X.reshape(K*Nr, Nd)
+
+    proj = []
+    for cw in codes:
+        c, cy = _effect_contrasts(D, cw)
+        y = _kron_dot(X, D, c).reshape(K, Nr, -1)
+        b = mean(y, 1)
+
+        p = {}
+        p['y2'] = _kron_dot(X_mean, D, cy)
+        p['yb'] = nsum(nsum(y*b[:,None,:], 2), 1)
+        p['yy'] = nsum(nsum(y*y, 2), 1)
+
+        if spherical:
+            df1 = prod([D[f-1]-1. for f in xrange(1,Nf+1) if cw[Nf-f] == 2.])
+            p['eps_gg'], p['eps_hf'], p['eps_lb'] = _sphericity_many(y, df1)
+
+        proj.append(p)
+    return proj
+
+def _unstack(proj, i):
+    """
+    Returns the projections (see _project_effects) of the i-th
+    dependent variable.
+    """
+    return [dict((k, v[i]) for k, v in p.items()) for p in proj]
+
+def _test_effects(rs):
+    """
+    Calculates p, critT, se, ci, and power of the (result, suffix)
+    pairs in rs with one vectorized call per distribution (see
+    Anova._run_tests).
+    """
+    if len(rs) == 0:
+        return
+    
+    def col(key, suffixed=False):
+        return array([r[key+(x if suffixed else '')] for r,x in rs],
+                     dtype=numpy.float64)
+    
+    dfe = col('dfe')
+    eps = array([(r.get('eps%s'%x, 1.), 1.)[x == ''] for r,x in rs])
+
+    p = scipy.stats.f.sf(col('F', True),
+                         col('df', True), col('dfe', True))
+    critT = abs(scipy.stats.t.ppf(.05/2., dfe))
+    sem = sqrt(col('mse')/col('obs', True))
+    power = observed_power(col('df'), dfe, col('lambda'), eps=eps)
+
+    for i, (r,x) in enumerate(rs):
+        r['p%s'%x] = p[i]
+        r['critT%s'%x] = critT[i]
+        r['se%s'%x] = sem[i]*critT[i]/1.96
+        r['ci%s'%x] = sem[i]*critT[i]
+        r['power%s'%x] = power[i]
             
 def windsor(X, percent):
     """
@@ -598,6 +942,13 @@ class Anova(OrderedDict):
             self.transform = kwds['transform']
         else:
             self.transform = ''
+
+        # number of observations in each cell of the pivot (see
+        # _prepare). None means one observation per valid cell
+        self.pt_counts = None
+
+        # see _run_tests
+        self._deferred = None
         
         if len(args) == 1:
             super(Anova, self).__init__(args[0])
@@ -605,14 +956,98 @@ class Anova(OrderedDict):
             super(Anova, self).__init__()
         
     def run(self, dataframe, dv, wfactors=None, bfactors=None,
-                 sub='SUBJECT', measure='', transform='', alpha=0.05):  
+                 sub='SUBJECT', measure='', transform='', alpha=0.05,
+                 permutations=0, n_jobs=1, seed=None):  
         """
         Fancy linear algebra is adapted from a matlab script by R.Henson,
         17/3/03
         rik.henson@mrc-cbu.cam.ac.uk
         http://www.mrc-cbu.cam.ac.uk/people/rik.henson/personal/repanova.m
-        
+
+        If permutations > 0 the effects also get a non-parametric
+        'p_perm' from that many random permutations of the data.
+        Within subjects conditions are shuffled within each subject and
+        subjects are shuffled across the between subjects conditions.
+        The permutations are run by n_jobs processes and are
+        reproducible given seed.
         """
+        self._setup(dataframe, dv, wfactors, bfactors, sub, measure, transform)
+            
+        # self.pt is a PyvtTbl (list of lists)
+        #     rows = replications (eg subjects)
+        #     columns = conditions
+        # self.pt_counts holds the number of observations in each cell
+        pts, counts = self.df._pivot_many([self.dv], rows=[self.sub],
+                                          cols=self.wfactors+self.bfactors,
+                                          counts=True)
+        self.pt, self.pt_counts = pts[0], counts[0]
+
+        self._analyze()
+
+        if permutations > 0:
+            self._permutation_test(permutations, n_jobs, seed)
+
+    @classmethod
+    def run_many(cls, dataframe, dvs, wfactors=None, bfactors=None,
+                 sub='SUBJECT', measure='', transform='', alpha=0.05):
+        """
+        Runs the same analysis on each dependent variable in dvs.
+        Returns an OrderedDict mapping each dv to its Anova object.
+
+        The dependent variables are pivoted together with a single
+        sqlite3 table and query. Their pivots are stacked into a
+        dv x subject x condition array that is projected onto the
+        contrasts of each effect at once (the sums of squares and
+        epsilons of all of the dvs are computed together, see
+        _project_effects), and the p-values and power of all of the
+        effects of all of the dvs are calculated with one vectorized
+        call per distribution.
+        """
+        if wfactors == None:
+            wfactors = []
+            
+        if bfactors == None:
+            bfactors = []
+            
+        aovs = OrderedDict()
+        if len(dvs) == 0:
+            return aovs
+        
+        for dv in dvs:
+            aov = cls()
+            aov._setup(dataframe, dv, wfactors, bfactors,
+                       sub, measure, transform)
+            aovs[dv] = aov
+
+        pts, counts = dataframe._pivot_many([aov.dv for aov in aovs.values()],
+                                            rows=[sub], cols=wfactors+bfactors,
+                                            counts=True)
+        
+        for aov, pt, n in zip(aovs.values(), pts, counts):
+            aov.pt, aov.pt_counts = pt, n
+            aov._prepare()
+
+        # dvs without data in some condition have smaller pivots and are
+        # projected separately by _analyze
+        X = [aov.pt_asarray for aov in aovs.values()]
+        projs = [None]*len(X)
+        if len(set(shape(x) for x in X)) == 1:
+            proj = _project_effects(array(X), aov.D, aov._effect_codes(),
+                                    len(wfactors) != 0)
+            projs = [_unstack(proj, i) for i in xrange(len(X))]
+
+        rs = []
+        for aov, proj in zip(aovs.values(), projs):
+            aov._deferred = rs
+            aov._analyze(proj=proj)
+            aov._deferred = None
+        _test_effects(rs)
+
+        return aovs
+
+    def _setup(self, dataframe, dv, wfactors, bfactors,
+               sub, measure, transform):
+        """Initializes the analysis and applies the transform"""
         if wfactors == None:
             wfactors = []
             
@@ -641,6 +1076,11 @@ class Anova(OrderedDict):
 
         self.plots=[]
 
+        # coded factors and the marginal means derived from them
+        # (see _marginal_means)
+        self._coded=None
+        self._emms={}
+
         # a list of all the factors
         factors=wfactors+bfactors
         self.dftrim=0.
@@ -683,15 +1123,63 @@ class Anova(OrderedDict):
                 self.df[tstr+self.dv] = self.transform(self.df[self.dv])
                 
             self.dv = tstr+self.dv
+
+    def _analyze(self, tests=True, proj=None):
+        """
+        Runs the analysis on the pivoted data in self.pt. If tests is
+        False only the F ratios (not p, se, power...) are calculated.
+        proj holds the projections of the prepared data onto the effect
+        contrasts (see _project_effects). If it is None the data are
+        prepared and projected here.
+        """
+        self._tests = tests
+        wfactors = self.wfactors
+        bfactors = self.bfactors
+
+        if proj is None:
+            self._prepare()
+            X = self.pt_asarray[None]
+            proj = _unstack(_project_effects(X, self.D, self._effect_codes(),
+                                             len(wfactors) != 0), 0)
+        self._proj = proj
+        
+        if len(wfactors)!=0 and len(bfactors)==0:
+            self._within()
             
-        # self.pt is a PyvtTbl (list of lists)
-        #     rows = replications (eg subjects)
-        #     columns = conditions
-        self.pt=self.df.pivot(self.dv,rows=[self.sub],cols=factors)
+        if len(wfactors)==0 and len(bfactors)!=0:
+            self._between()
+            
+        if len(wfactors)!=0 and len(bfactors)!=0:
+            self._mixed()
+
+    def _effect_codes(self):
+        """
+        Returns the codes of the effects of the design (see _num2binvec)
+        """
+        Nf = len(self.wfactors+self.bfactors)
+        return [self._num2binvec(e,Nf) for e in xrange(1,2**Nf)]
 
+    def _prepare(self):
+        """
+        Converts the pivoted data in self.pt to an array. Empty cells
+        are filled with the mean of the dv.
+        """
+        factors = self.wfactors+self.bfactors
+        
         # self.pt_asarray is the same data as self.pt except as a numpy array
         self.pt_asarray = array(self.pt, dtype=numpy.float64)
 
+        # cells of self.pt_asarray that hold data
+        self.pt_valid = ~isnan(self.pt_asarray)
+
+        # number of observations in each cell
+        if self.pt_counts is None:
+            self.pt_weights = self.pt_valid*1.
+        else:
+            self.pt_weights = where(self.pt_valid,
+                                    array(self.pt_counts, dtype=numpy.float64),
+                                    0.)
+
 ##        print('%i NaN values found.'%len(self.pt_asarray[isnan(self.pt_asarray)]))
 
         # Replace NaN values with mean of dv
@@ -706,15 +1194,6 @@ class Anova(OrderedDict):
         # First factor rotates slowest; last factor fastest
         self.D=[len(self.df.conditions[f]) for f in factors]
 
-        if len(wfactors)!=0 and len(bfactors)==0:
-            self._within()
-            
-        if len(wfactors)==0 and len(bfactors)!=0:
-            self._between()
-            
-        if len(wfactors)!=0 and len(bfactors)!=0:
-            self._mixed()
-
     def _between(self):
         factors=self.bfactors
         pt_asarray = self.pt_asarray
@@ -731,16 +1210,6 @@ class Anova(OrderedDict):
         if shape(pt_asarray,1) != Nd:
             raise Exception('data has %d conditions; design only %d',
                             shape(pt_asarray,1),Nd)
-        
-        sc, sy = {}, {}
-        for f in xrange(1,Nf+1):
-            # create main effect/interaction component contrasts
-            sc[(f,1)] = ones((D[f-1],1))
-            sc[(f,2)] = detrend(eye(D[f-1]),type='constant')
-
-            # create main effect/interaction components for means
-            sy[(f,1)] = ones((D[f-1],1))/D[f-1]
-            sy[(f,2)] = eye(D[f-1])
 
         # Loop through effects
         # Do fancy calculations
@@ -752,29 +1221,23 @@ class Anova(OrderedDict):
             efs = asarray(factors)[Nf-1-where(asarray(cw)==2.)[0][::-1]]
             r = {}
         
-            # create full contrasts
-            c = sc[(1,cw[Nf-1])];  
-            for f in xrange(2,Nf+1):
-                c = kron(c, sc[(f,cw[Nf-f])])
+            # contrast components, the full contrast is their
+            # Kronecker product
+            c, cy = _effect_contrasts(D, cw)
                 
-            Nc = shape(c,1) # Number of conditions in effect
+            Nc = prod([shape(sc,1) for sc in c]) # Number of conditions in effect
             No = Nd/Nc*1.   # Number of observations per condition in effect
             
-            # project data to contrast sub-space
-            y  = dot(pt_asarray,c)
-            nc = shape(y,1)
+            # projections of the data to the contrast sub-space
+            # (see _project_effects)
+            p = self._proj[e-1]
             
             # calculate component means
-            cy = sy[(1, cw[Nf-1])]
-            for f in xrange(2,Nf+1):
-                cy = kron(cy, sy[(f,cw[Nf-f])] )
-        
-            r['y2'] = mean(dot(pt_asarray,cy),0)
+            r['y2'] = p['y2']
             
             # calculate df, ss, and mss
-            b = mean(y,0)
-            r['df'] = float(matrix_rank(c))
-            r['ss'] = nsum(y*b.T)*Nc
+            r['df'] = float(prod([matrix_rank(sc) for sc in c]))
+            r['ss'] = p['yb']*Nc
             r['mss'] = r['ss']/r['df']
 
             self[tuple(efs)]=r
@@ -788,7 +1251,8 @@ class Anova(OrderedDict):
                 ss_error -= self[tuple(efs)]['ss']
                 dfe -= self[tuple(efs)]['df']
 
-        # calculate F, p, and standard errors
+        # calculate F and standard errors
+        effects = []
         for i in xrange(1,len(factors)+1):
             for efs in _xunique_combinations(factors, i):
 
@@ -798,7 +1262,6 @@ class Anova(OrderedDict):
                 r['dfe'] = dfe
                 r['mse'] = ss_error / dfe
                 r['F'] = r['mss']/r['mse']
-                r['p'] = scipy.stats.f(r['df'],r['dfe']).sf(r['F'])
 
                 # calculate Generalized eta effect size
                 r['eta'] = r['ss']/(r['ss']+r['sse'])
@@ -806,23 +1269,18 @@ class Anova(OrderedDict):
                 # calculate observations per cell
                 r['obs']  = len(conditions[self.sub])
                 r['obs'] /= prod([len(conditions[f])*1. for f in efs])
-                
-                # calculate Loftus and Masson standard errors
-                r['critT'] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-                r['se'] = sqrt(r['mse']/r['obs'])*r['critT']/1.96
-                r['ci'] = sqrt(r['mse']/r['obs'])*r['critT']
-
-                # calculate non-centrality and observed power
-                dstd = std(self.df[self.dv])
-                dmu  = mean(self.df[self.dv])
-                
+
+                # calculate non-centrality
                 p_eta2 = r['ss']/(r['ss']+r['sse'])
                 r['lambda'] = (p_eta2/(1-p_eta2))*r['obs']
                 
-                r['power'] = observed_power( r['df'], r['dfe'], r['lambda'] )
-                
                 # record to dict
                 self[tuple(efs)] = r
+                effects.append(tuple(efs))
+
+        # calculate p, Loftus and Masson standard errors, and
+        # observed power
+        self._run_tests(effects)
             
     def _mixed(self):
         ## Programmer note:
@@ -846,16 +1304,6 @@ class Anova(OrderedDict):
         if shape(pt_asarray,1) != Nd:
             raise Exception('data has %d conditions; design only %d',
                             shape(pt_asarray,1),Nd)
-        
-        sc,sy = {},{}
-        for f in xrange(1,Nf+1):
-            # create main effect/interaction component contrasts
-            sc[(f,1)] = ones((D[f-1],1))
-            sc[(f,2)] = detrend(eye(D[f-1]),type='constant')
-
-            # create main effect/interaction components for means
-            sy[(f,1)] = ones((D[f-1],1))/D[f-1]
-            sy[(f,2)] = eye(D[f-1])
 
         # Loop through effects
         # Do fancy calculations
@@ -867,47 +1315,44 @@ class Anova(OrderedDict):
             efs = asarray(factors)[Nf-1-where(asarray(cw)==2.)[0][::-1]]
             r={}
         
-            # create full contrasts
-            c = sc[(1,cw[Nf-1])];  
-            for f in xrange(2,Nf+1):
-                c = kron(c, sc[(f,cw[Nf-f])])
+            # contrast components, the full contrast is their
+            # Kronecker product
+            c, cy = _effect_contrasts(D, cw)
                 
-            Nc = shape(c,1) # Number of conditions in effect
+            Nc = prod([shape(sc,1) for sc in c]) # Number of conditions in effect
             No = Nd/Nc*1.   # Number of observations per condition in effect
 
-            # project data to contrast sub-space
-            y = dot(pt_asarray,c)
+            # projections of the data to the contrast sub-space
+            # (see _project_effects)
+            p = self._proj[e-1]
 
             # calculate component means
-            cy = sy[(1, cw[Nf-1])]
-            for f in xrange(2,Nf+1):
-                cy = kron(cy, sy[(f,cw[Nf-f])] )
-        
-            r['y2'] = mean(dot(pt_asarray,cy),0)
+            r['y2'] = p['y2']
             
             # df for effect
             r['df'] =  prod([len(conditions[f])-1. for f in efs])
 
-            # calculate Greenhouse-Geisser & Huynh-Feldt epsilons
-            r['eps_gg'] = epsGG(y, r['df'])
-            r['eps_hf'] = epsHF(y, r['df'])
-            r['eps_lb'] = epsLB(y, r['df'])
+            # Greenhouse-Geisser & Huynh-Feldt epsilons
+            r['eps_gg'], r['eps_hf'], r['eps_lb'] = \
+                         p['eps_gg'], p['eps_hf'], p['eps_lb']
             
             # calculate ss, sse, mse, mss, F, p, and standard errors
-            b = mean(y,0)
-            
             # Sphericity assumed
-            r['ss']  = nsum(y*b.T)
+            r['ss']  = p['yb']
             r['ss'] /= No/(prod([len(conditions[f]) for f in bfactors])*1.)
             r['mss'] = r['ss']/r['df']
             
             self[tuple(efs)] = r
 
         # calculate sse, dfe, and mse for between subjects effects
+        # the subject and within effect means are marginalized from the
+        # cells of pt_asarray (weighted by their number of observations)
+        # instead of pivoting df again
+        pt_weights = self.pt_weights
+        
         dfe_sum   = 0. # for df trim
         ss_total  = nsum((pt_asarray-mean(pt_asarray))**2)
-        sub_means = df.pivot(self.dv, cols=[self.sub])
-        sub_means = array(sub_means, dtype=numpy.float64)
+        sub_means = _cell_means(pt_asarray, pt_weights, D, range(Nf))
         
         ss_bsub  =  nsum((sub_means-mean(pt_asarray))**2)
         ss_bsub *= (prod([len(conditions[f]) for f in wfactors])*1.)
@@ -953,8 +1398,10 @@ class Anova(OrderedDict):
                 efs+=[self.sub]
                 
                 r={}
-                tmp=array(df.pivot(self.dv, cols=efs[:-1], rows=[self.sub]),
-                          dtype=numpy.float64).flatten()
+                tmp=_cell_means(pt_asarray, pt_weights, D,
+                                [i for i,f in enumerate(factors)
+                                 if f not in efs]).flatten()
+                tmp=tmp[~isnan(tmp)]
                 r['ss']  = nsum((tmp-mean(pt_asarray))**2)
                 r['ss'] *= prod([len(conditions[f]) for f in wfactors
                                  if f not in efs])
@@ -996,7 +1443,6 @@ class Anova(OrderedDict):
                 r['dfe'] = self[(self.sub,)]['dfe']
                 r['mse'] = r['sse']/r['dfe']
                 r['F'] = r['mss']/r['mse']
-                r['p'] = scipy.stats.f(r['df'],r['dfe']).sf(r['F'])
                 
                 # calculate Generalized eta effect size 
                 r['eta'] = r['ss']/(r['ss']+ss_err_tot)
@@ -1005,25 +1451,20 @@ class Anova(OrderedDict):
                 r['obs'] = len(conditions[self.sub])
                 r['obs']/= prod([len(conditions[f])*1. for f in efs])
 
-                # calculate Loftus and Masson standard errors
-                r['critT'] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-                r['se'] = sqrt(r['mse']/r['obs'])*r['critT']/1.96
-                r['ci'] = sqrt(r['mse']/r['obs'])*r['critT']
-
-                # calculate non-centrality and observed power
-                dstd=std(self.df[self.dv])
-                dmu  = mean(self.df[self.dv])
-
+                # calculate non-centrality
                 p_eta2 = r['ss']/(r['ss']+r['sse'])
                 r['lambda'] = (p_eta2/(1-p_eta2))*r['obs']
                 
-                r['power'] = observed_power( r['df'], r['dfe'], r['lambda'] )
-                
                 # record to dict
                 self[tuple(efs)] = r                
+
+        # calculate p, Loftus and Masson standard errors, and
+        # observed power
+        self._run_tests([tuple(efs) for efs in self.befs])
         
         # calculate mse, dfe, sse, F, p, and standard errors
         # within subjects effects
+        effects = []
         for i in xrange(1,len(factors)+1):
             for efs in _xunique_combinations(factors, i):
                 
@@ -1036,7 +1477,6 @@ class Anova(OrderedDict):
                     r['sse'] = r2['ss']
                     r['mse'] = r2['mss']
                     r['F'] = r['mss']/r['mse']
-                    r['p'] = scipy.stats.f(r['df'],r['dfe']).sf(r['F'])
                     
                     # calculate Generalized eta effect size 
                     r['eta'] = r['ss']/(r['ss']+ss_err_tot)
@@ -1046,22 +1486,10 @@ class Anova(OrderedDict):
                     r['obs'] *= prod([len(conditions[f])*1. for f in factors])
                     r['obs'] /= prod([len(conditions[f])*1. for f in efs])
 
-                    # calculate Loftus and Masson standard errors
-                    r['critT'] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-                    r['se'] = sqrt(r['mse']/r['obs'])*r['critT']/1.96
-                    r['ci'] = sqrt(r['mse']/r['obs'])*r['critT']
-
-                    # calculate non-centrality and observed power
-                    dave=array(df.pivot(self.dv,cols=efs),
-                               dtype=numpy.float64).flatten()
-                    dstd=std(self.df[self.dv])
-                    dmu  = mean(self.df[self.dv])
-
+                    # calculate non-centrality
                     p_eta2 = r['ss']/(r['ss']+r['sse'])
                     r['lambda'] = (p_eta2/(1-p_eta2))*r['obs']
 
-                    r['power']=observed_power( r['df'], r['dfe'], r['lambda'] )
-
                     # Greenhouse-Geisser, Huynh-Feldt, Lower-Bound
                     for x in ['_gg','_hf','_lb']:
                         r['df%s'%x] = r['df']*r['eps%s'%x]
@@ -1069,21 +1497,16 @@ class Anova(OrderedDict):
                         r['mss%s'%x] = r['ss']/r['df%s'%x]
                         r['mse%s'%x] = r['sse']/r['dfe%s'%x]
                         r['F%s'%x] = r['mss%s'%x]/r['mse%s'%x]
-                        r['p%s'%x] = scipy.stats.f(r['df%s'%x],r['dfe%s'%x]).sf(r['F%s'%x])
                         r['obs%s'%x] = r['obs']
-                        r['critT%s'%x] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-                        r['se%s'%x] = sqrt(r['mse']/r['obs%s'%x])*\
-                                         r['critT%s'%x]/1.96
-                        r['ci%s'%x] = sqrt(r['mse']/r['obs%s'%x])*\
-                                         r['critT%s'%x]
-
-                        # calculate non-centrality and observed power
                         r['lambda%s'%x]=r['lambda']
-                        r['power%s'%x]=observed_power( r['df'], r['dfe'], r['lambda'],
-                                                       eps=r['eps%s'%x])
 
                     # record to dict
                     self[tuple(efs)]=r
+                    effects.append(tuple(efs))
+
+        # calculate p, Loftus and Masson standard errors, and
+        # observed power
+        self._run_tests(effects, ['', '_gg', '_hf', '_lb'])
                
     def _within(self):
         factors = self.wfactors
@@ -1101,16 +1524,7 @@ class Anova(OrderedDict):
         if shape(pt_asarray,1) != Nd:
             raise Exception('data has %d conditions; design only %d',
                             shape(pt_asarray,1),Nd)
-        
-        sc,sy = {},{}
-        for f in xrange(1,Nf+1):
-            # create main effect/interaction component contrasts
-            sc[(f,1)] = ones((D[f-1],1))
-            sc[(f,2)] = detrend(eye(D[f-1]),type='constant')
-
-            # create main effect/interaction components for means
-            sy[(f,1)] = ones((D[f-1],1))/D[f-1]
-            sy[(f,2)] = eye(D[f-1])
+
             
         # Calulate dfs and dfes
         dfe_sum=0.
@@ -1134,37 +1548,29 @@ class Anova(OrderedDict):
             efs = asarray(factors)[Nf-1-where(asarray(cw)==2.)[0][::-1]]
             r=self[tuple(efs)] # unpack dictionary
         
-            # create full contrasts
-            c = sc[(1,cw[Nf-1])];  
-            for f in xrange(2,Nf+1):
-                c = kron(c, sc[(f,cw[Nf-f])])
+            # contrast components, the full contrast is their
+            # Kronecker product
+            c, cy = _effect_contrasts(D, cw)
                 
-            Nc = shape(c,1) # Number of conditions in effect
+            Nc = prod([shape(sc,1) for sc in c]) # Number of conditions in effect
             No = Nd/Nc*1.   # Number of observations per condition in effect
             
-            # project data to contrast sub-space
-            y  = dot(pt_asarray,c)
-            nc = shape(y,1)
+            # projections of the data to the contrast sub-space
+            # (see _project_effects)
+            p = self._proj[e-1]
 
             # calculate component means
-            cy = sy[(1, cw[Nf-1])]
-            for f in xrange(2,Nf+1):
-                cy = kron(cy, sy[(f,cw[Nf-f])] )
-        
-            r['y2'] = mean(dot(pt_asarray,cy),0)
+            r['y2'] = p['y2']
             
-            # calculate Greenhouse-Geisser & Huynh-Feldt epsilons
-            r['eps_gg'] = epsGG(y, r['df'])
-            r['eps_hf'] = epsHF(y, r['df'])
-            r['eps_lb'] = epsLB(y, r['df'])
+            # Greenhouse-Geisser & Huynh-Feldt epsilons
+            r['eps_gg'], r['eps_hf'], r['eps_lb'] = \
+                         p['eps_gg'], p['eps_hf'], p['eps_lb']
             
             # calculate ss, sse, mse, mss, F, p, and standard errors
-            b = mean(y,0)
-            
             # Sphericity assumed
             r['dfe'] -= (r['dfe']/dfe_sum) * self.dftrim
-            r['ss']   =  nsum(y*b.T)
-            r['mse']  = (nsum(diag(dot(y.T,y)))-r['ss'])/r['dfe']
+            r['ss']   =  p['yb']
+            r['mse']  = (p['yy']-r['ss'])/r['dfe']
             r['sse']  =  r['dfe']*r['mse']
 
             r['ss'] /=  No
@@ -1173,24 +1579,13 @@ class Anova(OrderedDict):
             r['mse'] =  r['sse']/r['dfe']
             
             r['F'] =  r['mss']/r['mse']
-            r['p'] =  scipy.stats.f(r['df'],r['dfe']).sf(r['F'])
             
             # calculate observations per cell
             r['obs'] =  Nr*No
 
-            # calculate Loftus and Masson standard errors
-            r['critT'] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-            r['se'] = sqrt(r['mse']/r['obs'])*r['critT']/1.96
-            r['ci'] = sqrt(r['mse']/r['obs'])*r['critT']
-
-            # calculate non-centrality and observed power
-            dstd = std(self.df[self.dv])
-            dmu  = mean(self.df[self.dv])
-            
+            # calculate non-centrality
             p_eta2 = r['ss']/(r['ss']+r['sse'])
             r['lambda'] = (p_eta2/(1-p_eta2))*r['obs']
-                
-            r['power'] = observed_power(r['df'], r['dfe'], r['lambda'])
 
             # Greenhouse-Geisser, Huynh-Feldt, Lower-Bound
             for x in ['_gg','_hf','_lb']:
@@ -1199,20 +1594,16 @@ class Anova(OrderedDict):
                 r['mss%s'%x] = r['ss']/r['df%s'%x]
                 r['mse%s'%x] = r['sse']/r['dfe%s'%x]
                 r['F%s'%x] = r['mss%s'%x]/r['mse%s'%x]
-                r['p%s'%x] = scipy.stats.f(r['df%s'%x],r['dfe%s'%x]).sf(r['F%s'%x])
                 r['obs%s'%x] = Nr*No
-                r['critT%s'%x] = abs(scipy.stats.t(r['dfe']).ppf(.05/2.))
-                r['se%s'%x] = sqrt(r['mse']/r['obs%s'%x])*r['critT%s'%x]/1.96
-                r['ci%s'%x] = sqrt(r['mse']/r['obs%s'%x])*r['critT%s'%x]
-
-                # calculate non-centrality and observed power
                 r['lambda%s'%x]=r['lambda']
-                r['power%s'%x]=observed_power( r['df'], r['dfe'], r['lambda'] ,eps=r['eps%s'%x])
-                
                 
             # record to dict
             self[tuple(efs)]=r
 
+        # calculate p, Loftus and Masson standard errors, and
+        # observed power
+        self._run_tests(self.keys(), ['', '_gg', '_hf', '_lb'])
+
         # Calculate parameters need to calculate effect size estimates
         sub_means   =  mean(pt_asarray, axis=1)
         ss_subject  =  nsum((sub_means-mean(pt_asarray))**2)
@@ -1224,6 +1615,71 @@ class Anova(OrderedDict):
             r['eta']   = r['ss']/(ss_subject + ss_err_tot)
             self[tuple(efs)]=r
 
+    def _run_tests(self, effects, variants=None):
+        """
+        Calculates p, critT, se, ci, and power of the effects with one
+        vectorized call per distribution.
+
+        The results must hold df, dfe, F, mse, obs, and lambda. Each
+        variant suffix (e.g. '_gg') also needs eps, df, dfe, F, and obs
+        with the suffix. critT, se, and power of the variants use the
+        uncorrected df and dfe. If self._deferred is a list the effects
+        are added to it instead (run_many tests all of the dependent
+        variables together).
+        """
+        if not self._tests:
+            return
+        
+        if variants == None:
+            variants = ['']
+
+        rs = [(self[efs], x) for efs in effects for x in variants]
+        if self._deferred is not None:
+            self._deferred.extend(rs)
+        else:
+            _test_effects(rs)
+
+    def _permutation_test(self, permutations, n_jobs=1, seed=None):
+        """
+        Calculates the permutation p-values ('p_perm') of the effects.
+        Effects of only between subjects factors are tested by shuffling
+        the subjects across the between subjects conditions, the others
+        by shuffling the within subjects conditions of each subject.
+        """
+        bfactors = self.bfactors
+        factors = self.wfactors+bfactors
+
+        effects = []
+        for i in xrange(1,len(factors)+1):
+            for efs in _xunique_combinations(factors, i):
+                effects.append(tuple(efs))
+                
+        between = [efs for efs in effects
+                   if all([f in bfactors for f in efs])]
+        within = [efs for efs in effects if efs not in between]
+        groups = [(True, within), (False, between)]
+        groups = [(w, efs) for (w, efs) in groups if len(efs) > 0]
+
+        # the workers only need the pivoted data and the degrees of
+        # freedom of the observed analysis (see _permutation_F)
+        X = array(self.pt, dtype=numpy.float64)
+        C = self.pt_counts
+        if C is not None:
+            C = array(C, dtype=numpy.float64)
+        dfs = dict((k, (r.get('df'), r.get('dfe'))) for k,r in self.items())
+        payload = (X, C, mean(self.df[self.dv]), self.D,
+                   self._effect_codes(), self.wfactors, bfactors,
+                   self.sub, dfs, groups)
+        null = map_permutations(_anova_permutations, payload,
+                                permutations, n_jobs, seed)
+
+        effects = [efs for (w, L) in groups for efs in L]
+        p = pvalue([self[efs]['F'] for efs in effects], null)
+        for efs, p_perm in zip(effects, p):
+            self[efs]['p_perm'] = p_perm
+
+        self.permutations = permutations
+
     def _num2binvec(self,d,p=0):
         """Sub-function to code all main effects/interactions"""
         d,p=float(d),float(p)
@@ -1237,7 +1693,7 @@ class Anova(OrderedDict):
                 b.insert(0,float(rem(d,2.)))
                 d=floor(d/2.)
 
-        return list(array(list(zeros((p-len(b))))+b)+1.)
+        return list(array(list(zeros(int(p-len(b))))+b)+1.)
                           
 ##    def output2html(self, fname, script=''):
 ##        if self.measure == '':
@@ -1517,11 +1973,7 @@ class Anova(OrderedDict):
                      ''.join(['%s * '%f for f in efs])[:-3]
                 html.add(h(a(txt,name='2_'+md5sum(txt))))
 
-                ys=self.df.pivot(self.dv,rows=efs,aggregate='tolist')
-                names=ys.rnames
-                
-                dave=array([   mean(y[0]) for y in ys ])
-                dsem=array([ stderr(y[0]) for y in ys ])
+                names, dave, dsem = self._marginal_means(efs)
 
                 dlowr=dave-(dsem*1.96)
                 dhghr=dave+(dsem*1.96)
@@ -1532,7 +1984,7 @@ class Anova(OrderedDict):
                 tbodys=[[]]
 
                 for i,name in enumerate(names):
-                    cs=[c[1] for c in name]
+                    cs=list(name)
                     tbodys[-1].append(f2s(cs+[dave[i],dsem[i],
                                               dlowr[i],dhghr[i]]))
 
@@ -1860,6 +2312,59 @@ class Anova(OrderedDict):
 
         return ''.join(s)
 
+    def _marginal_means(self, efs):
+        """
+        Returns the conditions, means, and standard errors of the
+        marginal cells of the factors in efs (see Marginals).
+
+        The factors are coded once. The counts, sums, and sums of
+        squares of the marginal cells of an effect are then binned
+        in a single pass over the coded data and cached for the text
+        and html reports.
+        """
+        efs = tuple(efs)
+        if efs in self._emms:
+            return self._emms[efs]
+        
+        factors = self.wfactors+self.bfactors
+        
+        if self._coded == None:
+            x = self.df[self.dv]
+            valid = ~numpy.ma.getmaskarray(x)
+            x = asarray(x, dtype=numpy.float64)[valid]
+
+            levels, codes = [], []
+            for f in factors:
+                L, c = numpy.unique(asarray(self.df[f])[valid],
+                                    return_inverse=True)
+                levels.append(L)
+                codes.append(c)
+
+            self._coded = (x, levels, codes)
+
+        x, levels, codes = self._coded
+        levels = [levels[factors.index(f)] for f in efs]
+        codes = [codes[factors.index(f)] for f in efs]
+
+        # the sums are accumulated in the order of the rows (like
+        # the sqlite3 pivots did) so the means are reproducible
+        D = [len(L) for L in levels]
+        idx = numpy.ravel_multi_index(codes, D)
+        N = numpy.bincount(idx, minlength=int(prod(D)))
+        S = numpy.bincount(idx, x, N.size)
+        
+        dave = S/where(N > 0, N, 1.)
+        SS = numpy.bincount(idx, (x-dave[idx])**2, N.size)
+        
+        names = list(itertools.product(*levels))
+        names = [name for name, n in zip(names, N) if n > 0]
+
+        dave, SS, N = dave[N > 0], SS[N > 0], N[N > 0]*1.
+        dsem = sqrt(SS/where(N > 1, N-1., numpy.nan)/N)
+
+        self._emms[efs] = (names, dave, dsem)
+        return self._emms[efs]
+
     def _summary_str(self, factors):
         
         # Write Summary Means
@@ -1869,11 +2374,7 @@ class Anova(OrderedDict):
                 s.append('Estimated Marginal Means for ' + \
                      ''.join(['%s * '%f for f in efs])[:-3] + '\n')
 
-                ys=self.df.pivot(self.dv,rows=efs,aggregate='tolist')
-                names=ys.rnames
-                
-                dave=array([   mean(y.flatten()) for y in ys ])
-                dsem=array([ stderr(y.flatten()) for y in ys ])
+                names, dave, dsem = self._marginal_means(efs)
 
                 dlowr=dave-(dsem*1.96)
                 dhghr=dave+(dsem*1.96)
@@ -1888,7 +2389,7 @@ class Anova(OrderedDict):
                                '95% Upper Bound'])
                 
                 for i,name in enumerate(names):
-                    cs=[c[1] for c in name]
+                    cs=list(name)
                     tt.add_row(cs+[dave[i],dsem[i],dlowr[i],dhghr[i]])
 
                 s.append(tt.draw())
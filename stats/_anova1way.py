@@ -14,7 +14,7 @@ elif sys.version_info[0] == 3:
 
 # std lib
 import math
-from collections import Counter,OrderedDict
+from collections import Counter,OrderedDict,Mapping
 from copy import copy
 
 # third party
@@ -25,8 +25,101 @@ import numpy as np
 from pyvttbl.stats import _stats
 from pyvttbl.stats._noncentral import ncfcdf
 from pyvttbl.stats.qsturng import qsturng, psturng
+from pyvttbl.stats._permutation import map_permutations, pvalue
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
+
+def _anova1way_permutations(args):
+    """
+    Returns the F ratios of permutations of the group labels of the
+    pooled observations. Called through map_permutations by
+    Anova1way.run.
+    """
+    (x, ns), batches = args
+
+    N = len(x)
+    dfbn = len(ns) - 1.
+    dfwn = N - len(ns)
+    starts = np.cumsum([0] + [int(n) for n in ns[:-1]])
+    sstot = np.sum((x - np.mean(x))**2)
+    corr = np.sum(x)**2 / N
+    
+    F = []
+    for seed, size in batches:
+        rs = np.random.RandomState(seed)
+        X = x[np.argsort(rs.rand(size, N), axis=1)]
+        sums = np.add.reduceat(X, starts, axis=1)
+        ssbn = np.sum(sums**2 / ns, axis=1) - corr
+        F.append((ssbn/dfbn) / ((sstot-ssbn)/dfwn))
+
+    return np.concatenate(F)
+
+class _PairwiseTable(Mapping):
+    """
+    Read-only dict-like view of the Tukey HSD comparisons. The
+    statistics of the pairs are kept in upper triangular arrays and
+    the dict of a pair (x, y), with x <= y, is built when it is
+    requested.
+
+    |   The p-values of all of the pairs are found with one call of
+        psturng the first time they are requested.
+    """
+    def __init__(self, names, abs_diff, q, sig, **kwds):
+        self.names = names
+        self.abs_diff = abs_diff
+        self.q = q
+        self.sig = sig
+        self.kwds = kwds
+        self._index = dict((x, i) for i, x in enumerate(names))
+        self._p = None
+
+    @property
+    def p(self):
+        """upper triangular array of the p-values of the pairs"""
+        if self._p is None:
+            # p-values of the distinct q statistics
+            k = len(self.names)
+            iu = np.triu_indices(k)
+            uq, inv = np.unique(self.q[iu], return_inverse=True)
+            self._p = np.zeros((k, k))
+            self._p[iu] = np.atleast_1d(psturng(uq, self.kwds['q_k'],
+                                                self.kwds['q_df']))[inv]
+        return self._p
+
+    def __getitem__(self, key):
+        x, y = key
+        i, j = self._index[x], self._index[y]
+        if i > j:
+            raise KeyError(key)
+
+        d = dict(q=self.q[i,j],
+                 p=self.p[i,j],
+                 sig=self.sig[i,j],
+                 abs_diff=self.abs_diff[i,j])
+        d.update(self.kwds)
+        return d
+
+    def __iter__(self):
+        for i, x in enumerate(self.names):
+            for y in self.names[i:]:
+                yield (x, y)
+
+    def __len__(self):
+        n = len(self.names)
+        return n*(n+1)//2
+
+    def __contains__(self, key):
+        try:
+            x, y = key
+            return self._index[x] <= self._index[y]
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def has_key(self, key):
+        return key in self
+
+    def __repr__(self):
+        return repr(dict(self.items()))
 	    
 class Anova1way(OrderedDict):
     def __init__(self, *args, **kwds):
@@ -70,12 +163,18 @@ class Anova1way(OrderedDict):
 
     def run(self, list_of_lists, val='Measure',
             factor='Factor', conditions_list=None,
-            posthoc='tukey', alpha=0.05):
+            posthoc='tukey', alpha=0.05,
+            permutations=0, n_jobs=1, seed=None):
         """
         performs a one way analysis of variance on the data in
         list_of_lists. Each sub-list is treated as a group. factor
         is a label for the independent variable and conditions_list
         is a list of labels for the different treatment groups.
+
+        If permutations > 0 a non-parametric 'p_perm' is calculated
+        from that many random permutations of the group labels. The
+        permutations are run by n_jobs processes and are reproducible
+        given seed.
         """
         self.L = list_of_lists
         self.val = val
@@ -113,6 +212,14 @@ class Anova1way(OrderedDict):
         self['power'] = 1.-ncfcdf(scipy.stats.f(dfbn,dfwn).ppf(1.-alpha),
                                   dfbn,dfwn,self['lambda'])
 
+        if permutations > 0:
+            payload = (np.array(_flatten(self.L), dtype=np.float64),
+                       np.array(ns, dtype=np.float64))
+            null = map_permutations(_anova1way_permutations, payload,
+                                    permutations, n_jobs, seed)
+            self['p_perm'] = pvalue(f, null)
+            self['permutations'] = permutations
+
         o_list_of_lists = _stats.obrientransform(list_of_lists)        
         o_f, o_prob, o_ns, o_means, o_vars, o_ssbn, o_sswn, o_dfbn, o_dfwn = \
            _stats.lF_oneway(o_list_of_lists)
@@ -144,11 +251,9 @@ class Anova1way(OrderedDict):
 
     def _tukey(self):
         # http://www.utdallas.edu/~herve/abdi-NewmanKeuls2010-pretty.pdf
-        # put means into a dict
-        d = dict([(k,v) for k,v in zip(self.conditions_list, self['mus'])])
-
-##        # calculate the number of comparisons
-##        s = sum(range(len(d)))
+        names = sorted(self.conditions_list)
+        d = dict(zip(self.conditions_list, self['mus']))
+        mus = np.array([d[x] for x in names])
 
         # calculate the number of observations per group
         s = min(self['ns'])
@@ -156,81 +261,68 @@ class Anova1way(OrderedDict):
         # calculate critical studentized range q statistic
         k = len(d)
         df = sum(self['ns']) - k
-        q_crit10 = qsturng(.9, k, df)
-        q_crit05 = qsturng(.95, k, df)
-        q_crit01 = qsturng(.99, k, df)
+        q_crit10, q_crit05, q_crit01 = \
+                  [float(q) for q in qsturng([.9, .95, .99], k, df)]
 
-        # run correlations
-        multtest = {}
+        # q statistics of the upper triangle (including the diagonal)
+        abs_diff = np.triu(np.abs(mus[:,None] - mus[None,:]))
+        q = abs_diff / math.sqrt(self['mswn']*(1./s))
         
-        for x in sorted(self.conditions_list):
-            for y in sorted(self.conditions_list):
-                if not multtest.has_key((y,x)):
-                    abs_diff = abs(d[x]-d[y])
-                    q = abs_diff / math.sqrt(self['mswn']*(1./s))
-                    sig = 'ns'
-                    if  q > q_crit10:
-                        sig = '+'
-                    if q > q_crit05:
-                        sig = '*'
-                    if q > q_crit01:
-                        sig += '*'
-                    multtest[(x,y)] = dict(q=q,
-                                           sig=sig,
-                                           abs_diff=abs(d[x]-d[y]),
-                                           q_crit10=q_crit10,
-                                           q_crit05=q_crit05,
-                                           q_crit01=q_crit01,
-                                           q_k=k,
-                                           q_df=df)
-
-        self.multtest = multtest
+        sig = np.array(['ns', '+', '*', '**'])
+        sig = sig[(q > q_crit10)*1 + (q > q_crit05) + (q > q_crit01)]
+        
+        self.multtest = _PairwiseTable(names, abs_diff, q, sig,
+                                       q_crit10=q_crit10,
+                                       q_crit05=q_crit05,
+                                       q_crit01=q_crit01,
+                                       q_k=k,
+                                       q_df=df)
 
     def _snk(self):
         # http://www.utdallas.edu/~herve/abdi-NewmanKeuls2010-pretty.pdf
-        # put means into a dict
-        d = dict([(k,v) for k,v in zip(self.conditions_list, self['mus'])])
+        names = sorted(self.conditions_list)
+        d = dict(zip(self.conditions_list, self['mus']))
+        mus = np.array([d[x] for x in names])
 
         # calculate the number of observations per group
         s = min(self['ns'])
 
-        # figure out differences between pairs
-        L = {}
-        for x in sorted(self.conditions_list):
-            for y in sorted(self.conditions_list):
-                if not L.has_key((y,x)) and x!=y:
-                    L[(x,y)] = abs(d[x]-d[y])
+        # figure out differences between pairs, largest first (ties
+        # are in the order of the pairs)
+        I, J = np.triu_indices(len(names), 1)
+        abs_diff = np.abs(mus[I] - mus[J])
+        order = np.lexsort((np.arange(len(I)), -abs_diff))
+        I, J, abs_diff = I[order], J[order], abs_diff[order]
 
-        L = sorted(list(L.items()), key=lambda t: t[1], reverse=True)
-
-        # calculate critical studentized range q statistic
+        # calculate critical studentized range q statistic; the range
+        # steps down after each distinct difference
         k = len(d)
         df = sum(self['ns']) - k
+        ks = k - np.concatenate(([0], np.cumsum(abs_diff[1:] !=
+                                                abs_diff[:-1])))
         
-        multtest = []
-        for i,(pair,abs_diff) in enumerate(L):
-##            print (i,pair,abs_diff,k)
-            
-            if k>1:
-                q = abs_diff / math.sqrt(self['mswn']*(1./s))
-                p = psturng(q, k, df)
-                sig = 'ns'
-                if  p < .1  :  sig = '+'
-                if p < .05  :  sig = '*'
-                if p < .01  :  sig = '**'
-                if p < .001 :  sig = '***'
-                multtest.append([pair, i+1, abs_diff, q, k, df, p, sig])
-            else:
-                multtest.append([pair, i+1, abs_diff, np.NAN, np.NAN, np.NAN, np.NAN, sig])
-
-            try:
-                if L[i][1] != L[i+1][1]:
-                    k -= 1
-            except:
-                pass
+        q = abs_diff / math.sqrt(self['mswn']*(1./s))
+        p = np.empty(len(q))
+        p.fill(np.nan)
+        stepped = ks > 1
+        if np.any(stepped):
+            p[stepped] = psturng(q[stepped], ks[stepped], df)
 
-            last_diff = abs_diff
+        sigs = np.array(['ns', '+', '*', '**', '***'])
+        with np.errstate(invalid='ignore'):
+            sigs = sigs[(p < .1)*1 + (p < .05) + (p < .01) + (p < .001)]
 
+        multtest = []
+        sig = 'ns'
+        for i in _xrange(len(q)):
+            pair = (names[I[i]], names[J[i]])
+            if stepped[i]:
+                sig = sigs[i]
+                multtest.append([pair, i+1, abs_diff[i], q[i],
+                                 int(ks[i]), df, p[i], sig])
+            else:
+                multtest.append([pair, i+1, abs_diff[i],
+                                 np.NAN, np.NAN, np.NAN, np.NAN, sig])
 
         self.multtest = multtest
         
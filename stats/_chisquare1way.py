@@ -18,11 +18,13 @@ from collections import Counter,OrderedDict
 from copy import copy
 
 # third party
+import numpy as np
 import scipy
 
 # included modules
 from pyvttbl.stats import _stats
 from pyvttbl.stats._noncentral import ncx2cdf
+from pyvttbl.stats._permutation import map_permutations, pvalue
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
 
@@ -74,6 +76,23 @@ def _str(x, dtype='a', n=3):
             else:
                 return '%.*f'%(n, f)
 
+def _chisquare1way_simulations(args):
+    """
+    Returns the Pearson chi-squares of random (multinomial) counts with
+    the observed N and the expected proportions. Called through
+    map_permutations by ChiSquare1way.run.
+    """
+    (N, expected), batches = args
+
+    p = expected/np.sum(expected)
+    chisq = []
+    for seed, size in batches:
+        rs = np.random.RandomState(seed)
+        X = rs.multinomial(N, p, size)
+        chisq.append(np.sum((X - expected)**2/expected, 1))
+
+    return np.concatenate(chisq)
+
 class ChiSquare1way(OrderedDict):
     """1-way Chi-Square Test"""
     def __init__(self, *args, **kwds):
@@ -101,9 +120,17 @@ class ChiSquare1way(OrderedDict):
             super(ChiSquare1way, self).__init__()
 
     def run(self, observed, expected=None, conditions_list=None,
-            measure='Measure', alpha=0.05):
+            measure='Measure', alpha=0.05,
+            simulate=0, n_jobs=1, seed=None):
         """
-        
+        runs a 1-way chi square on the observed counts. If expected is
+        None the counts are expected to be equal.
+
+        If simulate > 0 a Monte Carlo p-value of the Pearson chi-square
+        ('p_sim') is calculated from that many random samples of the
+        observed size drawn with the expected proportions. The
+        simulations are run by n_jobs processes and are reproducible
+        given seed. Use it when the expected counts are small.
         """
         chisq, prob, df, expected = _stats.lchisquare(observed, expected)
         try:
@@ -135,6 +162,13 @@ class ChiSquare1way(OrderedDict):
         self.observed = observed
         self.expected = expected
 
+        if simulate > 0:
+            payload = (int(self['N']), np.array(expected, dtype=np.float64))
+            null = map_permutations(_chisquare1way_simulations, payload,
+                                    simulate, n_jobs, seed)
+            self['p_sim'] = float(pvalue(chisq, null))
+            self['simulations'] = simulate
+
         p_observed = [v/float(self['N']) for v in observed]
         p_expected = [v/float(self['N']) for v in expected]
 
@@ -161,17 +195,23 @@ class ChiSquare1way(OrderedDict):
         tt_s.add_row(['Expected'] + self.expected)
 
         # TESTS
+        sim = self.has_key('p_sim')
+        
         tt_a = TextTable(max_width=0)
-        tt_a.set_cols_dtype(['t', 'a', 'a', 'a'])
-        tt_a.set_cols_align(['l', 'r', 'r', 'r'])
+        tt_a.set_cols_dtype(['t', 'a', 'a', 'a'] + ['a']*sim)
+        tt_a.set_cols_align(['l', 'r', 'r', 'r'] + ['r']*sim)
         tt_a.set_deco(TextTable.HEADER)
 
-        tt_a.header([' ', 'Value', 'df', 'P'])
+        header = [' ', 'Value', 'df', 'P']
+        if sim:
+            header.append('Monte Carlo P\n(%i samples)'%self['simulations'])
+        tt_a.header(header)
         tt_a.add_row(['Pearson Chi-Square',
-                      self['chisq'], self['df'], self['p']])
+                      self['chisq'], self['df'], self['p']] +
+                     [self.get('p_sim')]*sim)
         tt_a.add_row(['Likelihood Ratio',
-                      self['lnchisq'], self['lndf'], self['lnp']])
-        tt_a.add_row(['Observations', self['N'],'',''])
+                      self['lnchisq'], self['lndf'], self['lnp']] + ['']*sim)
+        tt_a.add_row(['Observations', self['N'],'',''] + ['']*sim)
 
         # POWER
         tt_p = TextTable(max_width=0)
@@ -18,14 +18,32 @@ from collections import Counter,OrderedDict
 from copy import copy
 
 # third party
+import numpy as np
 import scipy
 
 # included modules
 from pyvttbl.stats import _stats
 from pyvttbl.stats._noncentral import ncx2cdf
+from pyvttbl.stats._permutation import map_permutations, pvalue, random_tables
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
 
+def _chisquare2way_simulations(args):
+    """
+    Returns the Pearson chi-squares of random tables with the row and
+    column totals of the observed table. Called through
+    map_permutations by ChiSquare2way.run.
+    """
+    (row_tots, col_tots, expected), batches = args
+
+    chisq = []
+    for seed, size in batches:
+        rs = np.random.RandomState(seed)
+        T = random_tables(rs, row_tots, col_tots, size)
+        chisq.append(np.sum(np.sum((T - expected)**2/expected, 2), 1))
+
+    return np.concatenate(chisq)
+
 class ChiSquare2way(OrderedDict):
     def __init__(self, *args, **kwds):
         if len(args) > 1:
@@ -66,51 +84,46 @@ class ChiSquare2way(OrderedDict):
         else:
             super(ChiSquare2way, self).__init__()
             
-    def run(self, row_factor, col_factor, alpha=0.05):   
+    def run(self, row_factor, col_factor, alpha=0.05,
+            simulate=0, n_jobs=1, seed=None):   
         """
         runs a 2-way chi square on the matched data in row_factor
         and col_factor.
+
+        If simulate > 0 a Monte Carlo p-value of the Pearson chi-square
+        ('p_sim') is calculated from that many random tables with the
+        observed row and column totals. The simulations are run by
+        n_jobs processes and are reproducible given seed. Use it when
+        the expected counts are small.
         """
 
         if len(row_factor) != len(col_factor):
             raise Exception('row_factor and col_factor must be equal lengths')
 
-        counter = Counter()
-        row_counter= Counter()
-        col_counter= Counter()
-        for r,c in zip(row_factor, col_factor):
-            counter[(r,c)] += 1.
-            row_counter[r] += 1.
-            col_counter[c] += 1.
-
-        N = float(sum(counter.values()))
-        observed = []
-        expected = []
-        for r in sorted(row_counter):
-            observed.append([])
-            expected.append([])
-            for c in sorted(col_counter):
-                observed[-1].append(counter[(r,c)])
-                expected[-1].append((row_counter[r]*col_counter[c])/N)
-
-        N_r, N_c = len(row_counter), len(col_counter)
+        # factorize the factors to integer codes of their sorted levels
+        row_levels, r = np.unique(np.asarray(row_factor), return_inverse=True)
+        col_levels, c = np.unique(np.asarray(col_factor), return_inverse=True)
+        N_r, N_c = len(row_levels), len(col_levels)
+
+        observed = np.bincount(r*N_c + c, minlength=N_r*N_c)
+        observed = observed.reshape(N_r, N_c).astype(np.float64)
+        row_tots = np.sum(observed, 1)
+        col_tots = np.sum(observed, 0)
+        N = float(np.sum(observed))
+        expected = np.outer(row_tots, col_tots)/N
+
         df = (N_r - 1) * (N_c - 1)
 
-        chisq = sum((o-e)**2/e for o,e in
-                    zip(_flatten(observed),_flatten(expected)))
+        chisq = float(np.sum((observed - expected)**2/expected))
         prob = _stats.chisqprob(chisq, df)
 
-        try:        
-            lnchisq = 2.*sum(o*math.log(o/e) for o,e in
-                             zip(_flatten(observed),_flatten(expected)))
-            lnprob = _stats.chisqprob(lnchisq, df)
-        except:
-            lnchisq = 'nan'
-            lnprob = 'nan'
+        # empty cells contribute nothing (0*log(0) = 0)
+        nz = observed > 0.
+        lnchisq = 2.*float(np.sum(observed[nz]*np.log(observed[nz]/expected[nz])))
+        lnprob = _stats.chisqprob(lnchisq, df)
 
         if N_r == N_c == 2:
-            ccchisq = sum((abs(o-e)-0.5)**2/e for o,e in
-                          zip(_flatten(observed),_flatten(expected)))
+            ccchisq = float(np.sum((np.abs(observed - expected) - 0.5)**2/expected))
             ccprob = _stats.chisqprob(ccchisq, df)
         else:
             ccchisq = None
@@ -141,17 +154,27 @@ class ChiSquare2way(OrderedDict):
         self['CramerV_prob'] = cramerV_prob
         self['C'] = C
         self['C_prob'] = C_prob
-        
-        self.counter = counter
-        self.row_counter = row_counter
-        self.col_counter = col_counter
+
+        if simulate > 0:
+            payload = (row_tots.astype(np.int64),
+                       col_tots.astype(np.int64), expected)
+            null = map_permutations(_chisquare2way_simulations, payload,
+                                    simulate, n_jobs, seed)
+            self['p_sim'] = float(pvalue(chisq, null))
+            self['simulations'] = simulate
+
+        row_levels = row_levels.tolist()
+        col_levels = col_levels.tolist()
+        self.counter = Counter()
+        for i, j in zip(*np.nonzero(observed)):
+            self.counter[(row_levels[i], col_levels[j])] = observed[i,j]
+        self.row_counter = Counter(dict(zip(row_levels, row_tots.tolist())))
+        self.col_counter = Counter(dict(zip(col_levels, col_tots.tolist())))
         self.N_r = N_r
         self.N_c = N_c
 
-        p_observed = [v/float(self['N']) for v in _flatten(observed)]
-        p_expected = [v/float(self['N']) for v in _flatten(expected)]
-
-        p_chisq = sum([(po-pe)**2/pe for po,pe in zip(p_observed,p_expected)])
+        # the effect size w is the chi-square of the proportions
+        p_chisq = chisq/N
         self['w'] = math.sqrt(p_chisq)
         self['lambda'] = p_chisq*self['N']
         self['crit_chi2'] = scipy.stats.chi2.ppf((1.-alpha),df)
@@ -193,19 +216,25 @@ class ChiSquare2way(OrderedDict):
         tt_sym.add_row(["N of Valid Cases", self['N'], ''])
                               
         # CHI-SQUARE TESTS
+        sim = self.has_key('p_sim')
+        
         tt_a = TextTable(max_width=0)
-        tt_a.set_cols_dtype(['t', 'a', 'a', 'a'])
-        tt_a.set_cols_align(['l', 'r', 'r', 'r'])
+        tt_a.set_cols_dtype(['t', 'a', 'a', 'a'] + ['a']*sim)
+        tt_a.set_cols_align(['l', 'r', 'r', 'r'] + ['r']*sim)
         tt_a.set_deco(TextTable.HEADER)
-        tt_a.header([' ', 'Value', 'df', 'P'])
+        header = [' ', 'Value', 'df', 'P']
+        if sim:
+            header.append('Monte Carlo P\n(%i tables)'%self['simulations'])
+        tt_a.header(header)
         tt_a.add_row(['Pearson Chi-Square',
-                      self['chisq'], self['df'], self['p']])
+                      self['chisq'], self['df'], self['p']] +
+                     [self.get('p_sim')]*sim)
         if self['ccchisq'] != None:
             tt_a.add_row(['Continuity Correction',
-                          self['ccchisq'], self['df'], self['ccp']])
+                          self['ccchisq'], self['df'], self['ccp']] + ['']*sim)
         tt_a.add_row(['Likelihood Ratio',
-                      self['lnchisq'], self['df'], self['lnp']])
-        tt_a.add_row(["N of Valid Cases", self['N'], '', ''])
+                      self['lnchisq'], self['df'], self['lnp']] + ['']*sim)
+        tt_a.add_row(["N of Valid Cases", self['N'], '', ''] + ['']*sim)
 
         # POWER
         tt_p = TextTable(max_width=0)
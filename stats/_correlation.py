@@ -18,14 +18,71 @@ from collections import Counter,OrderedDict
 from copy import copy
 
 # third party
-import scipy
+import scipy.special
 import numpy as np
 
 # included modules
 from pyvttbl.stats import _stats
+from pyvttbl.stats import _pstat
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
 
+def _rankdata(X):
+    """
+    Returns the ranks of the rows of X. Ties get the average of their
+    ranks (like _stats.rankdata).
+    """
+    k, n = X.shape
+    rows = np.arange(k)[:,None]
+    
+    i = np.argsort(X, axis=1, kind='mergesort')
+    s = X[rows, i]
+
+    # first element of each group of tied values
+    first = np.ones((k, n), dtype=bool)
+    first[:,1:] = s[:,1:] != s[:,:-1]
+    first = first.ravel()
+    
+    group = np.cumsum(first) - 1
+    start = np.tile(np.arange(n), k)[first]
+    ranks = start + (np.bincount(group) - 1.)/2. + 1.
+    
+    R = np.empty((k, n))
+    R[rows, i] = ranks[group].reshape(k, n)
+    return R
+
+def _recode(L):
+    """
+    Returns the values in L coded 0. and 1. in order of appearance if L
+    has exactly 2 categories. Otherwise returns None.
+    """
+    L = list(L)
+    categories = _pstat.unique(L)
+    if len(categories) != 2:
+        return None
+    return [float(v == categories[1]) for v in L]
+
+def _standardized(X):
+    """
+    Returns the rows of X centered and scaled to unit length.
+    """
+    X = X - np.mean(X, 1)[:,None]
+    return X/np.sqrt(np.sum(X*X, 1))[:,None]
+
+def _rprob(r, n, tiny=1e-30):
+    """
+    Returns the two-tailed p-values of the correlations in r from n
+    observations (through the t distribution with n-2 df expressed
+    as an incomplete beta function).
+    """
+    df = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r*np.sqrt(df/((1.0-r+tiny)*(1.0+r+tiny)))
+        x = df/(df+t*t)
+    x = np.where(np.isnan(x), 0., x)
+
+    return scipy.special.betainc(0.5*df, 0.5, x)
+
 class Correlation(OrderedDict):
     """bivariate correlation matrix"""
     def __init__(self, *args, **kwds):
@@ -73,15 +130,8 @@ class Correlation(OrderedDict):
             raise Exception('lists must be of equal length')
 
         # check coefficient
-        if coefficient == 'pearson':
-            func = _stats.pearsonr
-        elif coefficient == 'spearman':
-            func = _stats.spearmanr
-        elif coefficient == 'pointbiserial':
-            func = _stats.pointbiserialr
-        elif coefficient == 'kendalltau':
-            func = _stats.kendalltau
-        else:
+        if coefficient not in ['pearson', 'spearman',
+                               'pointbiserial', 'kendalltau']:
             raise Exception('invalid coefficient parameter')
         
         self.coefficient = coefficient
@@ -100,18 +150,81 @@ class Correlation(OrderedDict):
             raise Exception('list_of_lists and conditions_list '
                             'must be of equal length')
 
-        # put data into a dict
-        d=dict([(k,v) for k,v in zip(self.conditions_list, list_of_lists)])
-
         # run correlations
-        for x,y in _xunique_combinations(self.conditions_list, 2):
-            r, prob = func(d[x],d[y])
-            self[(x,y)] = dict(r=r, p=prob)
+        self.r, self.p = self._matrix(list_of_lists)
+
+        # dict view of the pairs (upper triangle)
+        self.clear()
+        for (i, x), (j, y) in _xunique_combinations(
+                                  list(enumerate(self.conditions_list)), 2):
+            self[(x,y)] = dict(r=float(self.r[i,j]), p=float(self.p[i,j]))
 
         self.alpha = alpha
         self.N = lengths[0]
 
         self.lm_significance_testing()
+
+    def _matrix(self, list_of_lists):
+        """
+        Returns the correlation matrix and the matrix of p-values of
+        the variables in list_of_lists.
+
+        Pearson correlations are the cross products of the standardized
+        variables. Spearman correlations are calculated from the sums
+        of the squared rank differences (as _stats.spearmanr does), and
+        point-biserial correlations are the Pearson correlations of the
+        first (dichotomous) variable of each pair coded 0 and 1 with
+        the values of the second variable. Kendall's tau-b is
+        calculated for each pair with _stats.akendalltau.
+        """
+        k = len(list_of_lists)
+        n = len(list_of_lists[0])
+        
+        if self.coefficient == 'kendalltau':
+            X = [np.asarray(L) for L in list_of_lists]
+            R = np.eye(k)
+            P = np.zeros((k, k))
+            for i, j in _xunique_combinations(range(k), 2):
+                R[i,j], P[i,j] = _stats.akendalltau(X[i], X[j])
+                R[j,i], P[j,i] = R[i,j], P[i,j]
+            return R, P
+
+        if self.coefficient == 'pointbiserial':
+            # the first variable of each pair must be dichotomous
+            codes = [_recode(L) for L in list_of_lists[:-1]]
+            if any(c is None for c in codes):
+                raise ValueError('Exactly 2 categories required '
+                                 'for pointbiserialr().')
+
+            # R[i,j] (i < j) correlates the codes of variable i with
+            # the values of variable j
+            C = _standardized(np.array(codes, dtype=np.float64))
+            Y = _standardized(np.array(list_of_lists[1:], dtype=np.float64))
+            R = np.eye(k)
+            i, j = np.triu_indices(k, 1)
+            R[i,j] = np.clip(np.dot(C, Y.T), -1., 1.)[i,j-1]
+            R[j,i] = R[i,j]
+            P = _rprob(R, n)
+            P[np.diag_indices(k)] = 0.
+            return R, P
+
+        X = np.array(list_of_lists, dtype=np.float64)
+
+        if self.coefficient == 'spearman':
+            X = _rankdata(X)
+            ss = np.sum(X*X, 1)
+            dsq = ss[:,None] + ss[None,:] - 2.*np.dot(X, X.T)
+            R = 1 - 6*dsq / float(n*(n**2-1))
+            P = _rprob(R, n, 0.)
+            
+        else:
+            Z = _standardized(X)
+            R = np.clip(np.dot(Z, Z.T), -1., 1.)
+            P = _rprob(R, n)
+
+        R[np.diag_indices(k)] = 1.
+        P[np.diag_indices(k)] = 0.
+        return R, P
         
     def lm_significance_testing(self):
         """
@@ -127,13 +240,18 @@ class Correlation(OrderedDict):
         """
         
         # perform post_hoc analysis
-        L = [(key, abs(self[key]['r'])) for key in self]
+        pairs = self.keys()
+        r = np.abs([self[pair]['r'] for pair in pairs])
         k = len(self)
+
+        # stable sort, ties stay in pair order
+        order = np.argsort(-r, kind='mergesort')
+        adj_alpha = self.alpha / (k - np.arange(k, dtype=np.float64))
+        
         self.lm = []
-        for i,(pair,r) in enumerate(sorted(
-                              L, key=lambda t: t[1], reverse=True)):
-            adj_alpha = self.alpha / (k - (i + 1) + 1)
-            self.lm.append([pair, i+1, r, self[pair]['p'], adj_alpha])
+        for i, j in enumerate(order):
+            self.lm.append([pairs[j], i+1, float(r[j]),
+                            self[pairs[j]]['p'], float(adj_alpha[i])])
         
     def __str__(self):
 
@@ -22,6 +22,84 @@ import numpy as np
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
 
+def _quantile_indices(N):
+    """
+    Returns the indices of the sorted data that are averaged for the
+    min, Q1, median, Q3 and max of N values. Q1 is the median of the
+    lower half (the first N//2 values) and Q3 the median of the rest.
+    Works for arrays of N.
+    """
+    h = N//2
+    return [(0, 0),
+            ((h-1)//2, h//2),
+            ((N-1)//2, N//2),
+            (h + (N-h-1)//2, h + (N-h)//2),
+            (N-1, N-1)]
+
+def _describe(count, mean, mode, ss, quantiles):
+    """
+    Returns a list of (statistic, value) tuples given the counts,
+    means, modes, sums of squared deviations and the min, Q1, median,
+    Q3 and max. The values can be arrays.
+    """
+    var = ss / (count - 1.)
+    stdev = np.sqrt(var)
+    sem = stdev / np.sqrt(count)
+    rms = np.sqrt(ss / count + mean**2)
+    mn, q1, median, q3, mx = quantiles
+    
+    return [('count', count),
+            ('mean', mean),
+            ('mode', mode),
+            ('var', var),
+            ('stdev', stdev),
+            ('sem', sem),
+            ('rms', rms),
+            ('min', mn),
+            ('Q1', q1),
+            ('median', median),
+            ('Q3', q3),
+            ('max', mx),
+            ('range', mx - mn),
+            ('95ci_lower', mean - 1.96*sem),
+            ('95ci_upper', mean + 1.96*sem)]
+
+def _asvalues(V):
+    """
+    Returns the data in V as a flat float array without masked values.
+    """
+    if isinstance(V, np.ma.MaskedArray):
+        V = V.compressed()
+    elif not isinstance(V, np.ndarray):
+        V = _flatten(list(copy(V)))
+    return np.asarray(V, dtype=np.float64).ravel()
+
+def _group_codes(groups, valid):
+    """
+    Returns the codes of the combinations of levels that occur, the
+    index of each observation's combination in the codes, and the
+    sorted levels of each factor. Only the observations that are valid
+    are coded.
+    """
+    codes = np.zeros(np.sum(valid), dtype=np.int64)
+    levels = []
+    for G in groups:
+        L, c = np.unique(np.asarray(G)[valid], return_inverse=True)
+        codes = codes*len(L) + c
+        levels.append(L.tolist())
+    keys, g = np.unique(codes, return_inverse=True)
+    return keys, g, levels
+
+def _group_cells(key, levels):
+    """
+    Returns the tuple of levels coded by key (see _group_codes).
+    """
+    cells = []
+    for L in reversed(levels):
+        key, c = divmod(key, len(L))
+        cells.insert(0, L[c])
+    return tuple(cells)
+
 class Descriptives(OrderedDict):
     def __init__(self, *args, **kwds):
         if len(args) > 1:
@@ -51,7 +129,7 @@ class Descriptives(OrderedDict):
               None
         """        
         try:
-            V = np.array(sorted(_flatten(list(copy(V)))))
+            V = _asvalues(V)
         except:
             raise TypeError('V must be a list-like object')
             
@@ -60,24 +138,24 @@ class Descriptives(OrderedDict):
         else:
             self.cname = cname
             
-        N = float(len(V))
-
-        self['count'] = N
-        self['mean'] = sum(V) / N
-        self['mode'] = Counter(V).most_common()[0][0]
-##        self['var'] = sum([(self['mean']-v)**2 for v in V]) / (N - 1)
-        self['var'] = np.var(V, ddof=1)
-        self['stdev']= math.sqrt(self['var'])
-        self['sem'] = self['stdev'] / math.sqrt(N)
-        self['rms'] = math.sqrt(np.mean(V**2))
-        self['min'] = min(V)
-        self['Q1'] = np.median(V[:int(N/2.)])
-        self['median'] = np.median(V)
-        self['Q3'] = np.median(V[int(N/2.):])
-        self['max'] = max(V)
-        self['range'] = self['max'] - self['min']
-        self['95ci_lower'] = self['mean'] - 1.96*self['sem']
-        self['95ci_upper'] = self['mean'] + 1.96*self['sem']
+        N = len(V)
+
+        # the order statistics are found with one partial sort
+        I = _quantile_indices(N)
+        kth = sorted(set(k for pair in I for k in pair if k >= 0))
+        P = np.partition(V, kth)
+        quantiles = [(P[i] + P[j]) / 2. if i >= 0 else np.nan for i, j in I]
+
+        # the mode is the smallest of the most common values
+        values, inverse = np.unique(V, return_inverse=True)
+        mode = values[np.argmax(np.bincount(inverse))]
+
+        mean = np.sum(V) / N
+        ss = np.sum((V - mean)**2)
+
+        self.clear()
+        for k, v in _describe(float(N), mean, mode, ss, quantiles):
+            self[k] = float(v)
     
     def __str__(self):
         """A human friendly representation of the analysis"""
@@ -114,4 +192,333 @@ class Descriptives(OrderedDict):
 
 
         return 'Descriptives(%s%s)'%(args, kwds)
+
+class GroupedDescriptives(OrderedDict):
+    """
+       Descriptive statistics of the data in each combination of the
+       levels of the factors. Maps the combinations (tuples of levels)
+       to :class:`Descriptives` objects.
+    """
+    def __init__(self, *args, **kwds):
+        if len(args) > 1:
+            raise Exception('expecting only 1 argument')
+
+        if kwds.has_key('cname'):
+            self.cname = kwds['cname']
+        else:
+            self.cname = None
+
+        if kwds.has_key('factors'):
+            self.factors = kwds['factors']
+        else:
+            self.factors = []
+            
+        if len(args) == 1:
+            super(GroupedDescriptives, self).__init__(args[0])
+        else:
+            super(GroupedDescriptives, self).__init__()
+
+    def run(self, V, groups, cname=None, factors=None):
+        """
+        Conducts a descriptive statistical analysis of the data in V
+        for each combination of the levels in groups
+
+           args:
+              V: an iterable containing numerical data
+
+              groups: a list of iterables (one for each factor) with
+                      the levels of the observations in V
+
+           kwds:
+              cname: a string to label the data
+
+              factors: labels of the factors
+
+           returns:
+              None
+
+        |   The statistics of all of the groups are computed together
+            with bincount reductions over a single sort of the data
+            by group and value. Observations with masked levels are
+            dropped.
+        """
+        V = np.ma.masked_invalid(np.ma.ravel(V).astype(np.float64))
+        valid = ~np.ma.getmaskarray(V)
+        for G in groups:
+            valid &= ~np.ma.getmaskarray(G)
+        V = np.ma.getdata(V)[valid]
+
+        if cname == None:
+            self.cname = ''
+        else:
+            self.cname = cname
+
+        if factors == None:
+            self.factors = ['Factor %i'%(i+1) for i in _xrange(len(groups))]
+        else:
+            self.factors = list(factors)
+
+        keys, g, levels = _group_codes(groups, valid)
+        m = len(keys)
+
+        # the data sorted by group and then by value
+        order = np.lexsort((V, g))
+        S, G = V[order], g[order]
+
+        count = np.bincount(g, minlength=m)
+        starts = np.cumsum(count) - count
+        mean = np.bincount(g, V, m) / count
+        ss = np.bincount(g, (V - mean[g])**2, m)
+
+        quantiles = []
+        for i, j in _quantile_indices(count):
+            q = (S[starts + np.maximum(i, 0)] + S[starts + j]) / 2.
+            quantiles.append(np.where(i >= 0, q, np.nan))
+
+        # the runs of equal values. The longest run of each group is
+        # the mode (the first, smallest value, when there are ties)
+        b = np.flatnonzero(np.concatenate(([True], (S[1:] != S[:-1]) |
+                                                   (G[1:] != G[:-1]))))
+        lengths = np.diff(np.concatenate((b, [len(S)])))
+        runs = np.lexsort((-lengths, G[b]))
+        nruns = np.bincount(G[b], minlength=m)
+        mode = S[b[runs[np.cumsum(nruns) - nruns]]]
+
+        stats = _describe(count.astype(np.float64), mean, mode, ss, quantiles)
+        
+        self.clear()
+        for i, key in enumerate(keys):
+            self[_group_cells(key, levels)] = \
+                Descriptives([(k, float(v[i])) for k, v in stats],
+                             cname=self.cname)
+
+    def __str__(self):
+        """A human friendly representation of the analysis"""
+
+        if self == {}:
+            return '(no data in object)'
+
+        stats = self.values()[0].keys()
+        
+        tt = TextTable(max_width=0)
+        tt.set_cols_dtype(['t']*len(self.factors) + ['f']*len(stats))
+        tt.set_cols_align(['l']*len(self.factors) + ['r']*len(stats))
+        tt.set_deco(TextTable.HEADER)
+        tt.header(self.factors + stats)
+        for cells, d in self.items():
+            tt.add_row(list(cells) + d.values())
+
+        return ''.join(['Descriptive Statistics\n  ',
+                         self.cname,
+                         '\n==========================\n',
+                         tt.draw()])
+
+    def __repr__(self):
+        """A Python friendly representation of the analysis"""
+        
+        if self == {}:
+            return 'GroupedDescriptives()'
+        
+        s = []
+        for k, v in self.items():
+            s.append("(%s, %s)"%(repr(k), repr(v)))
+        args = '[' + ', '.join(s) + ']'
+        
+        kwds = []
+        if self.cname != None:
+            kwds.append(", cname='%s'"%self.cname)
+
+        if self.factors != []:
+            kwds.append(", factors=%s"%repr(self.factors))
+
+        return 'GroupedDescriptives(%s%s)'%(args, ''.join(kwds))
+
+class StreamingDescriptives(object):
+    """
+       Mergeable accumulator of descriptive statistics for data that
+       arrive in chunks (or are split across processes).
+
+       The count, mean, variance, min and max are exact. The moments
+       are accumulated with Welford's method and merged with Chan et
+       al.'s formula. The quartiles and median come from a KLL sketch
+       with parameter k. They are exact until the data no longer fit
+       in the sketch, after which their rank error is roughly 1.7/k.
+       The mode is exact as long as there are at most max_distinct
+       distinct values (nan afterwards).
+
+       kwds:
+          k: size of the quantile sketch
+
+          max_distinct: maximum number of distinct values tracked for
+                        the mode
+
+          seed: seed of the sketch compactions
+    """
+    def __init__(self, k=200, max_distinct=10000, seed=None):
+        self.k = k
+        self.max_distinct = max_distinct
+        
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+
+        self._levels = [np.zeros(0)]
+        self._values = np.zeros(0)
+        self._counts = np.zeros(0)
+        self._rs = np.random.RandomState(seed)
+
+    def update(self, V):
+        """
+        Adds the data in V (masked and nan values are ignored) and
+        returns self.
+        """
+        V = _asvalues(V)
+        V = V[~np.isnan(V)]
+        if len(V) == 0:
+            return self
+
+        mean = np.mean(V)
+        self._moments(len(V), mean, np.sum((V - mean)**2),
+                      np.min(V), np.max(V))
+        self._sketch([V])
+        self._tally(V, np.ones(len(V)))
+        return self
+
+    def merge(self, other):
+        """
+        Adds the data accumulated by the StreamingDescriptives other
+        and returns self.
+        """
+        if other.count == 0:
+            return self
+
+        self._moments(other.count, other.mean, other.m2,
+                      other.min, other.max)
+        self._sketch(other._levels)
+        if other._values is None:
+            self._values = self._counts = None
+        else:
+            self._tally(other._values, other._counts)
+        return self
+
+    def _moments(self, n, mean, m2, mn, mx):
+        """
+        Chan et al.'s pairwise update of the count, mean and sum of
+        squared deviations.
+        """
+        N = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta**2 * self.count * n / float(N)
+        self.mean += delta * n / float(N)
+        self.count = N
+        self.min = min(self.min, mn)
+        self.max = max(self.max, mx)
+
+    def _capacity(self, h):
+        """
+        Returns the capacity of level h of the sketch.
+        """
+        H = len(self._levels)
+        return max(2, int(math.ceil(self.k * (2./3.)**(H - 1 - h))))
+
+    def _sketch(self, levels):
+        """
+        Adds the items of levels (level h items have a weight of 2**h)
+        to the sketch and compacts the levels that are over capacity.
+        Compacting sorts a level and promotes every other item (from a
+        random offset) to the next level.
+        """
+        for h, L in enumerate(levels):
+            if h == len(self._levels):
+                self._levels.append(np.zeros(0))
+            self._levels[h] = np.concatenate((self._levels[h], L))
+
+        h = 0
+        while h < len(self._levels):
+            L = self._levels[h]
+            if len(L) > self._capacity(h):
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.zeros(0))
+                L = np.sort(L)
+                odd = len(L) % 2
+                promoted = L[odd + self._rs.randint(2)::2]
+                self._levels[h+1] = np.concatenate((self._levels[h+1],
+                                                    promoted))
+                self._levels[h] = L[:odd]
+            h += 1
+
+    def _tally(self, values, counts):
+        """
+        Adds the counts of the values used to find the mode.
+        """
+        if self._values is None:
+            return
+
+        values, inverse = np.unique(np.concatenate((self._values, values)),
+                                    return_inverse=True)
+        if len(values) > self.max_distinct:
+            self._values = self._counts = None
+            return
+
+        self._values = values
+        self._counts = np.bincount(inverse,
+                                   np.concatenate((self._counts, counts)))
+
+    def quantiles(self, q):
+        """
+        Returns the (approximate) q-quantiles of the data.
+        """
+        if self.count == 0:
+            raise Exception('no data in object')
+
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.repeat(2.**h, len(L))
+                                  for h, L in enumerate(self._levels)])
+        order = np.argsort(items, kind='mergesort')
+        items, ranks = items[order], np.cumsum(weights[order])
+
+        i = np.searchsorted(ranks, np.asarray(q) * ranks[-1])
+        return items[np.minimum(i, len(items) - 1)]
+
+    def descriptives(self, cname=None):
+        """
+        Returns a :class:`Descriptives` object with the statistics of
+        the accumulated data.
+        """
+        if self.count == 0:
+            raise Exception('no data in object')
+
+        N = self.count
+        if len(self._levels) == 1:
+            # nothing has been compacted, so the quartiles are exact
+            V = np.sort(self._levels[0])
+            quantiles = [(V[i] + V[j]) / 2. if i >= 0 else np.nan
+                         for i, j in _quantile_indices(N)]
+        else:
+            q1, median, q3 = self.quantiles([.25, .5, .75])
+            quantiles = [self.min, q1, median, q3, self.max]
+
+        if self._values is None:
+            mode = np.nan
+        else:
+            mode = self._values[np.argmax(self._counts)]
+
+        if cname == None:
+            cname = ''
+
+        d = Descriptives(cname=cname)
+        for k, v in _describe(float(N), self.mean, mode, self.m2, quantiles):
+            d[k] = float(v)
+        return d
+
+    def __str__(self):
+        if self.count == 0:
+            return '(no data in object)'
         
+        return str(self.descriptives())
+
+    def __repr__(self):
+        return 'StreamingDescriptives(k=%i, max_distinct=%i)'\
+               %(self.k, self.max_distinct)
@@ -18,12 +18,80 @@ from collections import Counter,OrderedDict
 from copy import copy
 
 # third party modules
-import pystaggrelite3
+import numpy as np
 
 # included modules
+from pyvttbl.stats._descriptives import _group_codes, _group_cells
 from pyvttbl.misc.texttable import Texttable as TextTable
 from pyvttbl.misc.support import *
 
+def _asdata(V, weights=None):
+    """
+    Returns the values in V as a flat array (keeping its dtype) and
+    their weights without the masked and nan values.
+    """
+    V = np.ma.ravel(V)
+    if weights is None:
+        W = np.ones(len(V))
+    else:
+        W = np.ravel(np.asarray(weights, dtype=np.float64))
+        if len(V) != len(W):
+            raise Exception('V and weights must be same length')
+
+    valid = ~np.ma.getmaskarray(V)
+    V = np.ma.getdata(V)
+    if V.dtype.kind == 'f':
+        valid &= ~np.isnan(V)
+    return V, W, valid
+
+def _bin_indices(V, bins, vmin, vmax):
+    """
+    Returns the bin of each value in V for bins equal width bins from
+    vmin to vmax, or -1 for the values outside of the range. The last
+    bin includes vmax.
+    """
+    rng = vmax - vmin
+    if not rng > 0:
+        raise Exception('the range of the bins must be greater than 0')
+
+    i = np.floor(bins*(V - vmin)/float(rng)).astype(np.int64)
+    i[V == vmax] = bins - 1
+    i[(i < 0) | (i >= bins)] = -1
+    return i
+
+def _bin_edges(bins, vmin, vmax):
+    """
+    Returns the bins + 1 edges of the bins as a list.
+    """
+    rng = vmax - vmin
+    return [vmin] + [(i/float(bins))*rng + vmin
+                     for i in _xrange(1, bins)] + [vmax]
+
+def _bin_values(counts, bins, vmin, vmax, density, cumulative):
+    """
+    Returns the histogram values given the (weighted) counts of the
+    bins in the last axis of counts.
+    """
+    total = np.sum(counts, -1)[..., None]
+    if cumulative:
+        counts = np.cumsum(counts, -1)
+
+    if density and cumulative:
+        counts = counts / total
+    elif density:
+        counts = counts / ((vmax - vmin)/float(bins)*total)
+    return counts
+
+def _check_args(bins, density, cumulative):
+    if bins < 1:
+        raise Exception('bins must be >= 1')
+
+    if not isinstance(cumulative, bool):
+        raise TypeError('cumulative must be a bool')
+
+    if not isinstance(density, bool):
+        raise TypeError('density must be a bool')
+
 class Histogram(OrderedDict):
     def __init__(self, *args, **kwds):
         if len(args) > 1:
@@ -52,51 +120,76 @@ class Histogram(OrderedDict):
         if kwds.has_key('cumulative'):
             self.cumulative = kwds['cumulative']
         else:
-            self.cumulative = False 
-            
+            self.cumulative = False
+
         if len(args) == 1:
             super(Histogram, self).__init__(args[0])
         else:
             super(Histogram, self).__init__()
-            
-    def run(self, V, cname=None, bins=10,
-                 range=None, density=False, cumulative=False):   
+
+    def run(self, V, cname=None, bins=10, range=None,
+            density=False, cumulative=False, weights=None):
         """
         generates and stores histogram data for numerical data in V
+
+           args:
+              V: an iterable containing numerical data
+
+           kwds:
+              cname: a string to label the data
+
+              bins: number of equal width bins
+
+              range: (min, max) of the bins. Defaults to the min and
+                     max of V. Values outside of the range are ignored
+
+              density: normalize the values so that the histogram
+                       integrates to 1
+
+              cumulative: accumulate the values over the bins
+
+              weights: an iterable with the weight of each value in V
+
+           returns:
+              None
+
+        |   The bins are found arithmetically and counted with bincount
+            (masked and nan values are ignored), so V is not sorted.
         """
-        
-        super(Histogram, self).__init__()
+        _check_args(bins, density, cumulative)
 
-        
         try:
-            V = sorted(_flatten(list(V)))
-        except:
+            V, W, valid = _asdata(V, weights)
+        except TypeError:
             raise TypeError('V must be a list-like object')
+        V, W = V[valid], W[valid]
 
         if len(V) == 0:
             raise Exception('V has zero length')
-            
+
         if cname == None:
             self.cname = ''
         else:
             self.cname = cname
 
-        values, bin_edges = pystaggrelite3.hist(V, bins=bins,
-                   range=range, density=density, cumulative=cumulative)
-
-        self['values'] = values
-        self['bin_edges'] = bin_edges
-        
-        if cname == None:
-            self.cname = ''
+        if range == None:
+            vmin, vmax = np.min(V).item(), np.max(V).item()
         else:
-            self.cname = cname
-            
+            vmin, vmax = range
+
+        i = _bin_indices(V, bins, vmin, vmax)
+        counts = np.bincount(i[i >= 0], W[i >= 0], bins)
+        values = _bin_values(counts, bins, vmin, vmax, density, cumulative)
+
+        self.clear()
+        self['values'] = values.tolist()
+        self['bin_edges'] = _bin_edges(bins, vmin, vmax)
+
         self.bins = bins
         self.range = range
         self.density = density
         self.cumulative = cumulative
-        
+
     def __str__(self):
 
         tt = TextTable(48)
@@ -115,13 +208,13 @@ class Histogram(OrderedDict):
     def __repr__(self):
         if self == {}:
             return 'Histogram()'
-        
+
         s = []
         for k, v in self.items():
             s.append("('%s', %s)"%(k, repr(v)))
         args = '[' + ', '.join(s) + ']'
-        
-        kwds = []            
+
+        kwds = []
         if self.cname != None:
             kwds.append(", cname='%s'"%self.cname)
 
@@ -129,14 +222,150 @@ class Histogram(OrderedDict):
             kwds.append(', bins=%s'%self.bins)
 
         if self.range != None:
-            kwds.append(', range=%s'%repr(range))
+            kwds.append(', range=%s'%repr(self.range))
 
         if self.density != False:
-            kwds.append(', density=%s'%density)
-            
+            kwds.append(', density=%s'%self.density)
+
         if self.cumulative != False:
-            kwds.append(', cumulative=%s'%cumulative)
-            
+            kwds.append(', cumulative=%s'%self.cumulative)
+
         kwds= ''.join(kwds)
 
         return 'Histogram(%s%s)'%(args, kwds)
+
+class GroupedHistogram(OrderedDict):
+    """
+       Histograms of the data in each combination of the levels of the
+       factors. Maps the combinations (tuples of levels) to
+       :class:`Histogram` objects that share the same bins.
+    """
+    def __init__(self, *args, **kwds):
+        if len(args) > 1:
+            raise Exception('expecting only 1 argument')
+
+        if kwds.has_key('cname'):
+            self.cname = kwds['cname']
+        else:
+            self.cname = None
+
+        if kwds.has_key('factors'):
+            self.factors = kwds['factors']
+        else:
+            self.factors = []
+
+        if len(args) == 1:
+            super(GroupedHistogram, self).__init__(args[0])
+        else:
+            super(GroupedHistogram, self).__init__()
+
+    def run(self, V, groups, cname=None, factors=None, bins=10,
+            range=None, density=False, cumulative=False, weights=None):
+        """
+        generates and stores histogram data for the numerical data in
+        V for each combination of the levels in groups
+
+           args:
+              V: an iterable containing numerical data
+
+              groups: a list of iterables (one for each factor) with
+                      the levels of the observations in V
+
+           kwds:
+              cname: a string to label the data
+
+              factors: labels of the factors
+
+              bins, range, density, cumulative, weights: see
+              :meth:`Histogram.run`. The range defaults to the min and
+              max of all of the data
+
+           returns:
+              None
+
+        |   All of the groups are binned together by counting the
+            combined (group, bin) indices with one bincount.
+            Observations with masked levels are dropped.
+        """
+        _check_args(bins, density, cumulative)
+
+        V, W, valid = _asdata(V, weights)
+        for G in groups:
+            valid &= ~np.ma.getmaskarray(G)
+        V, W = V[valid], W[valid]
+
+        if len(V) == 0:
+            raise Exception('V has zero length')
+
+        if cname == None:
+            self.cname = ''
+        else:
+            self.cname = cname
+
+        if factors == None:
+            self.factors = ['Factor %i'%(i+1) for i in _xrange(len(groups))]
+        else:
+            self.factors = list(factors)
+
+        keys, g, levels = _group_codes(groups, valid)
+        m = len(keys)
+
+        if range == None:
+            vmin, vmax = np.min(V).item(), np.max(V).item()
+        else:
+            vmin, vmax = range
+
+        i = _bin_indices(V, bins, vmin, vmax)
+        counts = np.bincount(g[i >= 0]*bins + i[i >= 0],
+                             W[i >= 0], m*bins).reshape(m, bins)
+        values = _bin_values(counts, bins, vmin, vmax, density, cumulative)
+        edges = _bin_edges(bins, vmin, vmax)
+
+        self.clear()
+        for j, key in enumerate(keys):
+            h = Histogram([('values', values[j].tolist()),
+                           ('bin_edges', list(edges))],
+                          cname=self.cname, bins=bins, range=range,
+                          density=density, cumulative=cumulative)
+            self[_group_cells(key, levels)] = h
+
+    def __str__(self):
+
+        if self == {}:
+            return '(no data in object)'
+
+        h = self.values()[0]
+
+        tt = TextTable(max_width=0)
+        tt.set_cols_dtype(['f']*(len(self) + 1))
+        tt.set_cols_align(['r']*(len(self) + 1))
+        tt.set_deco(TextTable.HEADER)
+        tt.header(['Bins'] + [', '.join(str(c) for c in cells)
+                              for cells in self.keys()])
+        V = [v['values'] + [''] for v in self.values()]
+        for j, b in enumerate(h['bin_edges']):
+            tt.add_row([b] + [v[j] for v in V])
+
+        return ''.join([('','Cumulative ')[h.cumulative],
+                        ('','Density ')[h.density],
+                        'Histograms for ', self.cname,
+                        ' by ', ', '.join(str(f) for f in self.factors),
+                        '\n', tt.draw()])
+
+    def __repr__(self):
+        if self == {}:
+            return 'GroupedHistogram()'
+
+        s = []
+        for k, v in self.items():
+            s.append("(%s, %s)"%(repr(k), repr(v)))
+        args = '[' + ', '.join(s) + ']'
+
+        kwds = []
+        if self.cname != None:
+            kwds.append(", cname='%s'"%self.cname)
+
+        if self.factors != []:
+            kwds.append(", factors=%s"%repr(self.factors))
+
+        return 'GroupedHistogram(%s%s)'%(args, ''.join(kwds))
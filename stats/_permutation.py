@@ -0,0 +1,120 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+
+# std lib
+import multiprocessing
+
+# third party
+import numpy as np
+
+#: number of permutations drawn from each seed
+BATCHSIZE = 250
+
+def map_permutations(func, payload, permutations, n_jobs=1, seed=None):
+    """
+    Calls func((payload, batches)) for the permutations and returns the
+    concatenated results.
+
+    The permutations are split into batches of BATCHSIZE, each with its
+    own seed drawn from seed. func receives a list of (seed, size)
+    tuples and returns an array with a row for every permutation. When
+    n_jobs > 1 the batches are distributed across a process pool. Both
+    func and payload must be picklable. The results do not depend on
+    n_jobs.
+    """
+    permutations = int(permutations)
+    if permutations < 1:
+        raise ValueError('permutations must be a positive integer')
+
+    rs = np.random.RandomState(seed)
+    nbatches = int(np.ceil(permutations / float(BATCHSIZE)))
+    seeds = rs.randint(0, 2**31-1, nbatches)
+    sizes = [BATCHSIZE]*(nbatches-1)
+    sizes.append(permutations - BATCHSIZE*(nbatches-1))
+    batches = list(zip(seeds, sizes))
+
+    n_jobs = max(1, min(int(n_jobs), nbatches))
+    if n_jobs == 1:
+        return func((payload, batches))
+
+    # contiguous chunks keep the results in seed order
+    tasks = [(payload, batches[int(round(i*nbatches/float(n_jobs))):
+                               int(round((i+1)*nbatches/float(n_jobs)))])
+             for i in _xrange(n_jobs)]
+
+    pool = multiprocessing.Pool(n_jobs)
+    try:
+        results = pool.map(func, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+    return np.concatenate(results)
+
+def pvalue(observed, null):
+    """
+    Returns the permutation p-values of the observed statistics given
+    the statistics of the permutations in the rows of null. The
+    observed labeling counts as one of the permutations.
+    """
+    observed = np.asarray(observed)
+    null = np.asarray(null)
+    count = np.sum(null >= observed - 1e-12*np.abs(observed), 0)
+    return (1. + count)/(1. + len(null))
+
+def _hypergeometric(rs, ngood, nbad, nsample):
+    """
+    Returns draws of rs.hypergeometric that also allow samples of size 0.
+    """
+    x = np.zeros(len(nsample), dtype=np.int64)
+    i = nsample > 0
+    if np.any(i):
+        x[i] = rs.hypergeometric(ngood[i], nbad[i], nsample[i])
+    return x
+
+def random_tables(rs, row_tots, col_tots, size):
+    """
+    Returns an array of size random contingency tables with the given
+    row and column totals.
+
+    The tables have the distribution of the tables of randomly paired
+    row and column labels (the null distribution of the chi-square test
+    of independence). Like Patefield's algorithm, the cells are filled
+    row by row with conditional hypergeometric draws. Each draw is
+    vectorized across the tables.
+    """
+    row_tots = np.asarray(row_tots, dtype=np.int64)
+    col_tots = np.asarray(col_tots, dtype=np.int64)
+    nr, nc = len(row_tots), len(col_tots)
+
+    if np.sum(row_tots) != np.sum(col_tots):
+        raise ValueError('row and column totals must have the same sum')
+
+    T = np.zeros((size, nr, nc), dtype=np.int64)
+    colrem = np.tile(col_tots, (size, 1))
+
+    for i in _xrange(nr - 1):
+        rowrem = np.repeat(row_tots[i], size)
+        nbad = np.sum(colrem, 1)
+        for j in _xrange(nc - 1):
+            nbad -= colrem[:,j]
+            x = _hypergeometric(rs, colrem[:,j], nbad, rowrem)
+            T[:,i,j] = x
+            rowrem -= x
+            colrem[:,j] -= x
+        T[:,i,nc-1] = rowrem
+        colrem[:,nc-1] -= rowrem
+    T[:,nr-1,:] = colrem
+
+    return T
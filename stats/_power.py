@@ -0,0 +1,392 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+
+# std lib
+from collections import OrderedDict
+
+# third party
+import numpy as np
+import scipy.stats
+
+# included modules
+from pyvttbl.stats._anova import Anova, observed_power, _xunique_combinations
+from pyvttbl.stats._permutation import map_permutations
+from pyvttbl.misc.texttable import Texttable as TextTable
+
+def _effect_patterns(D, effects, factors):
+    """
+    Returns an array with a row for each effect holding the deviations
+    of the Nd = prod(D) conditions (first factor slowest) for a linear
+    trend over the levels of the effect's factors. The rows are
+    mutually orthogonal and scaled to a root mean square of 1.
+    """
+    U = []
+    for efs in effects:
+        u = np.ones(1)
+        for f, d in zip(factors, D):
+            if f in efs:
+                u = np.kron(u, np.arange(d) - (d-1.)/2.)
+            else:
+                u = np.kron(u, np.ones(d))
+        U.append(u/np.sqrt(np.mean(u**2)))
+    return np.array(U)
+
+def _design_df(n, wfactors, bfactors, D, sub='SUBJECT', dv='Y'):
+    """
+    Returns a DataFrame with n subjects in each between subjects
+    condition and all of the within subjects conditions (one
+    observation per subject and condition), and a mask of the
+    observed cells of the subjects (rows) by conditions (columns)
+    pivot of the design. The dv is filled with zeros.
+    """
+    # DataFrame imports the stats package
+    from pyvttbl.base import DataFrame
+
+    factors = wfactors + bfactors
+    Nw = int(np.prod(D[:len(wfactors)]))
+    Nb = int(np.prod(D[len(wfactors):]))
+
+    # subject i is in between subjects condition i // n
+    valid = np.zeros((n*Nb, Nw, Nb), dtype=bool)
+    valid[np.arange(n*Nb), :, np.arange(n*Nb)//n] = True
+    valid = valid.reshape(n*Nb, -1)
+
+    rows, cols = np.nonzero(valid)
+    levels = np.unravel_index(cols, D)
+
+    df = DataFrame()
+    df[sub] = rows + 1
+    for f, L in zip(factors, levels):
+        df[f] = L + 1
+    df[dv] = np.zeros(len(rows))
+
+    return df, valid
+
+def _power_simulations(args):
+    """
+    Returns whether the effects (columns) of each simulated data set
+    (rows) are significant. Called through map_permutations by
+    AnovaPower._simulate.
+    """
+    (wfactors, bfactors, D, ns, means, effects, alpha), batches = args
+
+    designs = [_design_df(n, wfactors, bfactors, D) for n in ns]
+    aov = Anova(dv='Y', wfactors=wfactors, bfactors=bfactors, sub='SUBJECT')
+    aov.dftrim = 0.
+
+    S = []
+    for seed, size in batches:
+        rs = np.random.RandomState(seed)
+        for i in _xrange(size):
+            row = []
+            for mu in means:
+                for df, valid in designs:
+                    X = np.empty(valid.shape)
+                    X.fill(np.nan)
+                    X[valid] = (mu + rs.randn(*valid.shape))[valid]
+
+                    # the dv is only needed for its mean and length
+                    df['Y'] = X[valid]
+
+                    aov.clear()
+                    aov.df = df
+                    aov.pt = X
+                    aov._analyze()
+                    row.extend([aov[efs]['p'] < alpha for efs in effects])
+            S.append(row)
+
+    return np.array(S, dtype=np.float64).reshape(-1, len(row))
+
+class AnovaPower(OrderedDict):
+    """Power analysis and sample size planning for factorial ANOVA"""
+    def __init__(self, *args, **kwds):
+        if len(args) > 1:
+            raise Exception('expecting only 1 argument')
+
+        if kwds.has_key('wfactors'):
+            self.wfactors = kwds['wfactors']
+        else:
+            self.wfactors = []
+
+        if kwds.has_key('bfactors'):
+            self.bfactors = kwds['bfactors']
+        else:
+            self.bfactors = []
+
+        if kwds.has_key('levels'):
+            self.levels = kwds['levels']
+        else:
+            self.levels = {}
+
+        if kwds.has_key('n'):
+            self.n = kwds['n']
+        else:
+            self.n = []
+
+        if kwds.has_key('alpha'):
+            self.alpha = kwds['alpha']
+        else:
+            self.alpha = 0.05
+
+        if kwds.has_key('simulations'):
+            self.simulations = kwds['simulations']
+        else:
+            self.simulations = 0
+
+        if len(args) == 1:
+            super(AnovaPower, self).__init__(args[0])
+        else:
+            super(AnovaPower, self).__init__()
+
+    def run(self, levels, effect_sizes, n, wfactors=None, bfactors=None,
+            alpha=0.05, eps=1., simulations=0, n_jobs=1, seed=None):
+        """
+        Calculates the power of the effects of a factorial design for
+        each of the sample sizes in n.
+
+           args:
+              levels: dict mapping the factors to their number of
+                      levels (or to a sequence of their levels)
+
+              effect_sizes: dict mapping effects (tuples of factors, or
+                      a factor for main effects) to Cohen's f. The
+                      values can be sequences (of the same length) to
+                      plan several scenarios at once. Effects that are
+                      not given have no effect.
+
+              n: sample size or sequence of sample sizes. This is the
+                 number of subjects in each between subjects condition
+                 (the number of subjects for within subjects designs)
+
+           kwds:
+              wfactors: within subjects factors
+
+              bfactors: between subjects factors
+
+              alpha: significance level
+
+              eps: sphericity epsilon applied to the effects with
+                   within subjects factors (see observed_power)
+
+              simulations: number of simulated data sets per scenario
+                           and sample size used to validate the power
+                           with Anova
+
+              n_jobs: number of processes running the simulations
+
+              seed: seed of the simulations
+
+           returns:
+              None
+
+        |   f is relative to the standard deviation of the error term
+            of the effect, so the non-centrality of an effect is
+            lambda = f**2 * (number of observations). The power of all
+            the effects, scenarios, and sample sizes is evaluated with
+            one call to observed_power. The simulations add normal
+            noise (sd = 1) to condition means with a linear trend
+            having the given f for each effect and record how often
+            the effects are significant.
+        """
+        if wfactors == None:
+            wfactors = []
+
+        if bfactors == None:
+            bfactors = []
+
+        factors = wfactors + bfactors
+        if len(factors) == 0:
+            raise Exception('design must have at least one factor')
+
+        self.clear()
+        self.wfactors = wfactors
+        self.bfactors = bfactors
+        self.levels = levels
+        self.alpha = alpha
+        self.simulations = simulations
+
+        D = []
+        for f in factors:
+            if hasattr(levels[f], '__iter__'):
+                D.append(len(levels[f]))
+            else:
+                D.append(int(levels[f]))
+
+        ns = np.atleast_1d(np.array(n, dtype=np.int64))
+        if np.any(ns < 2):
+            raise ValueError('n must be at least 2')
+        self.n = ns.tolist()
+
+        effects = []
+        for i in _xrange(1,len(factors)+1):
+            for efs in _xunique_combinations(factors, i):
+                effects.append(tuple(efs))
+
+        # scenarios (rows) by effects (columns)
+        sizes = {}
+        for key, f in effect_sizes.items():
+            if isinstance(key, _strobj):
+                key = (key,)
+            key = frozenset(key)
+            if key not in [frozenset(efs) for efs in effects]:
+                raise KeyError('%s is not an effect of the design'%str(key))
+            sizes[key] = f
+
+        fs = []
+        for efs in effects:
+            fs.append(np.array(sizes.get(frozenset(efs), 0.),
+                               dtype=np.float64))
+        fs = np.array(np.broadcast_arrays(*fs), dtype=np.float64)
+        fs = np.atleast_2d(fs.T)
+
+        Nw = np.prod(D[:len(wfactors)])*1.
+        Nb = np.prod(D[len(wfactors):])*1.
+
+        # effects by scenarios by sample sizes
+        df, dfe, es = [], [], []
+        for efs in effects:
+            d = [D[factors.index(f)] for f in efs]
+            df.append(np.prod([x-1. for x in d]))
+
+            if all([f in bfactors for f in efs]):
+                dfe.append(ns*Nb - Nb)
+                es.append(1.)
+            else:
+                dfe.append(np.prod([x-1. for x, f in zip(d, efs)
+                                    if f in wfactors]) * (ns*Nb - Nb))
+                es.append(eps)
+
+        df = np.array(df)[:,None,None]
+        dfe = np.array(dfe)[:,None,:]
+        es = np.array(es)[:,None,None]
+        lam = fs.T[:,:,None]**2 * (ns*Nb*Nw)[None,None,:]
+
+        crit_f = scipy.stats.f.ppf(1.-alpha, df*es, dfe*es)
+        power = observed_power(df, dfe, lam, alpha, es)
+
+        # ncf is not defined for a non-centrality of 0
+        power = np.where(lam > 0., power, alpha)
+
+        for i, efs in enumerate(effects):
+            r = {}
+            r['f'] = fs[:,i]
+            r['df'] = df[i,0,0]
+            r['dfe'] = dfe[i,0]
+            r['eps'] = es[i,0,0]
+            r['lambda'] = lam[i]
+            r['crit_f'] = crit_f[i,0]
+            r['power'] = power[i]
+            self[efs] = r
+
+        if simulations > 0:
+            self._simulate(D, fs, simulations, n_jobs, seed)
+
+    def _simulate(self, D, fs, simulations, n_jobs=1, seed=None):
+        """
+        Estimates the power of the effects ('power_sim') from the
+        proportion of significant simulated data sets.
+        """
+        factors = self.wfactors + self.bfactors
+        effects = self.keys()
+        
+        U = _effect_patterns(D, effects, factors)
+        means = np.dot(fs, U)
+
+        payload = (self.wfactors, self.bfactors, D, self.n,
+                   means, effects, self.alpha)
+        S = map_permutations(_power_simulations, payload,
+                             simulations, n_jobs, seed)
+        S = np.mean(S, 0).reshape(len(means), len(self.n), len(effects))
+
+        for i, efs in enumerate(effects):
+            self[efs]['power_sim'] = S[:,:,i]
+
+    def sample_size(self, power=.8):
+        """
+        Returns an OrderedDict mapping the effects to the smallest n
+        (for each scenario) with at least the requested power. The n
+        is nan when none of the sample sizes are large enough.
+        """
+        ns = np.array(self.n, dtype=np.float64)
+        
+        d = OrderedDict()
+        for efs, r in self.items():
+            # power increases with n
+            ok = r['power'] >= power
+            i = np.argmax(ok, 1)
+            d[efs] = np.where(np.any(ok, 1), ns[i], np.nan)
+        return d
+
+    def __str__(self):
+
+        if self == {}:
+            return '(no data in object)'
+
+        sim = self.simulations > 0
+        
+        tt = TextTable(max_width=0)
+        tt.set_cols_dtype(['t'] + ['a']*(7 + sim))
+        tt.set_cols_align(['l'] + ['r']*(7 + sim))
+        tt.set_deco(TextTable.HEADER)
+        tt.header(['Source', 'f', 'n', 'df', 'dfe', 'lambda',
+                   'Critical\nF', 'Power'] + ['Sim.\nPower']*sim)
+
+        for efs, r in self.items():
+            src = ''.join(['%s * '%f for f in efs])[:-3]
+            for k, f in enumerate(r['f']):
+                for j, n in enumerate(self.n):
+                    row = [src, f, n, r['df'], r['dfe'][j],
+                           r['lambda'][k,j], r['crit_f'][j],
+                           r['power'][k,j]]
+                    if sim:
+                        row.append(r['power_sim'][k,j])
+                    tt.add_row(row)
+
+        factors = self.wfactors + self.bfactors
+        title = 'ANOVA Power Analysis (alpha = %s)'%str(self.alpha)
+        design = ''.join([' %s *'%f for f in factors])[:-2]
+        
+        return '%s\n\nDesign:%s\n\n%s'%(title, design, tt.draw())
+
+    def __repr__(self):
+        if self == {}:
+            return 'AnovaPower()'
+
+        s = []
+        for k, v in self.items():
+            s.append("(%s, %s)"%(repr(k), repr(v)))
+        args = '[' + ', '.join(s) + ']'
+
+        kwds = []
+        if self.wfactors != []:
+            kwds.append(', wfactors=%s'%repr(self.wfactors))
+
+        if self.bfactors != []:
+            kwds.append(', bfactors=%s'%repr(self.bfactors))
+
+        if self.levels != {}:
+            kwds.append(', levels=%s'%repr(self.levels))
+
+        if self.n != []:
+            kwds.append(', n=%s'%repr(self.n))
+            
+        if self.alpha != 0.05:
+            kwds.append(', alpha=%s'%str(self.alpha))
+
+        if self.simulations != 0:
+            kwds.append(', simulations=%s'%repr(self.simulations))
+            
+        kwds= ''.join(kwds)
+        
+        return 'AnovaPower(%s%s)'%(args,kwds)
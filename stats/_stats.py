@@ -251,9 +251,35 @@ print stats.amean.__doc__ or whatever.
         self._types = self._dispatch.keys()
 
     def __call__(self, arg1, *args, **kw):
-        if type(arg1) not in self._types:
-            raise TypeError, "don't know how to dispatch %s arguments" %  type(arg1)
-        return apply(self._dispatch[type(arg1)], (arg1,) + args, kw)
+        func = self._dispatch.get(type(arg1))
+        if func == None:
+            # subclasses (masked arrays, memmaps, numpy scalars...)
+            for t in self._types:
+                if isinstance(arg1, t):
+                    func = self._dispatch[t]
+                    break
+            else:
+                raise TypeError, "don't know how to dispatch %s arguments" %  type(arg1)
+        return apply(func, (arg1,) + args, kw)
+
+
+class UfuncDispatch:
+    """
+Dispatches functions of several numeric arguments with ufunc semantics.
+The list (scalar) function is called when all of the arguments are
+numbers.  Otherwise the array function is called, which broadcasts its
+arguments (arrays, lists or tuples) against each other.
+"""
+
+    def __init__(self, lfunc, afunc):
+        self._lfunc = lfunc
+        self._afunc = afunc
+
+    def __call__(self, *args, **kw):
+        for arg in args:
+            if not isinstance(arg, (IntType, LongType, FloatType)):
+                return apply(self._afunc, args, kw)
+        return apply(self._lfunc, args, kw)
 
 
 ##########################################################################
@@ -939,7 +965,7 @@ Returns: Kendall's tau, two-tailed p-value
     n2 = 0
     iss = 0
     for j in range(len(x)-1):
-        for k in range(j,len(y)):
+        for k in range(j+1,len(y)):
             a1 = x[j] - x[k]
             a2 = y[j] - y[k]
             aa = a1 * a2
@@ -953,7 +979,7 @@ Returns: Kendall's tau, two-tailed p-value
             else:
                 if (a1):
                     n1 = n1 + 1
-                else:
+                if (a2):
                     n2 = n2 + 1
     tau = iss / math.sqrt(n1*n2)
     svar = (4.0*len(x)+10.0) / (9.0*len(x)*(len(x)-1))
@@ -1052,7 +1078,7 @@ Returns: t-value, two-tailed prob
 
     return t, prob, n1, n2, df, x1, x2, v1, v2, svar
 
-def ttest_ind_uneq (a, b, printit=0, name1='Samp1', name2='Samp2', writemode='a'):
+def lttest_ind_uneq (a, b, printit=0, name1='Samp1', name2='Samp2', writemode='a'):
     """
 Calculates the t-obtained T-test on TWO INDEPENDENT samples of
 scores a, and b assuming unequal variances. degrees of freedom are adjusted
@@ -1993,6 +2019,7 @@ linregress = Dispatch ( (llinregress, (ListType, TupleType)), )
 ## INFERENTIAL STATS:
 ttest_1samp = Dispatch ( (lttest_1samp, (ListType, TupleType)), )
 ttest_ind = Dispatch ( (lttest_ind, (ListType, TupleType)), )
+ttest_ind_uneq = Dispatch ( (lttest_ind_uneq, (ListType, TupleType)), )
 ttest_rel = Dispatch ( (lttest_rel, (ListType, TupleType)), )
 chisquare = Dispatch ( (lchisquare, (ListType, TupleType)), )
 ks_2samp = Dispatch ( (lks_2samp, (ListType, TupleType)), )
@@ -2053,6 +2080,40 @@ findwithin = Dispatch ( (lfindwithin, (ListType, TupleType)), )
 try:                         # DEFINE THESE *ONLY* IF NUMERIC IS AVAILABLE
  import numpy as N
  import numpy.linalg as LA
+ import scipy.special
+
+
+#####################################
+########  AMASKED ARRAYS  ###########
+#####################################
+
+ def _acompressed(a):
+    """
+Returns the values of a (raveled).  Masked values of masked arrays are
+dropped.
+
+Usage:   _acompressed(a)
+"""
+    if isinstance(a, N.ma.MaskedArray):
+        return a.compressed()
+    return N.ravel(a)
+
+
+ def _acompressed_pairs(a, b):
+    """
+Returns the values of a and b (raveled) without the pairs that have a
+masked value in a or b.
+
+Usage:   _acompressed_pairs(a, b)
+"""
+    a = N.ma.ravel(a)
+    b = N.ma.ravel(b)
+    valid = ~(N.ma.getmaskarray(a) | N.ma.getmaskarray(b))
+    a = N.ma.getdata(a)
+    b = N.ma.getdata(b)
+    if N.all(valid):
+        return a, b
+    return a[valid], b[valid]
 
 
 #####################################
@@ -2074,7 +2135,7 @@ Returns: geometric mean computed over dim(s) listed in dimension
 """
     inarray = N.array(inarray,N.float_)
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         size = len(inarray)
         mult = N.power(inarray,1.0/size)
         mult = N.multiply.reduce(mult)
@@ -2117,7 +2178,7 @@ Returns: harmonic mean computed over dim(s) in dimension
 """
     inarray = inarray.astype(N.float_)
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         size = len(inarray)
         s = N.add.reduce(1.0 / inarray)
     elif type(dimension) in [IntType,FloatType]:
@@ -2172,7 +2233,7 @@ Returns: arithematic mean calculated over dim(s) in dimension
     if inarray.dtype in [N.int_, N.short,N.ubyte]:
         inarray = inarray.astype(N.float_)
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         sum = N.add.reduce(inarray)
         denom = float(len(inarray))
     elif type(dimension) in [IntType,FloatType]:
@@ -2233,7 +2294,7 @@ Usage:   amedianscore(inarray,dimension=None)
 Returns: 'middle' score of the array, or the mean of the 2 middle scores
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     inarray = N.sort(inarray,dimension)
     if inarray.shape[dimension] % 2 == 0:   # if even number of elements
@@ -2259,7 +2320,7 @@ Returns: array of bin-counts for mode(s), array of corresponding modal values
 """
 
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     scores = _pstat.aunique(N.ravel(a))       # get ALL unique values
     testshape = list(a.shape)
@@ -2350,7 +2411,7 @@ Usage:   atmin(a,lowerlimit=None,dimension=None,inclusive=1)
      if inclusive:         lowerfcn = N.greater
      else:               lowerfcn = N.greater_equal
      if dimension == None:
-         a = N.ravel(a)
+         a = _acompressed(a)
          dimension = 0
      if lowerlimit == None:
          lowerlimit = N.minimum.reduce(N.ravel(a))-11
@@ -2370,7 +2431,7 @@ Usage:   atmax(a,upperlimit,dimension=None,inclusive=1)
      if inclusive:         upperfcn = N.less
      else:               upperfcn = N.less_equal
      if dimension == None:
-         a = N.ravel(a)
+         a = _acompressed(a)
          dimension = 0
      if upperlimit == None:
          upperlimit = N.maximum.reduce(N.ravel(a))+1
@@ -2441,7 +2502,7 @@ Usage:   amoment(a,moment=1,dimension=None)
 Returns: appropriate moment along given dimension
 """
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     if moment == 1:
         return 0.0
@@ -2511,7 +2572,7 @@ Usage:   adescribe(inarray,dimension=None)
 Returns: n, (min,max), mean, standard deviation, skew, kurtosis
 """
      if dimension == None:
-         inarray = N.ravel(inarray)
+         inarray = _acompressed(inarray)
          dimension = 0
      n = inarray.shape[dimension]
      mm = (N.minimum.reduce(inarray),N.maximum.reduce(inarray))
@@ -2537,7 +2598,7 @@ Usage:   askewtest(a,dimension=None)
 Returns: z-score and 2-tail z-probability
 """
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     b2 = askew(a,dimension)
     n = float(a.shape[dimension])
@@ -2562,7 +2623,7 @@ Usage:   akurtosistest(a,dimension=None)
 Returns: z-score and 2-tail z-probability, returns 0 for bad pixels
 """
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     n = float(a.shape[dimension])
     if n<20:
@@ -2594,7 +2655,7 @@ Usage:   anormaltest(a,dimension=None)
 Returns: z-score and 2-tail probability
 """
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     s,p = askewtest(a,dimension)
     k,p = akurtosistest(a,dimension)
@@ -2774,7 +2835,7 @@ with the same number of dimensions as inarray.
 Usage:   asamplevar(inarray,dimension=None,keepdims=0)
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     if dimension == 1:
         mn = amean(inarray,dimension)[:,N.NewAxis]
@@ -2830,8 +2891,7 @@ same number of dimensions as inarray.
 Usage:   acov(x,y,dimension=None,keepdims=0)
 """
     if dimension == None:
-        x = N.ravel(x)
-        y = N.ravel(y)
+        x, y = _acompressed_pairs(x, y)
         dimension = 0
     xmn = amean(x,dimension,1)  # keepdims
     xdeviations = x - xmn
@@ -2858,7 +2918,7 @@ same number of dimensions as inarray.
 Usage:   avar(inarray,dimension=None,keepdims=0)
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     mn = amean(inarray,dimension,1)
     deviations = inarray - mn
@@ -2896,7 +2956,7 @@ an array with the same number of dimensions as inarray.
 Usage:   asterr(inarray,dimension=None,keepdims=0)
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     return astdev(inarray,dimension,keepdims) / float(N.sqrt(inarray.shape[dimension]))
 
@@ -2912,7 +2972,7 @@ same number of dimensions as inarray.
 Usage:   asem(inarray,dimension=None, keepdims=0)
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     if type(dimension) == ListType:
         n = 1
@@ -3183,6 +3243,9 @@ Usage:   apearsonr(x,y,verbose=1)      where x,y are equal length arrays
 Returns: Pearson's r, two-tailed p-value
 """
     TINY = 1.0e-20
+    x, y = _acompressed_pairs(x, y)
+    x = x.astype(N.float_)
+    y = y.astype(N.float_)
     n = len(x)
     xmean = amean(x)
     ymean = amean(y)
@@ -3192,7 +3255,7 @@ Returns: Pearson's r, two-tailed p-value
     df = n-2
     t = r*math.sqrt(df/((1.0-r+TINY)*(1.0+r+TINY)))
     prob = abetai(0.5*df,0.5,df/(df+t*t),verbose)
-    return r,prob
+    return float(r), float(prob)
 
 
  def aspearmanr(x,y):
@@ -3247,35 +3310,81 @@ Returns: Point-biserial r, two-tailed p-value
         return rpb, prob
 
 
+ def _aties(a):
+    """
+Returns the number of tied pairs in the sorted array a.
+"""
+    if len(a) == 0:
+        return 0
+    first = N.concatenate(([True], a[1:] != a[:-1]))
+    counts = N.diff(N.concatenate((N.nonzero(first)[0], [len(a)])))
+    return int(N.sum(counts*(counts-1)//2))
+
+
+ def _ainversions(a):
+    """
+Returns the number of pairs i < j with a[i] > a[j] in the integer array
+a (0 <= a < m).  Bottom-up merge sort; the merges of all the blocks of a
+level are counted with one searchsorted on keys offset by block pair.
+"""
+    n = len(a)
+    m = int(N.max(a)) + 1 if n else 1
+    a = N.asarray(a, N.int64)
+    inversions = 0
+    width = 1
+    while width < n:
+        block = N.arange(n) // width
+        pair = block // 2
+        left = block % 2 == 0
+        keys = pair*m + a
+        lkeys = keys[left]
+        rpair = pair[~left]
+        # left elements of the same pair greater than each right element
+        pos = N.searchsorted(lkeys, keys[~left], side='right')
+        end = N.searchsorted(lkeys, (rpair+1)*m, side='left')
+        inversions += int(N.sum(end - pos))
+        a = N.sort(keys, kind='mergesort') - pair*m
+        width *= 2
+    return inversions
+
+
  def akendalltau(x,y):
     """
-Calculates Kendall's tau ... correlation of ordinal data.  Adapted
-from function kendl1 in Numerical Recipies.  Needs good test-cases.@@@
+Calculates Kendall's tau-b ... correlation of ordinal data.  Uses
+Knight's O(n log n) algorithm: the pairs are sorted on x (then y)
+and the discordant pairs are counted as the inversions of a merge
+sort on y.  Ties are handled as in tau-b.
 
 Usage:   akendalltau(x,y)
 Returns: Kendall's tau, two-tailed p-value
 """
-    n1 = 0
-    n2 = 0
-    iss = 0
-    for j in range(len(x)-1):
-        for k in range(j,len(y)):
-            a1 = x[j] - x[k]
-            a2 = y[j] - y[k]
-            aa = a1 * a2
-            if (aa):             # neither array has a tie
-                n1 = n1 + 1
-                n2 = n2 + 1
-                if aa > 0:
-                    iss = iss + 1
-                else:
-                    iss = iss -1
-            else:
-                if (a1):
-                    n1 = n1 + 1
-                else:
-                    n2 = n2 + 1
-    tau = iss / math.sqrt(n1*n2)
+    x = N.ravel(N.asarray(x))
+    y = N.ravel(N.asarray(y))
+    if len(x) <> len(y):
+        raise ValueError, 'Input values not paired in kendalltau.  Aborting.'
+    n = len(x)
+
+    perm = N.lexsort((y, x))
+    x = x[perm]
+    y = y[perm]
+
+    # pairs tied in x, in y, and in both
+    xtie = _aties(x)
+    first = N.concatenate(([True], (x[1:] != x[:-1]) | (y[1:] != y[:-1])))
+    counts = N.diff(N.concatenate((N.nonzero(first)[0], [n])))
+    ntie = int(N.sum(counts*(counts-1)//2))
+
+    yranks = N.unique(y, return_inverse=True)[1]
+    discordant = _ainversions(yranks)
+    ytie = _aties(N.sort(y))
+
+    tot = n*(n-1)//2
+    if tot == xtie or tot == ytie:
+        # x or y is constant, tau-b is undefined
+        return N.nan, N.nan
+
+    iss = tot - xtie - ytie + ntie - 2*discordant
+    tau = iss / math.sqrt(float(tot-xtie)*float(tot-ytie))
     svar = (4.0*len(x)+10.0) / (9.0*len(x)*(len(x)-1))
     z = tau / math.sqrt(svar)
     prob = erfcc(abs(z)/1.4142136)
@@ -3376,17 +3485,16 @@ to the screen.  If printit='filename', the results are output to 'filename'
 using the given writemode (default=append).  Returns t-value, and prob.
 
 Usage:   attest_1samp(a,popmean,Name='Sample',printit=0,writemode='a')
-Returns: t-value, two-tailed prob
+Returns: t-value, two-tailed prob, n, df, mean, variance
 """
-    if type(a) != N.ndarray:
-        a = N.array(a)
+    a = _acompressed(N.asarray(a) if type(a) == ListType else a)
     x = amean(a)
     v = avar(a)
     n = len(a)
     df = n-1
     svar = ((n-1)*v) / float(df)
     t = (x-popmean)/math.sqrt(svar*(1.0/n))
-    prob = abetai(0.5*df,0.5,df/(df+t*t))
+    prob = abetai(0.5*df,0.5,float(df)/(df+t*t),0)
 
     if printit <> 0:
         statname = 'Single-sample T-test.'
@@ -3395,7 +3503,7 @@ Returns: t-value, two-tailed prob
                           name,n,x,v,N.minimum.reduce(N.ravel(a)),
                           N.maximum.reduce(N.ravel(a)),
                           statname,t,prob)
-    return t,prob
+    return float(t), float(prob), n, df, float(x), float(v)
 
 
  def attest_ind (a, b, dimension=None, printit=0, name1='Samp1', name2='Samp2',writemode='a'):
@@ -3409,11 +3517,13 @@ which to operate on a and b).
 
 Usage:   attest_ind (a,b,dimension=None,printit=0,
                      Name1='Samp1',Name2='Samp2',writemode='a')
-Returns: t-value, two-tailed p-value
+Returns: t-value, two-tailed p-value, n1, n2, df, mean1, mean2,
+         variance1, variance2, pooled variance
 """
-    if dimension == None:
-        a = N.ravel(a)
-        b = N.ravel(b)
+    scalar = dimension == None
+    if scalar:
+        a = _acompressed(a)
+        b = _acompressed(b)
         dimension = 0
     x1 = amean(a,dimension)
     x2 = amean(b,dimension)
@@ -3427,7 +3537,7 @@ Returns: t-value, two-tailed p-value
     svar = N.where(zerodivproblem,1,svar)  # avoid zero-division in 1st place
     t = (x1-x2)/N.sqrt(svar*(1.0/n1 + 1.0/n2))  # N-D COMPUTATION HERE!!!!!!
     t = N.where(zerodivproblem,1.0,t)     # replace NaN/wrong t-values with 1.0
-    probs = abetai(0.5*df,0.5,float(df)/(df+t*t))
+    probs = abetai(0.5*df,0.5,float(df)/(df+t*t),0)
 
     if type(t) == N.ndarray:
         probs = N.reshape(probs,t.shape)
@@ -3447,7 +3557,47 @@ Returns: t-value, two-tailed p-value
                           N.maximum.reduce(N.ravel(b)),
                           statname,t,probs)
         return
-    return t, probs
+    if scalar:
+        t, probs, x1, x2, v1, v2, svar = \
+           map(float, [t, probs, x1, x2, v1, v2, svar])
+    return t, probs, n1, n2, df, x1, x2, v1, v2, svar
+
+
+ def attest_ind_uneq (a, b, printit=0, name1='Samp1', name2='Samp2', writemode='a'):
+    """
+Calculates the t-obtained T-test on TWO INDEPENDENT samples of
+scores a, and b assuming unequal variances. degrees of freedom are adjusted
+based on the Welch-Satterthwaite equation. If printit='filename', the
+results are output to 'filename' using the given writemode (default=append).
+
+Usage:   attest_ind_uneq(a,b,printit=0,name1='Samp1',name2='Samp2',writemode='a')
+Returns: t-value, two-tailed prob, n1, n2, df, mean1, mean2,
+         variance1, variance2
+"""
+    a = _acompressed(a)
+    b = _acompressed(b)
+    x1 = amean(a)
+    x2 = amean(b)
+    v1 = avar(a)
+    v2 = avar(b)
+    n1 = len(a)
+    n2 = len(b)
+    t = (x1-x2)/math.sqrt(v1/n1 + v2/n2)
+    df  = (v1/n1 + v2/n2)**2
+    df /= ((v1/n1)**2/(n1-1.) +(v2/n2)**2/(n2-1.))
+    prob = abetai(0.5*df,0.5,df/(df+t*t),0)
+
+    if printit <> 0:
+        statname = 'Independent samples T-test unequal variance.'
+        outputpairedstats(printit,writemode,
+                          name1,n1,x1,v1,N.minimum.reduce(a),
+                          N.maximum.reduce(a),
+                          name2,n2,x2,v2,N.minimum.reduce(b),
+                          N.maximum.reduce(b),
+                          statname,t,prob)
+
+    return float(t), float(prob), n1, n2, float(df), \
+           float(x1), float(x2), float(v1), float(v2)
 
  def ap2t(pval,df):
     """
@@ -3490,14 +3640,15 @@ which to operate on a and b).
 
 Usage:   attest_rel(a,b,dimension=None,printit=0,
                     name1='Samp1',name2='Samp2',writemode='a')
-Returns: t-value, two-tailed p-value
+Returns: t-value, two-tailed p-value, n, df, mean1, mean2,
+         variance1, variance2
 """
-    if dimension == None:
-        a = N.ravel(a)
-        b = N.ravel(b)
-        dimension = 0
     if len(a)<>len(b):
         raise ValueError, 'Unequal length arrays.'
+    scalar = dimension == None
+    if scalar:
+        a, b = _acompressed_pairs(a, b)
+        dimension = 0
     x1 = amean(a,dimension)
     x2 = amean(b,dimension)
     v1 = avar(a,dimension)
@@ -3511,7 +3662,7 @@ Returns: t-value, two-tailed p-value
     denom = N.where(zerodivproblem,1,denom)  # avoid zero-division in 1st place
     t = N.add.reduce(d,dimension) / denom      # N-D COMPUTATION HERE!!!!!!
     t = N.where(zerodivproblem,1.0,t)     # replace NaN/wrong t-values with 1.0
-    probs = abetai(0.5*df,0.5,float(df)/(df+t*t))
+    probs = abetai(0.5*df,0.5,float(df)/(df+t*t),0)
     if type(t) == N.ndarray:
         probs = N.reshape(probs,t.shape)
     if probs.shape == (1,):
@@ -3526,7 +3677,10 @@ Returns: t-value, two-tailed p-value
                           N.maximum.reduce(N.ravel(b)),
                           statname,t,probs)
         return
-    return t, probs
+    if scalar:
+        t, probs, x1, x2, v1, v2 = map(float, [t, probs, x1, x2, v1, v2])
+        df = n-1
+    return t, probs, n, df, x1, x2, v1, v2
 
 
  def achisquare(f_obs,f_exp=None):
@@ -3762,97 +3916,25 @@ Returns: chi-square statistic, associated p-value
  def achisqprob(chisq,df):
     """
 Returns the (1-tail) probability value associated with the provided chi-square
-value and df.  Heavily modified from chisq.c in Gary Perlman's |Stat.  Can
-handle multiple dimensions.
+value and df.  Can handle multiple dimensions; chisq and df are broadcast
+against each other.
 
 Usage:   achisqprob(chisq,df)    chisq=chisquare stat., df=degrees of freedom
 """
-    BIG = 200.0
-    def ex(x):
-        BIG = 200.0
-        exponents = N.where(N.less(x,-BIG),-BIG,x)
-        return N.exp(exponents)
-
-    if type(chisq) == N.ndarray:
-        arrayflag = 1
-    else:
-        arrayflag = 0
-        chisq = N.array([chisq])
-    if df < 1:
-        return N.ones(chisq.shape,N.float)
-    probs = N.zeros(chisq.shape,N.float_)
-    probs = N.where(N.less_equal(chisq,0),1.0,probs)  # set prob=1 for chisq<0
-    a = 0.5 * chisq
-    if df > 1:
-        y = ex(-a)
-    if df%2 == 0:
-        even = 1
-        s = y*1
-        s2 = s*1
-    else:
-        even = 0
-        s = 2.0 * azprob(-N.sqrt(chisq))
-        s2 = s*1
-    if (df > 2):
-        chisq = 0.5 * (df - 1.0)
-        if even:
-            z = N.ones(probs.shape,N.float_)
-        else:
-            z = 0.5 *N.ones(probs.shape,N.float_)
-        if even:
-            e = N.zeros(probs.shape,N.float_)
-        else:
-            e = N.log(N.sqrt(N.pi)) *N.ones(probs.shape,N.float_)
-        c = N.log(a)
-        mask = N.zeros(probs.shape)
-        a_big = N.greater(a,BIG)
-        a_big_frozen = -1 *N.ones(probs.shape,N.float_)
-        totalelements = N.multiply.reduce(N.array(probs.shape))
-        while asum(mask)<>totalelements:
-            e = N.log(z) + e
-            s = s + ex(c*z-a-e)
-            z = z + 1.0
-#            print z, e, s
-            newmask = N.greater(z,chisq)
-            a_big_frozen = N.where(newmask*N.equal(mask,0)*a_big, s, a_big_frozen)
-            mask = N.clip(newmask+mask,0,1)
-        if even:
-            z = N.ones(probs.shape,N.float_)
-            e = N.ones(probs.shape,N.float_)
-        else:
-            z = 0.5 *N.ones(probs.shape,N.float_)
-            e = 1.0 / N.sqrt(N.pi) / N.sqrt(a) * N.ones(probs.shape,N.float_)
-        c = 0.0
-        mask = N.zeros(probs.shape)
-        a_notbig_frozen = -1 *N.ones(probs.shape,N.float_)
-        while asum(mask)<>totalelements:
-            e = e * (a/z.astype(N.float_))
-            c = c + e
-            z = z + 1.0
-#            print '#2', z, e, c, s, c*y+s2
-            newmask = N.greater(z,chisq)
-            a_notbig_frozen = N.where(newmask*N.equal(mask,0)*(1-a_big),
-                                      c*y+s2, a_notbig_frozen)
-            mask = N.clip(newmask+mask,0,1)
-        probs = N.where(N.equal(probs,1),1,
-                        N.where(N.greater(a,BIG),a_big_frozen,a_notbig_frozen))
-        return probs
-    else:
-        return s
+    chisq = N.asarray(chisq,N.float_)
+    df = N.asarray(df,N.float_)
+    probs = scipy.special.chdtrc(df,N.maximum(chisq,0.0))
+    return N.where(N.less(df,1),1.0,probs)[()]
 
 
  def aerfcc(x):
     """
-Returns the complementary error function erfc(x) with fractional error
-everywhere less than 1.2e-7.  Adapted from Numerical Recipies.  Can
-handle multiple dimensions.
+Returns the complementary error function erfc(x).  Can handle multiple
+dimensions.
 
 Usage:   aerfcc(x)
 """
-    z = abs(x)
-    t = 1.0 / (1.0+0.5*z)
-    ans = t * N.exp(-z*z-1.26551223 + t*(1.00002368+t*(0.37409196+t*(0.09678418+t*(-0.18628806+t*(0.27886807+t*(-1.13520398+t*(1.48851587+t*(-0.82215223+t*0.17087277)))))))))
-    return N.where(N.greater_equal(x,0), ans, 2.0-ans)
+    return scipy.special.erfc(x)
 
 
  def azprob(z):
@@ -3862,36 +3944,11 @@ Thus,
     for z<0, zprob(z) = 1-tail probability
     for z>0, 1.0-zprob(z) = 1-tail probability
     for any z, 2.0*(1.0-zprob(abs(z))) = 2-tail probability
-Adapted from z.c in Gary Perlman's |Stat.  Can handle multiple dimensions.
+Can handle multiple dimensions.
 
 Usage:   azprob(z)    where z is a z-value
 """
-    def yfunc(y):
-        x = (((((((((((((-0.000045255659 * y
-                         +0.000152529290) * y -0.000019538132) * y
-                       -0.000676904986) * y +0.001390604284) * y
-                     -0.000794620820) * y -0.002034254874) * y
-                   +0.006549791214) * y -0.010557625006) * y
-                 +0.011630447319) * y -0.009279453341) * y
-               +0.005353579108) * y -0.002141268741) * y
-             +0.000535310849) * y +0.999936657524
-        return x
-
-    def wfunc(w):
-        x = ((((((((0.000124818987 * w
-                    -0.001075204047) * w +0.005198775019) * w
-                  -0.019198292004) * w +0.059054035642) * w
-                -0.151968751364) * w +0.319152932694) * w
-              -0.531923007300) * w +0.797884560593) * N.sqrt(w) * 2.0
-        return x
-
-    Z_MAX = 6.0    # maximum meaningful z-value
-    x = N.zeros(z.shape,N.float_) # initialize
-    y = 0.5 * N.fabs(z)
-    x = N.where(N.less(y,1.0),wfunc(y*y),yfunc(y-2.0)) # get x's
-    x = N.where(N.greater(y,Z_MAX*0.5),1.0,x)          # kill those with big Z
-    prob = N.where(N.greater(z,0),(x+1)*0.5,(1-x)*0.5)
-    return prob
+    return scipy.special.ndtr(z)
 
 
  def aksprob(alam):
@@ -3940,14 +3997,15 @@ Usage:   aksprob(alam)
     """
 Returns the 1-tailed significance level (p-value) of an F statistic
 given the degrees of freedom for the numerator (dfR-dfF) and the degrees
-of freedom for the denominator (dfF).  Can handle multiple dims for F.
+of freedom for the denominator (dfF).  Can handle multiple dimensions;
+the arguments are broadcast against each other.
 
 Usage:   afprob(dfnum, dfden, F)   where usually dfnum=dfbn, dfden=dfwn
 """
-    if type(F) == N.ndarray:
-        return abetai(0.5*dfden, 0.5*dfnum, dfden/(1.0*dfden+dfnum*F))
-    else:
-        return abetai(0.5*dfden, 0.5*dfnum, dfden/float(dfden+dfnum*F))
+    dfnum = N.asarray(dfnum,N.float_)
+    dfden = N.asarray(dfden,N.float_)
+    F = N.asarray(F,N.float_)
+    return abetai(0.5*dfden, 0.5*dfnum, dfden/(dfden+dfnum*F))
 
 
  def abetacf(a,b,x,verbose=1):
@@ -4004,23 +4062,13 @@ Usage:   abetacf(a,b,x,verbose=1)
 
  def agammln(xx):
     """
-Returns the gamma function of xx.
+Returns the natural log of the gamma function of xx.
     Gamma(z) = Integral(0,infinity) of t^(z-1)exp(-t) dt.
-Adapted from: Numerical Recipies in C.  Can handle multiple dims ... but
-probably doesn't normally have to.
+Can handle multiple dimensions.
 
 Usage:   agammln(xx)
 """
-    coeff = [76.18009173, -86.50532033, 24.01409822, -1.231739516,
-             0.120858003e-2, -0.536382e-5]
-    x = xx - 1.0
-    tmp = x + 5.5
-    tmp = tmp - (x+0.5)*N.log(tmp)
-    ser = 1.0
-    for j in range(len(coeff)):
-        x = x + 1
-        ser = ser + coeff[j]/x
-    return -tmp + N.log(2.50662827465*ser)
+    return scipy.special.gammaln(xx)
 
 
  def abetai(a,b,x,verbose=1):
@@ -4030,43 +4078,23 @@ Returns the incomplete beta function:
     I-sub-x(a,b) = 1/B(a,b)*(Integral(0,x) of t^(a-1)(1-t)^(b-1) dt)
 
 where a,b>0 and B(a,b) = G(a)*G(b)/(G(a+b)) where G(a) is the gamma
-function of a.  The continued fraction formulation is implemented
-here, using the betacf function.  (Adapted from: Numerical Recipies in
-C.)  Can handle multiple dimensions.
+function of a.  Can handle multiple dimensions; a, b and x are
+broadcast against each other.  verbose is kept for compatibility with
+the continued fraction implementation.
 
 Usage:   abetai(a,b,x,verbose=1)
 """
-    TINY = 1e-15
-    if type(a) == N.ndarray:
-        if asum(N.less(x,0)+N.greater(x,1)) <> 0:
-            raise ValueError, 'Bad x in abetai'
-    x = N.where(N.equal(x,0),TINY,x)
-    x = N.where(N.equal(x,1.0),1-TINY,x)
-
-    bt = N.where(N.equal(x,0)+N.equal(x,1), 0, -1)
-    exponents = ( gammln(a+b)-gammln(a)-gammln(b)+a*N.log(x)+b*
-                  N.log(1.0-x) )
-    # 746 (below) is the MAX POSSIBLE BEFORE OVERFLOW
-    exponents = N.where(N.less(exponents,-740),-740,exponents)
-    bt = N.exp(exponents)
-    if type(x) == N.ndarray:
-        ans = N.where(N.less(x,(a+1)/(a+b+2.0)),
-                      bt*abetacf(a,b,x,verbose)/float(a),
-                      1.0-bt*abetacf(b,a,1.0-x,verbose)/float(b))
-    else:
-        if x<(a+1)/(a+b+2.0):
-            ans = bt*abetacf(a,b,x,verbose)/float(a)
-        else:
-            ans = 1.0-bt*abetacf(b,a,1.0-x,verbose)/float(b)
-    return ans
+    x = N.asarray(x,N.float_)
+    if N.any(N.less(x,0)+N.greater(x,1)):
+        raise ValueError, 'Bad x in abetai'
+    return scipy.special.betainc(a,b,x)
 
 
 #####################################
 #######  AANOVA CALCULATIONS  #######
 #####################################
 
- import LinearAlgebra, operator
- LA = LinearAlgebra
+ import operator
 
  def aglm(data,para):
     """
@@ -4248,7 +4276,7 @@ over multiple dimensions, but this last one just barely makes sense).
 Usage:   acumsum(a,dimension=None)
 """
     if dimension == None:
-        a = N.ravel(a)
+        a = _acompressed(a)
         dimension = 0
     if type(dimension) in [ListType, TupleType, N.ndarray]:
         dimension = list(dimension)
@@ -4274,7 +4302,7 @@ Usage:   ass(inarray, dimension=None, keepdims=0)
 Returns: sum-along-'dimension' for (inarray*inarray)
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     return asum(inarray*inarray,dimension,keepdims)
 
@@ -4290,8 +4318,7 @@ dimensions).  A trivial function, but included for completeness.
 Usage:   asummult(array1,array2,dimension=None,keepdims=0)
 """
     if dimension == None:
-        array1 = N.ravel(array1)
-        array2 = N.ravel(array2)
+        array1, array2 = _acompressed_pairs(array1, array2)
         dimension = 0
     return asum(array1*array2,dimension,keepdims)
 
@@ -4308,7 +4335,7 @@ Usage:   asquare_of_sums(inarray, dimension=None, keepdims=0)
 Returns: the square of the sum over dim(s) in dimension
 """
     if dimension == None:
-        inarray = N.ravel(inarray)
+        inarray = _acompressed(inarray)
         dimension = 0
     s = asum(inarray,dimension,keepdims)
     if type(s) == N.ndarray:
@@ -4510,6 +4537,8 @@ Usage:   afindwithin(data)     data in |Stat format
                           (attest_1samp, (N.ndarray,)) )
  ttest_ind = Dispatch ( (lttest_ind, (ListType, TupleType)),
                         (attest_ind, (N.ndarray,)) )
+ ttest_ind_uneq = Dispatch ( (lttest_ind_uneq, (ListType, TupleType)),
+                             (attest_ind_uneq, (N.ndarray,)) )
  ttest_rel = Dispatch ( (lttest_rel, (ListType, TupleType)),
                         (attest_rel, (N.ndarray,)) )
  chisquare = Dispatch ( (lchisquare, (ListType, TupleType)),
@@ -4530,22 +4559,16 @@ Usage:   afindwithin(data)     data in |Stat format
                                 (afriedmanchisquare, (N.ndarray,)) )
  
 ## PROBABILITY CALCS:
- chisqprob = Dispatch ( (lchisqprob, (IntType, FloatType)),
-                        (achisqprob, (N.ndarray,)) )
- zprob = Dispatch ( (lzprob, (IntType, FloatType)),
-                    (azprob, (N.ndarray,)) )
+ chisqprob = UfuncDispatch(lchisqprob, achisqprob)
+ zprob = UfuncDispatch(lzprob, azprob)
  ksprob = Dispatch ( (lksprob, (IntType, FloatType)),
                      (aksprob, (N.ndarray,)) )
- fprob = Dispatch ( (lfprob, (IntType, FloatType)),
-                    (afprob, (N.ndarray,)) )
+ fprob = UfuncDispatch(lfprob, afprob)
  betacf = Dispatch ( (lbetacf, (IntType, FloatType)),
                      (abetacf, (N.ndarray,)) )
- betai = Dispatch ( (lbetai, (IntType, FloatType)),
-                    (abetai, (N.ndarray,)) )
- erfcc = Dispatch ( (lerfcc, (IntType, FloatType)),
-                    (aerfcc, (N.ndarray,)) )
- gammln = Dispatch ( (lgammln, (IntType, FloatType)),
-                     (agammln, (N.ndarray,)) )
+ betai = UfuncDispatch(lbetai, abetai)
+ erfcc = UfuncDispatch(lerfcc, aerfcc)
+ gammln = UfuncDispatch(lgammln, agammln)
  
 ## ANOVA FUNCTIONS:
  F_oneway = Dispatch ( (lF_oneway, (ListType, TupleType)),
@@ -18,6 +18,7 @@ from collections import OrderedDict
 from copy import copy
 
 # third party
+import numpy as np
 import scipy
 
 # included modules
@@ -102,14 +103,20 @@ class Ttest(OrderedDict):
           \mathrm{d.f.} = \frac{(s_1^2/n_1 + s_2^2/n_2)^2}{(s_1^2/n_1)^2/(n_1-1) + (s_2^2/n_2)^2/(n_2-1)}
         """
 
-        A = _flatten(list(copy(A)))
+        # arrays (including masked arrays) use the array statistics
+        if isinstance(A, np.ndarray):
+            A = A.ravel()
+        else:
+            A = _flatten(list(copy(A)))
 ##        try:
 ##            A = _flatten(list(copy(A)))
 ##        except:
 ##            raise TypeError('A must be a list-like object')
             
         try:
-            if B != None:
+            if isinstance(B, np.ndarray):
+                B = B.ravel()
+            elif B is not None:
                 B = _flatten(list(copy(B)))
         except:
             raise TypeError('B must be a list-like object')
@@ -130,8 +137,8 @@ class Ttest(OrderedDict):
         self.equal_variance = equal_variance
         self.alpha = alpha
 
-        if B == None:
-            t, prob2, n, df, mu, v = _stats.lttest_1samp(A, pop_mean)
+        if B is None:
+            t, prob2, n, df, mu, v = _stats.ttest_1samp(A, pop_mean)
 
             self.type = 't-Test: One Sample for means'
             self['t'] = t
@@ -257,7 +264,7 @@ class Ttest(OrderedDict):
             return '(no data in object)'
 
 
-        if self.B == None:
+        if self.B is None:
             tt = TextTable(max_width=100000000)
             tt.set_cols_dtype(['t', 'a'])
             tt.set_cols_align(['l', 'r'])
@@ -0,0 +1,369 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+
+# std lib
+from collections import OrderedDict
+
+# third party
+import numpy as np
+import scipy.stats
+
+# included modules
+from pyvttbl.stats import _stats
+from pyvttbl.stats._noncentral import nctcdf
+from pyvttbl.misc.texttable import Texttable as TextTable
+
+def _compressed(x):
+    """
+    Returns the values of x as a flat float array without the masked
+    and nan values.
+    """
+    x = np.ma.masked_invalid(np.ma.ravel(x).astype(np.float64))
+    return x.compressed()
+
+def _compressed_pairs(a, b):
+    """
+    Returns the values of a and b as flat float arrays without the
+    pairs that have a masked or nan value in a or b.
+    """
+    a = np.ma.masked_invalid(np.ma.ravel(a).astype(np.float64))
+    b = np.ma.masked_invalid(np.ma.ravel(b).astype(np.float64))
+    valid = ~(np.ma.getmaskarray(a) | np.ma.getmaskarray(b))
+    return np.ma.getdata(a)[valid], np.ma.getdata(b)[valid]
+
+def _moments(samples):
+    """
+    Returns the sizes, means and unbiased variances of the samples. All
+    of the samples are reduced together with bincount.
+    """
+    n = np.array([len(x) for x in samples], dtype=np.float64)
+    if len(samples) == 0:
+        return n, n.copy(), n.copy()
+
+    codes = np.repeat(np.arange(len(samples)), n.astype(np.int64))
+    X = np.concatenate(samples)
+    m = len(samples)
+
+    mu = np.bincount(codes, X, m) / n
+    ss = np.bincount(codes, (X - mu[codes])**2, m)
+    return n, mu, ss / (n - 1.)
+
+def _comoments(A, B, muA, muB):
+    """
+    Returns the unbiased covariances of the paired samples in A and B.
+    """
+    n = np.array([len(x) for x in A], dtype=np.float64)
+    if len(A) == 0:
+        return n
+
+    codes = np.repeat(np.arange(len(A)), n.astype(np.int64))
+    dA = np.concatenate(A) - muA[codes]
+    dB = np.concatenate(B) - muB[codes]
+    return np.bincount(codes, dA*dB, len(A)) / (n - 1.)
+
+def holm(p):
+    """
+    Returns the Holm-Bonferroni adjusted p-values of p. nan p-values
+    are ignored (and stay nan).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    adj = np.empty(p.shape)
+    adj.fill(np.nan)
+
+    i = np.flatnonzero(np.isfinite(p))
+    i = i[np.argsort(p[i], kind='mergesort')]
+    m = len(i)
+    adj[i] = np.minimum(1., np.maximum.accumulate((m - np.arange(m))*p[i]))
+    return adj
+
+def fdr(p):
+    """
+    Returns the Benjamini-Hochberg (false discovery rate) adjusted
+    p-values of p. nan p-values are ignored (and stay nan).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    adj = np.empty(p.shape)
+    adj.fill(np.nan)
+
+    i = np.flatnonzero(np.isfinite(p))
+    i = i[np.argsort(p[i], kind='mergesort')]
+    m = len(i)
+    q = m / np.arange(1., m + 1.) * p[i]
+    adj[i] = np.minimum(1., np.minimum.accumulate(q[::-1])[::-1])
+    return adj
+
+class TtestMany(OrderedDict):
+    """Batches of Student's t-tests"""
+    def __init__(self, *args, **kwds):
+        if len(args) > 1:
+            raise Exception('expecting only 1 argument')
+
+        if kwds.has_key('comparisons'):
+            self.comparisons = kwds['comparisons']
+        else:
+            self.comparisons = []
+
+        if kwds.has_key('paired'):
+            self.paired = kwds['paired']
+        else:
+            self.paired = False
+
+        if kwds.has_key('equal_variance'):
+            self.equal_variance = kwds['equal_variance']
+        else:
+            self.equal_variance = True
+
+        if kwds.has_key('alpha'):
+            self.alpha = kwds['alpha']
+        else:
+            self.alpha = 0.05
+
+        if kwds.has_key('correction'):
+            self.correction = kwds['correction']
+        else:
+            self.correction = None
+
+        if kwds.has_key('type'):
+            self.type = kwds['type']
+        else:
+            self.type = None
+
+        if len(args) == 1:
+            super(TtestMany, self).__init__(args[0])
+        else:
+            super(TtestMany, self).__init__()
+
+    def run(self, A, B=None, pop_mean=0., paired=False, equal_variance=True,
+            alpha=0.05, correction=None, comparisons=None):
+        """
+        Conducts a t-test for each of the samples in A (against the
+        corresponding sample in B).
+
+           args:
+              A: list of samples
+
+           kwds:
+              B: list of samples. If not specified one-sample t-tests
+                 comparing the samples in A with pop_mean are performed
+
+              pop_mean: the null population mean for one-sample t-tests.
+                        Ignored if B is supplied
+
+              paired:
+                 True: paired t-tests are conducted
+
+                 False: independent samples t-tests are conducted
+
+              equal_variance:
+                 True: assumes the samples have equal variances
+
+                 False: assumes the samples have unequal variances
+
+              alpha: the type-I error probability
+
+              correction:
+                 None: no correction for multiple comparisons
+
+                 'holm': Holm-Bonferroni adjusted p-values ('p_adj')
+
+                 'fdr': Benjamini-Hochberg adjusted p-values ('p_adj')
+
+              comparisons: labels of the comparisons
+
+           returns:
+              None
+
+        |   The results are arrays with an element for each comparison.
+            Masked and nan values are dropped (pairs with a masked or
+            nan value when paired is True). The means and variances of
+            all of the samples are computed with a few vectorized
+            reductions.
+        """
+        if correction not in [None, 'holm', 'fdr']:
+            raise ValueError("correction must be None, 'holm', or 'fdr'")
+
+        if B is not None and len(A) != len(B):
+            raise Exception('A and B must have the same number of samples')
+
+        if comparisons is None:
+            comparisons = list(_xrange(len(A)))
+        elif len(comparisons) != len(A):
+            raise Exception('expecting a label for each comparison')
+
+        self.clear()
+        self.comparisons = list(comparisons)
+        self.paired = paired
+        self.equal_variance = equal_variance
+        self.alpha = alpha
+        self.correction = correction
+
+        if B is None:
+            n, mu, v = _moments([_compressed(a) for a in A])
+            df = n - 1.
+            t = (mu - pop_mean)/np.sqrt(v/n)
+            d = np.abs(pop_mean - mu)/np.sqrt(v)
+            delta = np.sqrt(n)*d
+
+            self.type = 't-Test: One Sample for means'
+            self['n'] = n
+            self['mu'] = mu
+            self['pop_mean'] = pop_mean
+            self['var'] = v
+
+        elif paired:
+            pairs = [_compressed_pairs(a, b) for a, b in zip(A, B)]
+            A = [a for a, b in pairs]
+            B = [b for a, b in pairs]
+            n, mu1, v1 = _moments(A)
+            n, mu2, v2 = _moments(B)
+            cov = _comoments(A, B, mu1, mu2)
+            vd = v1 + v2 - 2.*cov
+            df = n - 1.
+            t = (mu1 - mu2)/np.sqrt(vd/n)
+            d = np.abs(mu1 - mu2)/np.sqrt(vd)
+            delta = np.sqrt(n)*d
+
+            self.type = 't-Test: Paired Two Sample for means'
+            self['n1'] = n
+            self['n2'] = n
+            self['r'] = cov/np.sqrt(v1*v2)
+            self['mu1'] = mu1
+            self['mu2'] = mu2
+            self['var1'] = v1
+            self['var2'] = v2
+
+        else:
+            n1, mu1, v1 = _moments([_compressed(a) for a in A])
+            n2, mu2, v2 = _moments([_compressed(b) for b in B])
+
+            if equal_variance:
+                df = n1 + n2 - 2.
+                svar = ((n1 - 1.)*v1 + (n2 - 1.)*v2)/df
+                t = (mu1 - mu2)/np.sqrt(svar*(1./n1 + 1./n2))
+                self.type = 't-Test: Two-Sample Assuming Equal Variances'
+            else:
+                se1, se2 = v1/n1, v2/n2
+                df = (se1 + se2)**2 / (se1**2/(n1 - 1.) + se2**2/(n2 - 1.))
+                t = (mu1 - mu2)/np.sqrt(se1 + se2)
+                self.type = 't-Test: Two-Sample Assuming Unequal Variances'
+
+            # the biased estimate of the pooled standard deviation
+            # is used so that the results agree with Ttest (and G*power)
+            d = np.abs(mu1 - mu2)/np.sqrt((v1 + v2)/2.)
+            delta = np.sqrt((n1*n2)/(n1 + n2))*d
+
+            self['n1'] = n1
+            self['n2'] = n2
+            self['mu1'] = mu1
+            self['mu2'] = mu2
+            self['var1'] = v1
+            self['var2'] = v2
+            if equal_variance:
+                self['vpooled'] = svar
+
+        p2tail = _stats.betai(0.5*df, 0.5, df/(df + t*t))
+
+        self['df'] = df
+        self['t'] = t
+        self['p2tail'] = p2tail
+        self['p1tail'] = p2tail / 2.
+        self['tc2tail'] = scipy.stats.t.ppf((1.-alpha), df)
+        self['tc1tail'] = scipy.stats.t.ppf((1.-alpha/2.), df)
+
+        # post-hoc power analysis (see Ttest)
+        self['cohen_d'] = d
+        self['delta'] = delta
+        self['power1tail'] = 1. - nctcdf(self['tc2tail'], df, delta)
+        self['power2tail'] = 1. - nctcdf(self['tc1tail'], df, delta)
+
+        if correction == 'holm':
+            self['p_adj'] = holm(p2tail)
+        elif correction == 'fdr':
+            self['p_adj'] = fdr(p2tail)
+
+    def __str__(self):
+
+        if self == {}:
+            return '(no data in object)'
+
+        adj = self.correction is not None
+        one = self.has_key('mu')
+
+        tt = TextTable(max_width=0)
+        tt.set_cols_dtype(['t'] + ['a']*(9 + adj - 2*one))
+        tt.set_cols_align(['l'] + ['r']*(9 + adj - 2*one))
+        tt.set_deco(TextTable.HEADER)
+
+        if one:
+            header = ['Comparison', 'n', 'Mean']
+        else:
+            header = ['Comparison', 'n1', 'n2', 'Mean 1', 'Mean 2']
+        header += ['df', 't', 'P(T<=t)\ntwo-tail']
+        if adj:
+            header.append('P adj.\n(%s)'%self.correction)
+        header += ['Effect\nsize d', 'Power\ntwo-tail']
+        tt.header(header)
+
+        for i, comparison in enumerate(self.comparisons):
+            if isinstance(comparison, tuple) and len(comparison) == 3:
+                src = '%s: %s vs. %s'%comparison
+            elif isinstance(comparison, tuple):
+                src = ' vs. '.join(str(c) for c in comparison)
+            else:
+                src = str(comparison)
+
+            if one:
+                row = [src, self['n'][i], self['mu'][i]]
+            else:
+                row = [src, self['n1'][i], self['n2'][i],
+                       self['mu1'][i], self['mu2'][i]]
+            row += [self['df'][i], self['t'][i], self['p2tail'][i]]
+            if adj:
+                row.append(self['p_adj'][i])
+            row += [self['cohen_d'][i], self['power2tail'][i]]
+            tt.add_row(row)
+
+        return '%s (alpha = %s)\n\n%s'%(self.type, str(self.alpha), tt.draw())
+
+    def __repr__(self):
+        if self == {}:
+            return 'TtestMany()'
+
+        s = []
+        for k, v in self.items():
+            s.append("('%s', %s)"%(k, repr(v)))
+        args = '[' + ', '.join(s) + ']'
+
+        kwds = []
+        if self.comparisons != []:
+            kwds.append(', comparisons=%s'%repr(self.comparisons))
+
+        if self.paired != False:
+            kwds.append(', paired=%s'%self.paired)
+
+        if self.equal_variance != True:
+            kwds.append(', equal_variance=%s'%self.equal_variance)
+
+        if self.alpha != 0.05:
+            kwds.append(', alpha=%s'%self.alpha)
+
+        if self.correction != None:
+            kwds.append(", correction='%s'"%self.correction)
+
+        if self.type != None:
+            kwds.append(", type='%s'"%self.type)
+
+        kwds= ''.join(kwds)
+
+        return 'TtestMany(%s%s)'%(args,kwds)
@@ -27,7 +27,9 @@ import math
 import scipy.stats
 import numpy as np
 
-from scipy.optimize import fminbound
+from collections import OrderedDict
+
+from scipy.optimize import brentq
 
 inf = np.inf
 
@@ -748,9 +750,276 @@ def _qsturng(p, r, v):
     return math.sqrt(2) * -y * \
            scipy.stats.t.isf((1.+p)/2., (v,1e38)[v>1e38])
 
-# make a qsturng functinon that will accept list-like objects
-_vqsturng = np.vectorize(_qsturng)
-_vqsturng.__doc__ = """vector version of qsturng"""
+# the A table as arrays for the vectorized qsturng. _A_arr[i,j] holds
+# the coefficients of (_p_arr[i], _v_arr[j]); combinations that are
+# not in A (v = 1 when p < .9) are nan
+_p_arr = np.array(p_keys)
+_v_arr = np.array([1.] + v_keys)
+_A_arr = np.empty((len(_p_arr), len(_v_arr), 4))
+_A_arr.fill(np.nan)
+for (_p, _v), _a in A.items():
+    _A_arr[p_keys.index(_p), np.searchsorted(_v_arr, _v)] = _a
+
+# break points and interpolation points of _select_ps
+_p_breaks = np.array([.5, .675, .7625, .825, .875, .9125, .95, .975, .99])
+_p_points = np.array([[.100, .500, .675],
+                      [.500, .675, .750],
+                      [.675, .750, .800],
+                      [.750, .800, .850],
+                      [.800, .850, .900],
+                      [.850, .900, .950],
+                      [.900, .950, .975],
+                      [.950, .975, .990],
+                      [.975, .990, .995],
+                      [.990, .995, .999]])
+
+# break points and interpolation points of _select_vs for v >= 19.5
+_v_breaks = np.array([19.5, 24., 30., 40., 60., 120.])
+_v_points = np.array([[19,  20,  24],
+                      [20,  24,  30],
+                      [24,  30,  40],
+                      [30,  40,  60],
+                      [40,  60, 120],
+                      [60, 120, inf]], dtype=np.float64)
+
+def _aphi(p):
+    """array version of _phi"""
+    a = (-3.969683028665376e+01,  2.209460984245205e+02, \
+         -2.759285104469687e+02,  1.383577518672690e+02, \
+         -3.066479806614716e+01,  2.506628277459239e+00)
+    b = (-5.447609879822406e+01,  1.615858368580409e+02, \
+         -1.556989798598866e+02,  6.680131188771972e+01, \
+         -1.328068155288572e+01 )
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, \
+         -2.400758277161838e+00, -2.549732539343734e+00, \
+          4.374664141464968e+00,  2.938163982698783e+00)
+    d = ( 7.784695709041462e-03,  3.224671290700398e-01, \
+          2.445134137142996e+00,  3.754408661907416e+00)
+
+    p = np.asarray(p, dtype=np.float64)
+    if np.any((p <= 0) | (p >= 1)):
+        raise ValueError('Argument to ltqnorm must be in open interval (0,1)')
+    
+    plow  = 0.02425
+    phigh = 1 - plow
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # tails
+        q  = np.sqrt(-2*np.log(np.where(p < plow, p, 1-p)))
+        x = (((((c[0]*q+c[1])*q+c[2])*q+c[3])*q+c[4])*q+c[5]) / \
+             ((((d[0]*q+d[1])*q+d[2])*q+d[3])*q+1)
+        x = np.where(p < plow, -x, x)
+
+        # central region
+        q = p - 0.5
+        r = q*q
+        y = -(((((a[0]*r+a[1])*r+a[2])*r+a[3])*r+a[4])*r+a[5])*q / \
+             (((((b[0]*r+b[1])*r+b[2])*r+b[3])*r+b[4])*r+1)
+
+    return np.where((p < plow) | (phigh < p), x, y)
+
+def _aptransform(p):
+    """array version of _ptransform"""
+    return -1. / (1. + 1.5 * _aphi((1. + p)/2.))
+
+def _acoef(p, v):
+    """returns the A table coefficients of the tabled p and v values"""
+    return _A_arr[np.searchsorted(_p_arr, p), np.searchsorted(_v_arr, v)]
+
+def _afunc(p, r, v):
+    """array version of _func for the tabled p and v values"""
+    a = _acoef(p, v)
+    lr = np.log(r-1.)
+    
+    # eq. 2.3
+    f = a[...,0]*lr + \
+        a[...,1]*lr**2 + \
+        a[...,2]*lr**3 + \
+        a[...,3]*lr**4
+
+    # eq. 2.7 and 2.8 corrections
+    v_ = np.where(np.isinf(v), 1e38, v)
+    f3 = f + -0.002 / (1. + 12. * _aphi(p)**2)
+    f3 = f3 + np.where(v <= 4.364,
+                       1./517. - 1./(312.*v_),
+                       1./(191.*v_))
+
+    return -np.where(r == 3, f3, f)
+
+def _aselect_ps(p):
+    """array version of _select_ps"""
+    P = _p_points[np.searchsorted(_p_breaks, p, side='right')]
+    return P[...,0], P[...,1], P[...,2]
+
+def _aselect_vs(v, p):
+    """array version of _select_vs"""
+    # round half away from zero like round()
+    vi = np.floor(v + .5)
+    V = np.array([vi-1., vi, vi+1.])
+
+    low = np.where(p >= .9, v < 2.5, v < 3.5)
+    V[:,low] = np.where(p[low] >= .9, [[1.], [2.], [3.]], [[2.], [3.], [4.]])
+
+    high = v >= 19.5
+    V[:,high] = _v_points[np.searchsorted(_v_breaks, v[high],
+                                          side='right') - 1].T
+    return V[0], V[1], V[2]
+
+def _atinv(p, v):
+    """inverse t transform of the quantiles"""
+    return scipy.stats.t.isf((1.+p)/2., np.where(v > 1e38, 1e38, v))
+
+def _ainterpolate_p(p, r, v):
+    """array version of _interpolate_p"""
+    p0, p1, p2 = _aselect_ps(p)
+
+    y0 = _afunc(p0, r, v) + 1.
+    y1 = _afunc(p1, r, v) + 1.
+    y2 = _afunc(p2, r, v) + 1.
+
+    rv = r/v
+    y_log0 = np.log(y0 + rv)
+    y_log1 = np.log(y1 + rv)
+    y_log2 = np.log(y2 + rv)
+
+    y = np.empty(p.shape)
+    
+    # If p < .85 apply only the ordinate transformation
+    # if p > .85 apply the ordinate and the abcissa transformation
+    # In both cases apply quadratic interpolation
+    for m, transform in [(p > .85, True), ((p > .5) & (p <= .85), False)]:
+        if not np.any(m):
+            continue
+
+        if transform:
+            x, x0, x1, x2 = [_aptransform(z[m]) for z in (p, p0, p1, p2)]
+        else:
+            x, x0, x1, x2 = p[m], p0[m], p1[m], p2[m]
+        yl0, yl1, yl2 = y_log0[m], y_log1[m], y_log2[m]
+
+        # calculate derivatives for quadratic interpolation
+        d2 = 2*((yl2-yl1)/(x2-x1) - \
+                (yl1-yl0)/(x1-x0))/(x2-x0)
+        d1 = np.where((p2[m]+p0[m]) >= (p1[m]+p1[m]),
+                      (yl2-yl1)/(x2-x1) - 0.5*d2*(x2-x1),
+                      (yl1-yl0)/(x1-x0) + 0.5*d2*(x1-x0))
+        d0 = yl1
+
+        # interpolate value
+        y_log = (d2/2.) * (x-x1)**2. + d1 * (x-x1) + d0
+
+        # transform back to y
+        y[m] = np.exp(y_log) - rv[m]
+
+    m = p <= .5
+    if np.any(m):
+        # linear interpolation in q and p
+        q0 = math.sqrt(2) * -y0[m] * _atinv(p0[m], v[m])
+        q1 = math.sqrt(2) * -y1[m] * _atinv(p1[m], v[m])
+
+        d1 = (q1-q0)/(p1[m]-p0[m])
+        d0 = q0
+
+        # interpolate values
+        q = d1 * (p[m]-p0[m]) + d0
+
+        # transform back to y
+        y[m] = -q / (math.sqrt(2) * _atinv(p[m], v[m]))
+
+    return y
+
+def _ainterpolate_v(p, r, v):
+    """array version of _interpolate_v"""
+    v0, v1, v2 = _aselect_vs(v, p)
+
+    # y = f - 1.
+    y0_sq = (_afunc(p, r, v0) + 1.)**2.
+    y1_sq = (_afunc(p, r, v1) + 1.)**2.
+    y2_sq = (_afunc(p, r, v2) + 1.)**2.
+
+    # if v2 is inf set to a big number so interpolation
+    # calculations will work
+    v2 = np.where(v2 > 1e38, 1e38, v2)
+
+    return _ainterpolate_inv_v(v, v0, v1, v2, y0_sq, y1_sq, y2_sq)
+
+def _ainterpolate_inv_v(v, v0, v1, v2, y0_sq, y1_sq, y2_sq):
+    """quadratic interpolation of y**2 over 1./v"""
+    # transform v
+    v_, v0_, v1_, v2_ = 1./v, 1./v0, 1./v1, 1./v2
+
+    # calculate derivatives for quadratic interpolation
+    d2 = 2.*((y2_sq-y1_sq)/(v2_-v1_) - \
+             (y0_sq-y1_sq)/(v0_-v1_)) / (v2_-v0_)
+    d1 = np.where((v2_ + v0_) >= (v1_ + v1_),
+                  (y2_sq-y1_sq) / (v2_-v1_) - 0.5*d2*(v2_-v1_),
+                  (y1_sq-y0_sq) / (v1_-v0_) + 0.5*d2*(v1_-v0_))
+    d0 = y1_sq
+
+    # calculate y
+    return np.sqrt((d2/2.)*(v_-v1_)**2. + d1*(v_-v1_)+ d0)
+
+def _aqsturng(p, r, v):
+    """
+    array version of qsturng. The p, r, and v are broadcast against
+    each other and the cases of _qsturng are evaluated for all of the
+    elements that need them at once.
+    """
+    p, r, v = np.broadcast_arrays(np.asarray(p, dtype=np.float64),
+                                  np.asarray(r, dtype=np.float64),
+                                  np.asarray(v, dtype=np.float64))
+    shape = p.shape
+    p, r, v = p.flatten(), r.flatten(), v.flatten()
+    
+    if np.any((p < .1) | (p > .999)):
+        raise ValueError('p must be between .1 and .999')
+    if np.any((p < .9) & (v < 2)):
+        raise ValueError('v must be > 2 when p < .9')
+    if np.any((p >= .9) & (v < 1)):
+        raise ValueError('v must be > 1 when p >= .9')
+
+    # which p and v values are in the A table
+    i = np.minimum(np.searchsorted(_p_arr, p), len(_p_arr)-1)
+    p_in = _p_arr[i] == p
+    j = np.minimum(np.searchsorted(_v_arr, v), len(_v_arr)-1)
+    v_in = (_v_arr[j] == v) & ((v != 1.) | (p >= .9))
+
+    y = np.empty(p.shape)
+    y.fill(np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # The easy case. A tabled value is requested.
+        m = p_in & v_in
+        if np.any(m):
+            y[m] = _afunc(p[m], r[m], v[m]) + 1.
+
+        # apply bilinear (quadratic) interpolation (see _qsturng)
+        m = ~p_in & ~v_in
+        if np.any(m):
+            pm, rm, vm = p[m], r[m], v[m]
+            v0, v1, v2 = _aselect_vs(vm, pm)
+            r0_sq = _ainterpolate_p(pm, rm, v0)**2
+            r1_sq = _ainterpolate_p(pm, rm, v1)**2
+            r2_sq = _ainterpolate_p(pm, rm, v2)**2
+            y[m] = _ainterpolate_inv_v(vm, v0, v1, v2,
+                                       r0_sq, r1_sq, r2_sq)
+
+        m = p_in & ~v_in
+        if np.any(m):
+            y[m] = _ainterpolate_v(p[m], r[m], v[m])
+
+        m = ~p_in & v_in
+        if np.any(m):
+            y[m] = _ainterpolate_p(p[m], r[m], v[m])
+
+    q = math.sqrt(2) * -y * _atinv(p, v)
+    return q.reshape(shape)
+
+# results of qsturng for scalar arguments, least recently used first
+_cache = OrderedDict()
+
+#: number of (p, r, v) results kept by qsturng
+CACHESIZE = 10000
 
 def qsturng(p, r, v):
     """Approximates the quantile p for a studentized range
@@ -778,12 +1047,27 @@ def qsturng(p, r, v):
     -------
     q : (scalar, array_like)
         approximation of the Studentized Range
+
+    Notes
+    -----
+    Array arguments are broadcast and evaluated together. The results
+    of scalar calls are kept in a least recently used cache of
+    CACHESIZE entries.
         
     """
     
     if all(map(_isfloat, [p, r, v])):
-        return _qsturng(p, r, v)
-    return _vqsturng(p, r, v)
+        key = (float(p), float(r), float(v))
+        if key in _cache:
+            q = _cache.pop(key)
+        else:
+            q = _qsturng(p, r, v)
+            if len(_cache) >= CACHESIZE:
+                _cache.popitem(last=False)
+        _cache[key] = q
+        return q
+    
+    return _aqsturng(p, r, v)
 
 ##def _qsturng0(p, r, v):
 ####    print 'q0',p
@@ -810,28 +1094,113 @@ def qsturng(p, r, v):
 ##        q += math.log10(r) * 2.25 * (.85-p)
 ##    return q
 
+#: tolerance of the p values found by psturng
+XTOL = 1e-12
+
+#: maximum number of points of the grids of psturng
+GRIDSIZE = 256
+
 def _psturng(q, r, v):
     """scalar version of psturng"""
     if q < 0.:
         raise ValueError('q should be >= 0')
 
-    opt_func = lambda p, r, v : abs(_qsturng(p, r, v) - q)
+    # qsturng is increasing in p so the p of q is the root of
+    # qsturng(p) - q. The quantiles go through the qsturng cache.
+    root_func = lambda p, r, v : qsturng(p, r, v) - q
     
     if v == 1:
-        if q < _qsturng(.9, r, 1):
+        if q < qsturng(.9, r, 1):
             return .1
-        elif q > _qsturng(.999, r, 1):
+        elif q > qsturng(.999, r, 1):
             return .001
-        return 1. - fminbound(opt_func, .9, .999, args=(r,v))
+        return 1. - brentq(root_func, .9, .999, args=(r,v), xtol=XTOL)
     else:
-        if q < _qsturng(.1, r, v):
+        if q < qsturng(.1, r, v):
             return .9
-        elif q > _qsturng(.999, r, v):
+        elif q > qsturng(.999, r, v):
             return .001
-        return 1. - fminbound(opt_func, .1, .999, args=(r,v))
+        return 1. - brentq(root_func, .1, .999, args=(r,v), xtol=XTOL)
 
-_vpsturng = np.vectorize(_psturng)
-_vpsturng.__doc__ = """vector version of psturng"""
+def _apsturng(q, r, v):
+    """
+    array version of psturng. The q, r, and v are broadcast against
+    each other.
+
+    The quantiles of each distinct (r, v) pair are evaluated with one
+    call of _aqsturng on a grid of p values (with at most as many
+    points as there are elements with that pair) to bracket the roots.
+    The roots of all of the elements are then refined together with
+    the Illinois (modified regula falsi) method.
+    """
+    q, r, v = np.broadcast_arrays(np.asarray(q, dtype=np.float64),
+                                  np.asarray(r, dtype=np.float64),
+                                  np.asarray(v, dtype=np.float64))
+    shape = q.shape
+    q, r, v = q.flatten(), r.flatten(), v.flatten()
+
+    if np.any(q < 0.):
+        raise ValueError('q should be >= 0')
+
+    # p of the roots and the bound p values of the other elements
+    p, bound = np.empty(q.shape), np.empty(q.shape)
+    a, b = np.empty(q.shape), np.empty(q.shape)
+    fa, fb = np.empty(q.shape), np.empty(q.shape)
+    inside = np.zeros(q.shape, dtype=bool)
+
+    # index of the distinct (r, v) pair of every element
+    ur, ir = np.unique(r, return_inverse=True)
+    uv, iv = np.unique(v, return_inverse=True)
+    pairs, ipair = np.unique(ir*len(uv) + iv, return_inverse=True)
+
+    for g, pair in enumerate(pairs):
+        m = np.flatnonzero(ipair == g)
+        rg, vg, qg = ur[pair // len(uv)], uv[pair % len(uv)], q[m]
+        plo = (.1, .9)[vg == 1]
+
+        # grid uniform in -log(1-p) so it is denser in the upper tail
+        n = min(GRIDSIZE, max(2, len(m)))
+        P = 1. - np.exp(np.linspace(math.log(1.-plo), math.log(.001), n))
+        P[0], P[-1] = plo, .999
+        Q = _aqsturng(P, rg, vg)
+        P, Q = P[~np.isnan(Q)], Q[~np.isnan(Q)]
+
+        bound[m[qg < Q[0]]] = (.9, .1)[vg == 1]
+        bound[m[qg > Q[-1]]] = .001
+
+        k = np.searchsorted(Q, qg)
+        ok = (qg >= Q[0]) & (qg <= Q[-1])
+        m, qg, k = m[ok], qg[ok], np.clip(k[ok], 1, len(P)-1)
+        a[m], b[m] = P[k-1], P[k]
+        fa[m], fb[m] = Q[k-1] - qg, Q[k] - qg
+        inside[m] = True
+
+    # fa <= 0 <= fb for all of the brackets
+    m = np.flatnonzero(inside)
+    side = np.zeros(len(m), dtype=int)
+    a, b, fa, fb = a[m], b[m], fa[m], fb[m]
+    while len(m) > 0:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            c = np.where(fb > fa, b - fb*(b-a)/(fb-fa), (a+b)/2.)
+            fc = _aqsturng(c, r[m], v[m]) - q[m]
+
+            # the quantiles that can not be interpolated (v == 1 and
+            # .9 < p < .9125) are below the root. The brackets with a
+            # nan end are bisected.
+            lo, hi = (fc < 0.) | np.isnan(fc), fc > 0.
+        p[m] = c
+
+        fb[lo & (side < 0)] /= 2.
+        fa[hi & (side > 0)] /= 2.
+        a[lo], fa[lo] = c[lo], fc[lo]
+        b[hi], fb[hi] = c[hi], fc[hi]
+        side = np.where(lo, -1, np.where(hi, 1, 0))
+
+        keep = (lo | hi) & (b - a > XTOL)
+        m, side, a, b, fa, fb = m[keep], side[keep], \
+                                a[keep], b[keep], fa[keep], fb[keep]
+
+    return np.where(inside, 1. - p, bound).reshape(shape)
 
 def psturng(q, r, v):
     """Evaluates the probability from 0 to q for a studentized
@@ -860,11 +1229,16 @@ def psturng(q, r, v):
         distribution. When v == 1, p is bound between .001
         and .1, when v > 1, p is bound between .001 and .9.
         Values between .5 and .9 are 1st order appoximations.
+
+    Notes
+    -----
+    Array arguments are broadcast and the p values of all of the
+    elements are found together (see _apsturng).
         
     """
     if all(map(_isfloat, [q, r, v])):
         return _psturng(q, r, v)
-    return _vpsturng(q, r, v)
+    return _apsturng(q, r, v)
 
 ##p, r, v = .9, 10, 20
 ##print
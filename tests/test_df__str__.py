@@ -8,9 +8,11 @@ import sys
 if sys.version_info[0] == 2:
     _strobj = basestring
     _xrange = xrange
+    from StringIO import StringIO
 elif sys.version_info[0] == 3:
     _strobj = str
     _xrange = range
+    from io import StringIO
     
 import unittest
 import warnings
@@ -77,6 +79,32 @@ class Test_df__str__(unittest.TestCase):
         df.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
 
         self.assertEqual(str(df),R)
+
+    def test1(self):
+        R = """SUBJECT   TIMEOFDAY   COURSE   MODEL   ERROR 
+============================================
+      1   T1          C1       M1         10 
+      1   T1          C1       M2          8 
+    ...   ...         ...      ...       ... 
+      3   T2          C3       M2          0 
+      3   T2          C3       M3          1 """
+        df=DataFrame()
+        df.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
+        df.MAXROWS = 4
+
+        self.assertEqual(str(df),R)
+
+    def test2(self):
+        df=DataFrame()
+        df['A'] = range(2000)
+        df['B'] = [i/2. for i in range(2000)]
+
+        fid = StringIO()
+        df.draw(fid, max_rows=0)
+        lines = fid.getvalue().splitlines()
+
+        self.assertEqual(len(lines), 2002)
+        self.assertEqual(lines[-1], '1999   999.500 ')
         
 def suite():
     return unittest.TestSuite((
@@ -0,0 +1,137 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.misc.support import *
+
+class _CountingCursor(object):
+    """sqlite3 cursor that counts the rows that are read from it"""
+    def __init__(self, cur):
+        self.cur = cur
+        self.nrows = 0
+
+    def __iter__(self):
+        for row in self.cur:
+            self.nrows += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self.cur, name)
+
+class Test_df_memmap(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        
+        self.df=DataFrame()
+        self.df.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
+        
+        self.mm=DataFrame()
+        self.mm.memmap(self.dirname)
+        self.mm.CHUNKSIZE = 7
+        self.mm.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
+
+    def tearDown(self):
+        del self.mm
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+    def test0(self):
+        self.assertEqual(self.df.keys(), self.mm.keys())
+        self.assertEqual(self.df.types(), self.mm.types())
+        
+        for k in self.df.keys():
+            self.assertTrue(isinstance(np.ma.getdata(self.mm[k]), np.memmap))
+            self.assertEqual(list(self.df[k]), list(self.mm[k]))
+
+    def test1(self):
+        R = self.df.pivot('ERROR', ['TIMEOFDAY'], ['COURSE'])
+        D = self.mm.pivot('ERROR', ['TIMEOFDAY'], ['COURSE'])
+        self.assertEqual(str(R), str(D))
+
+    def test2(self):
+        R = self.df.where('ERROR > 3')
+        D = self.mm.where('ERROR > 3')
+        
+        self.assertTrue(isinstance(D['ERROR'], np.memmap))
+        self.assertEqual(str(R), str(D))
+
+    def test3(self):
+        R = self.df.descriptives('ERROR', where='MODEL == "M1"')
+        D = self.mm.descriptives('ERROR', where='MODEL == "M1"')
+        self.assertEqual(str(R), str(D))
+
+    def test4(self):
+        self.df.memmap(self.dirname)
+        self.df['X'] = range(self.df.shape()[1])
+        self.df.__setitem__('Y', range(self.df.shape()[1]),
+                            mask=[i%2 for i in range(self.df.shape()[1])])
+
+        self.assertTrue(isinstance(self.df['SUBJECT'], np.memmap))
+        self.assertTrue(isinstance(self.df['X'], np.memmap))
+        self.assertTrue(isinstance(self.df['Y'].data, np.memmap))
+        
+        self.df.where_update('Y < 10')
+        self.assertEqual(list(self.df['X']), [0, 2, 4, 6, 8])
+        self.assertEqual(self.df.types()[-2:], ['integer', 'integer'])
+
+    def test5(self):
+        # pivot only reads the levels and the cells back from sqlite3
+        n = 3000
+        df = DataFrame()
+        df.memmap(self.dirname)
+        df['ROW'] = [i%3 for i in range(n)]
+        df['COL'] = ['b%i'%(i%4) for i in range(n)]
+        df['Y'] = [i%7 for i in range(n)]
+
+        df.cur = _CountingCursor(df.cur)
+        for method in ['valid', 'full', 'sparse']:
+            pt = df.pivot('Y', ['ROW'], ['COL'], where='Y != 6', method=method)
+            self.assertEqual(list(pt.rnames),
+                             [[('ROW', 0)], [('ROW', 1)], [('ROW', 2)]])
+        self.assertTrue(df.cur.nrows < 100)
+
+        R = df.pivot('Y', ['ROW'], ['COL'])
+        self.assertAlmostEqual(R[0, 0], np.mean([i%7 for i in range(0, n, 12)]))
+        self.assertAlmostEqual(R.grand_tot, np.mean([i%7 for i in range(n)]))
+
+    def test6(self):
+        # selected columns stay memory-mapped
+        X = self.mm.select_col('ERROR')
+        self.assertTrue(isinstance(np.ma.getdata(X), np.memmap))
+        self.assertTrue(np.may_share_memory(X, self.mm['ERROR']))
+        self.assertFalse(X is self.mm['ERROR'])
+        self.assertEqual(list(X), list(self.df.select_col('ERROR')))
+
+        X = self.mm.select_col('ERROR', where='MODEL == "M1"')
+        self.assertTrue(isinstance(np.ma.getdata(X), np.memmap))
+        self.assertFalse(np.may_share_memory(X, self.mm['ERROR']))
+        self.assertEqual(list(X),
+                         self.df.select_col('ERROR', where='MODEL == "M1"'))
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_df_memmap)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
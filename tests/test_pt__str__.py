@@ -255,6 +255,25 @@ CONDITION=adjective,   CONDITION=adjective,   CONDITION=counting,   CONDITION=co
         
         # verify the values in the table
         self.failUnlessEqual(str(D),R)
+
+    def test14(self):
+        R="""\
+avg(WORDS)
+CONDITION    AGE    Value  
+==========================
+adjective   old         11 
+adjective   young   14.800 
+...         ...        ... 
+rhyming     old      6.900 
+rhyming     young    7.600 
+==========================
+Total               11.610 """
+        
+        D = self.df.pivot('WORDS', rows=['CONDITION','AGE'])
+        D.MAXROWS = 4
+        
+        # verify the values in the table
+        self.failUnlessEqual(str(D),R)
         
 def suite():
     return unittest.TestSuite((
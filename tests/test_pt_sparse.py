@@ -0,0 +1,105 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+
+import numpy as np
+
+from pyvttbl import DataFrame, SparsePyvtTbl
+from pyvttbl.misc.support import *
+
+class Test_pt_sparse(unittest.TestCase):
+    def setUp(self):
+        self.df=DataFrame()
+        self.df.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
+        
+    def test0(self):
+        sp = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'],
+                           method='sparse')
+        pt = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'])
+
+        self.assertTrue(isinstance(sp, SparsePyvtTbl))
+        self.assertEqual(sp.shape, (3, 9))
+        self.assertEqual(sp.nnz, 27)
+        self.assertEqual(str(sp.todense()), str(pt))
+
+    def test1(self):
+        R ="""\
+avg(ERROR)
+COURSE   TIMEOFDAY=T1   TIMEOFDAY=T2   Total 
+============================================
+C1              7.167          3.222   4.800 
+C2              6.500          2.889   4.333 
+C3                  4          1.556   2.778 
+============================================
+Total           5.619          2.556   3.896 """
+        
+        sp = self.df.pivot('ERROR', ['TIMEOFDAY'], ['COURSE'],
+                           method='sparse')
+
+        self.assertEqual(str(sp.transpose().todense()), R)
+
+    def test2(self):
+        R ="""\
+N/A(ERROR)
+TIMEOFDAY   COURSE   ERROR 
+==========================
+T1          C1       7.167 
+T1          C2       6.500 
+T1          C3       4.000 
+T2          C1       3.222 
+T2          C2       2.889 
+T2          C3       1.556 """
+        
+        sp = self.df.pivot('ERROR', ['TIMEOFDAY'], ['COURSE'],
+                           method='sparse')
+        sp2 = (sp * 2.) / 2.
+
+        self.assertEqual(str(sp2), R)
+        self.assertAlmostEqual(sp2.grand_tot, 3.896, 3)
+        
+    def test3(self):
+        sp = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'],
+                           method='sparse')
+        pt = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'],
+                           method='full')
+
+        self.assertEqual(str(sp.todense(method='full')), str(pt))
+        self.assertEqual(str(sp.to_dataframe()), str(pt.to_dataframe()))
+        self.assertEqual(str(sp.to_dataframe(melt=True)),
+                         str(pt.to_dataframe(melt=True)))
+
+    def test4(self):
+        sp = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'],
+                           method='sparse')
+        pt = self.df.pivot('ERROR', ['SUBJECT'], ['COURSE','MODEL'])
+
+        for L, M in zip(sp, pt):
+            self.assertEqual(L.tolist(), M.flatten().tolist())
+
+        D = dict(sp.ndenumerate())
+        self.assertEqual(len(D), 27)
+        self.assertEqual(D[(1, 3)], pt[1, 3])
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_pt_sparse)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
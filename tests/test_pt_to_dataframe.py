@@ -91,6 +91,39 @@ LAB     young   11.875 """
         df2 = pt.to_dataframe()
 
         self.assertEqual(str(df2),R)
+
+    def test4(self):
+        R = """\
+CYCLE   GROUP   SUPPRESSION 
+===========================
+    1   AA           13.900 
+    1   AB           12.394 
+    1   LAB          19.862 
+    2   AA           17.744 
+    2   AB           21.637 
+    2   LAB          23.131 """
+        df = DataFrame()
+        df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+        pt = df.pivot('SUPPRESSION',
+                  rows=['CYCLE'],
+                  cols=['GROUP'],
+                  where=['CYCLE < 3'])
+        df2 = pt.to_dataframe(melt=True)
+
+        self.assertEqual(str(df2),R)
+
+    def test5(self):
+        df = DataFrame()
+        df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+        pt = df.pivot('SUPPRESSION',
+                  rows=['GROUP'],
+                  cols=['CYCLE'],
+                  aggregate='tolist')
+        df2 = pt.to_dataframe(melt=True)
+
+        self.assertEqual(df2.shape(), (3, 384))
+        self.assertAlmostEqual(sum(df2['SUPPRESSION']),
+                               sum(df['SUPPRESSION']))
         
 def suite():
     return unittest.TestSuite((
@@ -0,0 +1,83 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.misc.support import *
+
+class Test_pt_totals(unittest.TestCase):
+    def setUp(self):
+        self.df=DataFrame()
+        self.df.read_tbl('data/error~subjectXtimeofdayXcourseXmodel_MISSING.csv')
+
+    def _check(self, aggregate, func, method='valid'):
+        pt = self.df.pivot('ERROR', ['TIMEOFDAY','MODEL'], ['COURSE'],
+                           aggregate=aggregate, method=method)
+
+        x = np.array(self.df['ERROR'], dtype=float)
+        self.assertAlmostEqual(pt.grand_tot, func(x))
+
+        for i, rname in enumerate(pt.rnames):
+            cond = np.ones(len(x), dtype=bool)
+            for k, v in rname:
+                cond &= np.array(self.df[k]) == v
+            self.assertAlmostEqual(pt.row_tots[i], func(x[cond]))
+
+        for j, cname in enumerate(pt.cnames):
+            cond = np.array(self.df['COURSE']) == cname[0][1]
+            self.assertAlmostEqual(pt.col_tots[j], func(x[cond]))
+        
+    def test0(self):
+        self._check('count', len)
+        
+    def test1(self):
+        self._check('sum', np.sum)
+        
+    def test2(self):
+        self._check('avg', np.mean)
+        
+    def test3(self):
+        self._check('datarange', np.ptp)
+        
+    def test4(self):
+        self._check('var', lambda x: np.var(x, ddof=1))
+        
+    def test5(self):
+        self._check('stdevp', np.std)
+        
+    def test6(self):
+        self._check('sem', lambda x: np.std(x, ddof=1)/np.sqrt(len(x)))
+
+    def test7(self):
+        self._check('stdev', lambda x: np.std(x, ddof=1), method='full')
+
+    def test8(self):
+        pt = self.df.pivot('ERROR', ['TIMEOFDAY'], ['COURSE'],
+                           aggregate='median')
+        self.assertAlmostEqual(pt.grand_tot, np.median(self.df['ERROR']))
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_pt_totals)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,90 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+from collections import OrderedDict
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.stats import *
+from pyvttbl.misc.support import *
+
+class Test_anova_many(unittest.TestCase):
+    def setUp(self):
+        self.df = DataFrame()
+        self.df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+
+        rng = np.random.RandomState(1)
+        self.dvs = ['SUPPRESSION']
+        for i in range(3):
+            dv = 'DV%i'%i
+            self.df[dv] = self.df['SUPPRESSION'] * (i + 1.) + \
+                          rng.rand(self.df.shape()[1])
+            self.dvs.append(dv)
+        
+    def _check(self, **kwds):
+        aovs = self.df.anova_many(self.dvs, sub='SUBJECT', **kwds)
+
+        self.assertTrue(isinstance(aovs, OrderedDict))
+        self.assertEqual(list(aovs.keys()), self.dvs)
+        
+        for dv in self.dvs:
+            aov = self.df.anova(dv, sub='SUBJECT', **kwds)
+            self.assertEqual(str(aovs[dv]), str(aov))
+            
+    def test0(self):
+        self._check(wfactors=['CYCLE','PHASE'])
+
+    def test1(self):
+        self._check(bfactors=['GROUP','AGE'])
+
+    def test2(self):
+        self._check(wfactors=['CYCLE','PHASE'], bfactors=['GROUP','AGE'])
+
+    def test3(self):
+        aovs = Anova.run_many(self.df, self.dvs, wfactors=['PHASE'],
+                              bfactors=['AGE'], transform='log10')
+        
+        self.assertEqual(list(aovs.keys()), self.dvs)
+        self.assertEqual(aovs['DV0'].dv, 'LOG_DV0')
+
+    def test4(self):
+        self.assertEqual(Anova.run_many(self.df, []), OrderedDict())
+        self.assertEqual(self.df.anova_many([], wfactors=['PHASE']),
+                         OrderedDict())
+
+    def test5(self):
+        """the stacked epsilons match the epsilons of each matrix"""
+        from pyvttbl.stats._anova import _sphericity_many
+        
+        rs = np.random.RandomState(4)
+        for k, n, df1 in [(10, 3, 2.), (4, 6, 5.), (8, 2, 1.)]:
+            y = rs.randn(5, k, n)
+            E = _sphericity_many(y, df1)
+            for i in range(5):
+                if df1 == 1.:
+                    R = (1., 1., 1.)
+                else:
+                    yc = y[i] - np.mean(y[i], 1)[:,None]
+                    V = np.dot(yc.T, yc)
+                    gg = np.trace(V)**2 / (df1*np.trace(np.dot(V, V)))
+                    hf = (n*(k-1.)*gg-2.) / ((k-1.)*((n-1.)-(k-1.)*gg))
+                    R = (gg, min(max(hf, gg), 1.), max(1./(k-1.), 1./df1))
+                    
+                for e, r in zip(E, R):
+                    self.assertAlmostEqual(e[i], r)
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_anova_many)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,50 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.stats import *
+from pyvttbl.misc.support import *
+
+class Test_anova_marginal_means(unittest.TestCase):
+    def setUp(self):
+        self.df = DataFrame()
+        self.df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+        self.aov = self.df.anova('SUPPRESSION', sub='SUBJECT',
+                                 wfactors=['CYCLE','PHASE'],
+                                 bfactors=['GROUP'])
+        
+    def test0(self):
+        for efs in [['CYCLE'], ['PHASE', 'GROUP'],
+                    ['CYCLE', 'PHASE', 'GROUP']]:
+            names, dave, dsem = self.aov._marginal_means(efs)
+            ys = self.df.pivot('SUPPRESSION', rows=efs, aggregate='tolist')
+
+            self.assertEqual(len(names), len(ys))
+            for name, rname, m, s, y in zip(names, ys.rnames,
+                                            dave, dsem, ys):
+                y = y.flatten()
+                self.assertEqual(list(name), [c[1] for c in rname])
+                self.assertAlmostEqual(m, np.mean(y))
+                self.assertAlmostEqual(s, np.std(y, ddof=1)/math.sqrt(len(y)))
+
+    def test1(self):
+        D = self.aov._marginal_means(['CYCLE', 'GROUP'])
+        self.assertTrue(D is self.aov._marginal_means(('CYCLE', 'GROUP')))
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_anova_marginal_means)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
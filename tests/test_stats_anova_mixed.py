@@ -189,6 +189,39 @@ CYCLE   PHASE   GROUP   Mean    Std. Error   95% Lower Bound   95% Upper Bound
 
 
             
+    def test4(self):
+        """unequal numbers of observations per cell"""
+        rs = np.random.RandomState(7)
+        df = DataFrame()
+        S, A, B, Y = [], [], [], []
+        for s in range(1, 9):
+            b = 'b%i'%(s % 2 + 1)
+            for a in ['a1', 'a2', 'a3']:
+                for k in range(1 + (s*7 + len(a)*3 + ord(a[-1])) % 3):
+                    S.append(s)
+                    A.append(a)
+                    B.append(b)
+                    Y.append(rs.randn() + (a == 'a3')*.8 + s*.1)
+        df['SUBJECT'] = S
+        df['FA'] = A
+        df['FB'] = B
+        df['Y'] = Y
+
+        aov = df.anova('Y', sub='SUBJECT', wfactors=['FA'], bfactors=['FB'])
+
+        # the subject (and subject x FA) means are the means of the
+        # observations, not the means of the cell means
+        R = {('FA',): (6.3153071343307969, 44.078250847631054),
+             ('FB',): (0.0096128433709673552, 0.014409344347801067),
+             ('FA', 'FB'): (0.28559749179795912, 1.993353231625314),
+             ('SUBJECT',): (4.0123668086897242, None),
+             ('FA', 'SUBJECT'): (0.85964942068524119, None)}
+
+        for efs, (ss, F) in R.items():
+            self.assertAlmostEqual(aov[efs]['ss'], ss)
+            if F is not None:
+                self.assertAlmostEqual(aov[efs]['F'], F)
+
 def suite():
     return unittest.TestSuite((
             unittest.makeSuite(Test_anova_mixed)
@@ -0,0 +1,148 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+import pickle
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.stats import *
+from pyvttbl.stats._anova import Anova, _permute_conditions, _permuted, \
+                                  _permutation_F
+from pyvttbl.misc.support import *
+
+class Test_anova_permutation(unittest.TestCase):
+    def setUp(self):
+        self.df = DataFrame()
+        self.df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+
+    def _check(self, **kwds):
+        aov = self.df.anova('SUPPRESSION', sub='SUBJECT',
+                            permutations=60, seed=2, **kwds)
+        aov2 = self.df.anova('SUPPRESSION', sub='SUBJECT',
+                             permutations=60, seed=2, n_jobs=2, **kwds)
+        aov3 = self.df.anova('SUPPRESSION', sub='SUBJECT', **kwds)
+
+        # the parametric results are unchanged
+        self.assertEqual(str(aov), str(aov3))
+        self.assertEqual(aov.permutations, 60)
+        
+        factors = kwds.get('wfactors', []) + kwds.get('bfactors', [])
+        for efs in aov.keys():
+            if all([f in factors for f in efs]):
+                p = aov[efs]['p_perm']
+                self.assertTrue(1./61. <= p <= 1.)
+                self.assertEqual(p, aov2[efs]['p_perm'])
+
+        return aov
+    
+    def test0(self):
+        aov = self._check(wfactors=['CYCLE','PHASE'])
+        self.assertAlmostEqual(aov[('PHASE',)]['p_perm'], 1./61.)
+
+    def test1(self):
+        aov = self._check(bfactors=['GROUP','AGE'])
+        self.assertAlmostEqual(aov[('AGE',)]['p_perm'], 1./61.)
+
+    def test2(self):
+        aov = self._check(wfactors=['CYCLE','PHASE'], bfactors=['AGE'])
+        self.assertAlmostEqual(aov[('AGE',)]['p_perm'], 1./61.)
+        
+    def test3(self):
+        X = np.arange(24.).reshape(4, 6)
+        X[0, 1::2] = np.nan
+        X[1:, ::2] = np.nan
+        rs = np.random.RandomState(0)
+        
+        # within: each row keeps its values and between conditions
+        Y = _permute_conditions(X, 3, 2, True, rs)
+        for x, y in zip(X, Y):
+            self.assertEqual(sorted(x[~np.isnan(x)]),
+                             sorted(y[~np.isnan(y)]))
+            self.assertEqual(np.isnan(x).tolist(), np.isnan(y).tolist())
+
+        # between: each row keeps its within profile, the group sizes
+        # are unchanged
+        Y = _permute_conditions(X, 3, 2, False, rs)
+        for x, y in zip(X, Y):
+            self.assertEqual(x[~np.isnan(x)].tolist(),
+                             y[~np.isnan(y)].tolist())
+        self.assertEqual(np.sum(np.isnan(Y), 0).tolist(),
+                         np.sum(np.isnan(X), 0).tolist())
+
+    def test4(self):
+        listOflists=[[42,52,55,59,75,40,79,79,44,56,68,77,75,69],
+                     [29,36,29,31,97,88,27,57,54,77,54,52,58,91,78],
+                     [91,79,73,75,99,66,114,120,102,68,114,79,115,104,107,104]]
+
+        D = Anova1way()
+        D.run(listOflists, permutations=300, seed=0)
+        D2 = Anova1way()
+        D2.run(listOflists, permutations=300, seed=0, n_jobs=2)
+
+        self.assertAlmostEqual(D['p_perm'], 1./301.)
+        self.assertEqual(D['p_perm'], D2['p_perm'])
+        self.assertEqual(D['permutations'], 300)
+
+    def test5(self):
+        df = pickle.loads(pickle.dumps(self.df))
+        
+        self.assertEqual(list(df.keys()), list(self.df.keys()))
+        self.assertEqual(str(df), str(self.df))
+        self.assertEqual(str(df.pivot('SUPPRESSION', ['GROUP'])),
+                         str(self.df.pivot('SUPPRESSION', ['GROUP'])))
+
+    def test6(self):
+        # the batched F ratios match analyzing each permutation
+        for kwds in [dict(wfactors=['CYCLE','PHASE']),
+                     dict(bfactors=['GROUP','AGE']),
+                     dict(wfactors=['CYCLE'], bfactors=['GROUP','AGE'])]:
+            aov = self.df.anova('SUPPRESSION', sub='SUBJECT', **kwds)
+            wfactors = kwds.get('wfactors', [])
+            bfactors = kwds.get('bfactors', [])
+            Nw = int(np.prod(aov.D[:len(wfactors)]))
+            Nb = int(np.prod(aov.D[len(wfactors):]))
+            dfs = dict((k, (r.get('df'), r.get('dfe')))
+                       for k,r in aov.items())
+            effects = [k for k in aov.keys()
+                       if all([f in wfactors+bfactors for f in k])]
+
+            X = np.array(aov.pt, dtype=np.float64)
+            I = np.where(np.isnan(X), np.nan,
+                         np.arange(X.size).reshape(X.shape))
+            rs = np.random.RandomState(1)
+            for within in set([len(wfactors) > 0, len(bfactors) == 0]):
+                Ys, W, F = [], [], []
+                for i in range(4):
+                    Y = _permuted(X, _permute_conditions(I, Nw, Nb,
+                                                         within, rs))
+                    W.append(~np.isnan(Y)*1.)
+                    
+                    aov2 = Anova(dv='SUPPRESSION', sub='SUBJECT', **kwds)
+                    aov2.df, aov2.dftrim = aov.df, aov.dftrim
+                    aov2.pt, aov2.pt_counts = Y, None
+                    aov2._analyze(tests=False)
+                    F.append([aov2[efs]['F'] for efs in effects])
+                    Ys.append(aov2.pt_asarray)
+
+                F2 = _permutation_F(np.array(Ys), np.array(W), aov.D,
+                                    aov._effect_codes(), wfactors,
+                                    bfactors, 'SUBJECT', dfs)
+                for j, efs in enumerate(effects):
+                    for f, f2 in zip(np.array(F)[:,j], F2[efs]):
+                        self.assertAlmostEqual(f, f2, 8)
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_anova_permutation)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
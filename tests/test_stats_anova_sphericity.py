@@ -0,0 +1,85 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+import numpy as np
+
+from pyvttbl import DataFrame
+from pyvttbl.stats._anova import epsGG, epsHF, epsLB, sphericity
+from pyvttbl.misc.support import *
+
+class Test_anova_sphericity(unittest.TestCase):
+    def setUp(self):
+        # Maxwell and Delaney (p.497), see epsGG
+        self.y = np.array([[450, 510, 630],
+                           [390, 480, 540],
+                           [570, 630, 660],
+                           [450, 660, 720],
+                           [510, 660, 630],
+                           [360, 450, 450],
+                           [510, 600, 720],
+                           [510, 660, 780],
+                           [510, 660, 660],
+                           [510, 540, 660]], dtype=np.float64)
+        
+    def test0(self):
+        R = [(0.58135650965643015, 0.58135650965643015, 0.5),
+             (0.68309675893480992, 0.76383487097787173, 0.5)]
+
+        for y, r in zip([self.y, self.y.T], R):
+            for d, e in zip(sphericity(y, 2.), r):
+                self.assertAlmostEqual(d, e)
+            self.assertAlmostEqual(epsGG(y, 2.), r[0])
+            self.assertAlmostEqual(epsHF(y, 2.), r[1])
+            self.assertAlmostEqual(epsLB(y, 2.), r[2])
+
+    def test1(self):
+        self.assertEqual(sphericity(self.y, 1.), (1., 1., 1.))
+        
+        D = sphericity([self.y, self.y.T, self.y], [2., 2., 1.])
+        self.assertEqual(len(D), 3)
+        self.assertEqual(D[0], sphericity(self.y, 2.))
+        self.assertEqual(D[1], sphericity(self.y.T, 2.))
+        self.assertEqual(D[2], (1., 1., 1.))
+
+    def test2(self):
+        R = {('CYCLE',) : (0.70302750609879283, 0.70302750609879283,
+                           0.33333333333333333),
+             ('PHASE',) : (1., 1., 1.),
+             ('CYCLE', 'PHASE') : (0.69972272634675059, 0.69972272634675059,
+                                   0.33333333333333333),
+             ('AGE',) : (1., 1., 1.),
+             ('CYCLE', 'AGE') : (0.70302750609879361, 0.70302750609879361,
+                                 0.33333333333333331),
+             ('PHASE', 'AGE') : (1., 1., 1.),
+             ('CYCLE', 'PHASE', 'AGE') : (0.69972272634675048,
+                                          0.69972272634675048,
+                                          0.33333333333333331)}
+        
+        df = DataFrame()
+        df.read_tbl('data/suppression~subjectXgroupXageXcycleXphase.csv')
+
+        for kwds in [dict(wfactors=['CYCLE','PHASE']),
+                     dict(wfactors=['CYCLE','PHASE'], bfactors=['AGE'])]:
+            aov = df.anova('SUPPRESSION', sub='SUBJECT', **kwds)
+            
+            for efs, r in aov.items():
+                if 'eps_gg' in r:
+                    self.assertAlmostEqual(r['eps_gg'], R[efs][0])
+                    self.assertAlmostEqual(r['eps_hf'], R[efs][1])
+                    self.assertAlmostEqual(r['eps_lb'], R[efs][2])
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_anova_sphericity)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
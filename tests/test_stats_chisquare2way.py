@@ -12,6 +12,7 @@ from collections import Counter,OrderedDict
 from dictset import DictSet,_rep_generator
 from math import isnan, isinf, floor
 import numpy as np
+import scipy.stats
 from pprint import pprint as pp
 
 from pyvttbl import PyvtTbl
@@ -125,6 +126,43 @@ Power                    0.997 """
         x2= ChiSquare2way()
         x2.run(rfactors, cfactors)
         self.assertEqual(repr(x2), R)
+
+    def test3(self):
+        """chi-square 2-way agrees with scipy"""
+        rs = np.random.RandomState(5)
+        rfactors = rs.randint(0, 5, 10000)
+        cfactors = np.where(rs.rand(10000) < .1, rfactors % 4,
+                            rs.randint(0, 4, 10000))
+
+        x2 = ChiSquare2way()
+        x2.run(rfactors, cfactors)
+
+        observed = np.zeros((5, 4))
+        np.add.at(observed, (rfactors, cfactors), 1)
+        chisq, p, df, expected = \
+               scipy.stats.chi2_contingency(observed, correction=False)
+        lnchisq, lnp, df, expected = \
+                 scipy.stats.chi2_contingency(observed, correction=False,
+                                              lambda_='log-likelihood')
+        
+        self.assertAlmostEqual(x2['chisq'], chisq, 8)
+        self.assertAlmostEqual(x2['lnchisq'], lnchisq, 8)
+        self.assertAlmostEqual(x2['p'], p, 6)
+        self.assertEqual(x2['df'], df)
+        self.assertAlmostEqual(x2['CramerV'], np.sqrt(chisq/(10000.*3)), 12)
+        self.assertAlmostEqual(x2['C'], np.sqrt(chisq/(chisq + 10000.)), 12)
+        self.assertEqual(x2.counter[(2, 1)], observed[2, 1])
+        self.assertEqual(x2.row_counter[4], np.sum(observed[4]))
+
+    def test4(self):
+        """empty cells"""
+        x2 = ChiSquare2way()
+        x2.run(['a']*10 + ['b']*10, ['x']*10 + ['x']*5 + ['y']*5)
+
+        self.assertEqual(x2.counter[('a', 'y')], 0.)
+        self.assertAlmostEqual(x2['lnchisq'], 2*(10*np.log(10/7.5) +
+                                                 5*np.log(5/7.5) +
+                                                 5*np.log(5/2.5)), 8)
             
 def suite():
     return unittest.TestSuite((
@@ -0,0 +1,95 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+import numpy as np
+import scipy.stats
+
+from pyvttbl import DataFrame
+from pyvttbl.stats import *
+from pyvttbl.stats._permutation import random_tables
+from pyvttbl.misc.support import *
+
+class Test_chisquare_simulate(unittest.TestCase):
+    def test0(self):
+        """random tables have the margins and the expected counts"""
+        rs = np.random.RandomState(1)
+        row_tots, col_tots = [3, 0, 12, 5], [7, 1, 4, 8]
+        T = random_tables(rs, row_tots, col_tots, 20000)
+
+        self.assertEqual(T.shape, (20000, 4, 4))
+        self.assertTrue(np.all(np.sum(T, 2) == row_tots))
+        self.assertTrue(np.all(np.sum(T, 1) == col_tots))
+        self.assertTrue(np.all(T >= 0))
+
+        expected = np.outer(row_tots, col_tots)/20.
+        np.testing.assert_allclose(np.mean(T, 0), expected, atol=.05)
+
+        self.assertRaises(ValueError, random_tables, rs, [1, 2], [1, 1], 5)
+
+    def test1(self):
+        """2x2 Monte Carlo p-value agrees with the exact p-value"""
+        rfactors = ['a']*7 + ['b']*5
+        cfactors = ['x']*6 + ['y'] + ['x'] + ['y']*4
+
+        x2 = ChiSquare2way()
+        x2.run(rfactors, cfactors, simulate=20000, seed=3)
+
+        # enumerate the tables with the observed margins
+        E = np.outer([7., 5.], [7., 5.])/12.
+        exact = 0.
+        for a in range(8):
+            if not 2 <= a <= 7:
+                continue
+            O = np.array([[a, 7-a], [7-a, a-2]])
+            chisq = np.sum((O - E)**2/E)
+            if chisq >= x2['chisq'] - 1e-9:
+                exact += scipy.stats.hypergeom.pmf(a, 12, 7, 7)
+
+        self.assertAlmostEqual(x2['p_sim'], exact, 2)
+        self.assertEqual(x2['simulations'], 20000)
+        self.assertTrue('Monte Carlo P' in str(x2))
+
+    def test2(self):
+        """simulations are reproducible and independent of n_jobs"""
+        df = DataFrame()
+        df.read_tbl('data/words~ageXcondition.csv')
+        
+        x = df.chisquare2way('AGE', 'CONDITION', simulate=600, seed=4)
+        y = df.chisquare2way('AGE', 'CONDITION', simulate=600, seed=4,
+                             n_jobs=2)
+        z = df.chisquare2way('AGE', 'CONDITION')
+
+        self.assertEqual(x['p_sim'], y['p_sim'])
+        self.assertEqual(x['chisq'], z['chisq'])
+        self.assertFalse(z.has_key('p_sim'))
+
+        x = df.chisquare1way('CONDITION', simulate=600, seed=4)
+        y = df.chisquare1way('CONDITION', simulate=600, seed=4, n_jobs=2)
+        self.assertEqual(x['p_sim'], y['p_sim'])
+
+    def test3(self):
+        """1-way Monte Carlo p-value"""
+        x = ChiSquare1way()
+        x.run([28, 40, 32, 20], [30, 30, 30, 30], simulate=20000, seed=5)
+        self.assertAlmostEqual(x['p_sim'], x['p'], 1)
+        self.assertTrue('Monte Carlo P' in str(x))
+
+        # exact p-value of a small sample
+        x.run([3, 0], [1.5, 1.5], simulate=20000, seed=5)
+        self.assertAlmostEqual(x['p_sim'], .25, delta=.015)
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_chisquare_simulate)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -23,9 +23,9 @@ from pyvttbl.misc.support import *
 class Test_correlation(unittest.TestCase):
     def test0(self):
         R="""Correlation([\
-(('t1', 't2'), {'p': 9.699461194116956e-12, 'r': 0.9577922077922078}), \
-(('t1', 't3'), {'p': 2.2594982244811486e-09, 'r': -0.924025974025974}), \
-(('t2', 't3'), {'p': 6.850166042119375e-08, 'r': -0.8896103896103895})], \
+(('t1', 't2'), {'p': 9.699461194033283e-12, 'r': 0.9577922077922078}), \
+(('t1', 't3'), {'p': 2.2594982245208306e-09, 'r': -0.924025974025974}), \
+(('t2', 't3'), {'p': 6.85016604424206e-08, 'r': -0.8896103896103895})], \
 conditions_list=['t1', 't2', 't3'], coefficient='spearman', N=21)"""
         
         A=[24,61,59,46,43,44,52,43,58,67,62,57,71,49,54,43,53,57,49,56,33]
@@ -98,6 +98,99 @@ B vs. C   3         0.890   6.850e-08           0.050   **   """
         df = DataFrame()
         df.read_tbl('data/iqbrainsize.txt', delimiter='\t')
         cor = df.correlation(df.keys())
+
+    def test3(self):
+        """matrix results match the pairwise functions"""
+        rs = np.random.RandomState(1)
+        X = rs.randn(6, 30)
+        X[1] += X[0]
+        X[2] = np.round(X[2])
+        names = ['V%i'%i for i in range(6)]
+
+        for coefficient, func in [('pearson', pearsonr),
+                                  ('spearman', spearmanr)]:
+            cor = Correlation()
+            cor.run([list(x) for x in X], names, coefficient=coefficient)
+
+            self.assertEqual(cor.r.shape, (6, 6))
+            self.assertEqual(len(cor), 15)
+            
+            for (a, b), d in cor.items():
+                i, j = names.index(a), names.index(b)
+                r, p = func(list(X[i]), list(X[j]))
+                self.assertAlmostEqual(d['r'], r)
+                self.assertAlmostEqual(d['r'], cor.r[j,i])
+                self.assertAlmostEqual(d['p'], p)
+                self.assertEqual(d['p'], cor.p[i,j])
+
+            # step-down order
+            rs_ = [row[2] for row in cor.lm]
+            self.assertEqual(rs_, sorted(rs_, reverse=True))
+            self.assertEqual(cor.lm[0][0], ('V0', 'V1'))
+            self.assertAlmostEqual(cor.lm[-1][4], 0.05)
+
+    def test4(self):
+        cor = Correlation()
+        cor.run([['M','F','F','M','F'], [1.,2.,3.,4.,6.]],
+                ['SEX', 'Y'], coefficient='pointbiserial')
+
+        r, p = pointbiserialr(['M','F','F','M','F'], [1.,2.,3.,4.,6.])
+        self.assertAlmostEqual(cor[('SEX', 'Y')]['r'], r)
+        self.assertAlmostEqual(cor[('SEX', 'Y')]['p'], p)
+
+    def test4b(self):
+        """a dichotomous y is correlated with its values (not recoded)"""
+        A = ['m','f','m','f','m','f','m','m']
+        B = [5,3,3,5,5,3,3,3]
+        C = [2.,4.,1.,8.,5.,7.,3.,6.]
+        cor = Correlation()
+        cor.run([A, B, C], coefficient='pointbiserial')
+
+        for x, y in [('A', 'B'), ('A', 'C'), ('B', 'C')]:
+            L = dict(A=A, B=B, C=C)
+            r, p = pointbiserialr(L[x], L[y])
+            self.assertAlmostEqual(cor[(x, y)]['r'], r)
+            self.assertAlmostEqual(cor[(x, y)]['p'], p)
+
+        self.assertAlmostEqual(cor[('A', 'B')]['r'], -1./15.)
+
+    def test5(self):
+        """tau-b with ties matches the pairwise count"""
+        rs = np.random.RandomState(2)
+        x = rs.randint(0, 5, 60)
+        y = x + rs.randint(0, 4, 60)
+        z = rs.randn(60)
+
+        cor = Correlation()
+        cor.run([list(x), list(y), list(z)], coefficient='kendalltau')
+        
+        for (a, b), d in cor.items():
+            L = dict(A=list(x), B=list(y), C=list(z))
+            tau, p = lkendalltau(L[a], L[b])
+            self.assertAlmostEqual(d['r'], tau)
+            self.assertAlmostEqual(d['p'], p)
+
+        # tau-b of x and y
+        self.assertAlmostEqual(cor[('A','B')]['r'], 0.6402523429572259)
+
+    def test6(self):
+        rs = np.random.RandomState(3)
+        x = rs.randn(20000)
+        y = x + rs.randn(20000)
+        
+        tau, p = akendalltau(x, y)
+        self.assertAlmostEqual(tau, 0.5008137906895345)
+        self.assertAlmostEqual(akendalltau(x, -y)[0], -tau)
+        self.assertAlmostEqual(akendalltau(x, x)[0], 1.)
+
+    def test7(self):
+        """tau-b is undefined (nan) when x or y is constant"""
+        x = np.array([1., 2., 3., 4.])
+        c = np.ones(4)
+        for a, b in [(x, c), (c, x), (c, c)]:
+            tau, p = akendalltau(a, b)
+            self.assertTrue(np.isnan(tau))
+            self.assertTrue(np.isnan(p))
             
 def suite():
     return unittest.TestSuite((
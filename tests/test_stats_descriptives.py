@@ -16,8 +16,10 @@ import unittest
 import warnings
 import os
 
+import numpy as np
+
 from pyvttbl import DataFrame
-from pyvttbl.stats import Descriptives
+from pyvttbl.stats import Descriptives, GroupedDescriptives
 from pyvttbl.misc.support import *
 
 class Test_descriptives(unittest.TestCase):
@@ -150,6 +152,70 @@ Descriptive Statistics
  95ci_upper    4.577 """
         self.assertEqual(D, R)
 
+    def test2(self):
+        """order statistics and mode"""
+        D = Descriptives()
+        D.run([5, 1, 4, 2, 3, 4, 2])
+
+        self.assertEqual(D['min'], 1.)
+        self.assertEqual(D['Q1'], 2.)
+        self.assertEqual(D['median'], 3.)
+        self.assertEqual(D['Q3'], 4.)
+        self.assertEqual(D['max'], 5.)
+        self.assertEqual(D['mode'], 2.) # smallest of the most common
+
+        D.run(np.ma.array([1., 2., 3., 100.], mask=[0, 0, 0, 1]))
+        self.assertEqual(D['count'], 3.)
+        self.assertEqual(D['max'], 3.)
+        
+    def test3(self):
+        """grouped descriptives agree with descriptives of each group"""
+        df = DataFrame()
+        df.read_tbl('data/words~ageXcondition.csv')
+
+        G = df.descriptives('WORDS', by=['AGE', 'CONDITION'])
+        self.assertEqual(len(G), 10)
+        self.assertEqual(G.keys()[0], ('old', 'adjective'))
+        
+        for (age, condition), D in G.items():
+            R = df.descriptives('WORDS', where=[('AGE', '=', age),
+                                                ('CONDITION', '=', condition)])
+            for k in R.keys():
+                self.assertAlmostEqual(D[k], R[k], 10)
+
+        G = df.descriptives('WORDS', by='AGE',
+                            where=[('CONDITION', '!=', 'adjective')])
+        R = df.descriptives('WORDS', where=[('AGE', '=', 'young'),
+                                            ('CONDITION', '!=', 'adjective')])
+        self.assertEqual(G.keys(), [('old',), ('young',)])
+        self.assertEqual(G[('young',)].items(), R.items())
+        self.assertEqual(eval(repr(G)).keys(), G.keys())
+
+    def test4(self):
+        """integer levels are kept with and without where"""
+        df = DataFrame()
+        df['A'] = [0, 0, 1, 1, 2, 2]
+        df['Y'] = [1, 2, 3, 4, 5, 6]
+        df.__setitem__('B', [0, 1, 0, 1, 0, 1], mask=[0, 0, 0, 0, 0, 1])
+
+        G = df.descriptives('Y', by=['A'])
+        W = df.descriptives('Y', by=['A'], where='Y > 0')
+        self.assertEqual(G.keys(), [(0,), (1,), (2,)])
+        self.assertEqual(W.keys(), G.keys())
+        self.assertEqual(str(W), str(G))
+
+        # observations with a missing level are dropped
+        G = df.descriptives('Y', by=['B'])
+        W = df.descriptives('Y', by=['B'], where='Y > 0')
+        self.assertEqual(G.keys(), [(0,), (1,)])
+        self.assertEqual(G[(1,)]['count'], 2)
+        self.assertEqual(str(W), str(G))
+
+        H = df.histogram('Y', by=['B'], bins=2)
+        self.assertEqual(H.keys(), [(0,), (1,)])
+        self.assertEqual(str(df.histogram('Y', by=['B'], bins=2,
+                                          where='Y > 0')), str(H))
+
 def suite():
     return unittest.TestSuite((
             unittest.makeSuite(Test_descriptives),
@@ -0,0 +1,104 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+
+import numpy as np
+
+from pyvttbl.stats import _stats
+from pyvttbl.stats import Ttest
+
+class Test_dispatch(unittest.TestCase):
+    def setUp(self):
+        self.A = [3., 4., 7., 5., 8., 6., 2., 9., 4., 5.]
+        self.B = [4., 6., 7., 9., 8., 7., 5., 9., 6., 8.]
+
+    def test0(self):
+        """array and list descriptives agree"""
+        A = np.array(self.A)
+        for name in ['mean', 'var', 'stdev', 'sem', 'ss', 'median']:
+            func = getattr(_stats, name)
+            self.assertAlmostEqual(func(self.A), func(A), 12)
+
+        self.assertEqual(_stats.rankdata(self.A),
+                         list(_stats.rankdata(A)))
+
+    def test1(self):
+        """array and list t-tests return the same tuples"""
+        A, B = np.array(self.A), np.array(self.B)
+        pairs = [(_stats.lttest_1samp(self.A, 5.),
+                  _stats.ttest_1samp(A, 5.)),
+                 (_stats.lttest_ind(self.A, self.B),
+                  _stats.ttest_ind(A, B)),
+                 (_stats.lttest_ind_uneq(self.A, self.B),
+                  _stats.ttest_ind_uneq(A, B)),
+                 (_stats.lttest_rel(self.A, self.B),
+                  _stats.ttest_rel(A, B)),
+                 (_stats.lpearsonr(self.A, self.B),
+                  _stats.pearsonr(A, B))]
+
+        for L, R in pairs:
+            self.assertEqual(len(L), len(R))
+            for l, r in zip(L, R):
+                self.assertAlmostEqual(l, r, 5)
+
+    def test2(self):
+        """subclasses of ndarray are dispatched"""
+        A = np.ma.masked_invalid(self.A + [np.nan])
+        self.assertAlmostEqual(_stats.mean(A), _stats.mean(self.A), 12)
+
+        t, p, n, df, x, v = _stats.ttest_1samp(A, 5.)
+        self.assertEqual(n, 10)
+        self.assertAlmostEqual(t, _stats.lttest_1samp(self.A, 5.)[0], 12)
+
+        self.assertRaises(TypeError, _stats.mean, 'abc')
+
+    def test3(self):
+        """masked pairs are dropped"""
+        A = np.ma.masked_invalid(self.A + [np.nan, 1.])
+        B = np.ma.masked_invalid(self.B + [2., np.nan])
+
+        t, p, n, df, x1, x2, v1, v2 = _stats.ttest_rel(A, B)
+        L = _stats.lttest_rel(self.A, self.B)
+        self.assertEqual(n, 10)
+        self.assertAlmostEqual(t, L[0], 12)
+        self.assertAlmostEqual(p, L[1], 6)
+
+        r, p = _stats.pearsonr(A, B)
+        self.assertAlmostEqual(r, _stats.lpearsonr(self.A, self.B)[0], 12)
+
+    def test4(self):
+        """Ttest gives the same results for arrays and lists"""
+        for kwds in [dict(), dict(paired=True)]:
+            L, R = Ttest(), Ttest()
+            L.run(self.A, self.B, **kwds)
+            R.run(np.array(self.A), np.array(self.B), **kwds)
+            self.assertEqual(str(L), str(R))
+
+        L, R = Ttest(), Ttest()
+        L.run(self.A, pop_mean=5.)
+        R.run(np.array(self.A), pop_mean=5.)
+        self.assertEqual(str(L), str(R))
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_dispatch)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -19,6 +19,7 @@ import os
 import numpy as np
 
 from pyvttbl import DataFrame
+from pyvttbl.stats import Histogram, GroupedHistogram
 ##from pyvttbl.plotting import box_plot
 from pyvttbl.misc.support import *
         
@@ -64,6 +65,49 @@ Cumulative Histogram for WORDS
 ('bin_edges', [3, 5.0, 7.0, 9.0, 11.0, 13.0, 15.0, 17.0, 19.0, 21.0, 23])], cname='WORDS')"
         self.assertEqual(D, R)
         
+    def test03(self):
+        """agrees with numpy.histogram (with weights)"""
+        rs = np.random.RandomState(2)
+        V = rs.normal(size=1000)
+        W = rs.uniform(size=1000)
+
+        h = Histogram()
+        h.run(V, bins=7, weights=W)
+        R, edges = np.histogram(V, bins=7, weights=W)
+        np.testing.assert_array_almost_equal(h['values'], R)
+        np.testing.assert_array_almost_equal(h['bin_edges'], edges)
+
+        h.run(V, bins=7, range=(-1, 1), density=True)
+        R, edges = np.histogram(V, bins=7, range=(-1, 1), density=True)
+        np.testing.assert_array_almost_equal(h['values'], R)
+
+        # masked and nan values are ignored
+        M = np.ma.array(np.concatenate((V, [np.nan, 100.])),
+                        mask=[0]*1001 + [1])
+        h.run(M, bins=7)
+        R, edges = np.histogram(V, bins=7)
+        np.testing.assert_array_almost_equal(h['values'], R)
+
+    def test04(self):
+        df=DataFrame()
+        df.read_tbl('data/words~ageXcondition.csv')
+        G = df.histogram('WORDS', by=['AGE'], bins=5)
+        self.assertEqual(G.keys(), [('old',), ('young',)])
+
+        for age in ['old', 'young']:
+            R = np.histogram(df.select_col('WORDS', where=[('AGE','=',age)]),
+                             bins=5, range=(3, 23))[0]
+            np.testing.assert_array_almost_equal(G[(age,)]['values'], R)
+            self.assertEqual(G[(age,)]['bin_edges'],
+                             [3, 7.0, 11.0, 15.0, 19.0, 23])
+
+        G = df.histogram('WORDS', by=['AGE', 'CONDITION'],
+                         cumulative=True, density=True)
+        self.assertEqual(len(G), 10)
+        for h in G.values():
+            self.assertAlmostEqual(h['values'][-1], 1.)
+        self.assertEqual(eval(repr(G)).keys(), G.keys())
+
 def suite():
     return unittest.TestSuite((
             unittest.makeSuite(Test_histogram)
@@ -7,6 +7,7 @@ import unittest
 import warnings
 import os
 import math
+import time
 from random import shuffle, random
 from collections import Counter,OrderedDict
 from dictset import DictSet,_rep_generator
@@ -59,8 +60,8 @@ SNK: Step-down table of q-statistics
 Contact vs. Smash      1   16.000   5.657       5   45   0.002   **   
 Collide vs. Contact    2   11.000   3.889       4   45   0.041   *    
 Hit vs. Smash          3   11.000   3.889       4   45   0.041   *    
-Bump vs. Smash         4    8.000   2.828       3   45   0.124   ns   
-Bump vs. Contact       5    8.000   2.828       3   45   0.124   ns   
+Bump vs. Contact       4    8.000   2.828       3   45   0.124   ns   
+Bump vs. Smash         5    8.000   2.828       3   45   0.124   ns   
 Collide vs. Hit        6    6.000   2.121       2   45   0.141   ns   
 Collide vs. Smash      7    5.000       -       -    -       -   ns   
 Contact vs. Hit        8    5.000       -       -    -       -   ns   
@@ -139,6 +140,58 @@ Smash                                             0
         
         self.assertEqual(str(D),R)
             
+    def test33(self):
+        listOflists=[[21,20,26,46,35,13,41,30,42,26],
+                     [23,30,34,51,20,38,34,44,41,35],
+                     [35,35,52,29,54,32,30,42,50,21],
+                     [44,40,33,45,45,30,46,34,49,44],
+                     [39,44,51,47,50,45,39,51,39,55]]
+
+        conditions_list = ['Contact','Hit','Bump','Collide','Smash']
+
+        D=Anova1way()
+        D.run(listOflists, conditions_list=conditions_list, posthoc='tukey')
+
+        self.assertEqual(len(D.multtest), 15)
+        self.assertTrue(D.multtest.has_key(('Contact','Smash')))
+        self.assertFalse(D.multtest.has_key(('Smash','Contact')))
+        self.assertEqual(sorted(D.multtest.keys())[:2],
+                         [('Bump','Bump'), ('Bump','Collide')])
+
+        r = D.multtest[('Contact','Smash')]
+        self.assertAlmostEqual(r['abs_diff'], 16.)
+        self.assertAlmostEqual(r['q'], 16./math.sqrt(80./10.))
+        self.assertAlmostEqual(r['p'], psturng(r['q'], 5, 45))
+        self.assertEqual(r['sig'], '**')
+        self.assertEqual(r['q_k'], 5)
+        self.assertEqual(r['q_df'], 45)
+        self.assertEqual(D.multtest[('Hit','Hit')]['q'], 0.)
+
+        self.assertRaises(KeyError, lambda : D.multtest[('Smash','Hit')])
+
+    def test34(self):
+        """large k post-hoc tests stay vectorized"""
+        rs = np.random.RandomState(0)
+        listOflists = [list(rs.normal(i/100., 1., 10)) for i in range(300)]
+
+        # the p-values are found with one psturng call when requested
+        t0 = time.time()
+        D=Anova1way()
+        D.run(listOflists, posthoc='tukey')
+        self.assertTrue(D.multtest._p is None)
+        
+        r = D.multtest[(D.multtest.names[0], D.multtest.names[-1])]
+        self.assertEqual(D.multtest.p.shape, (300, 300))
+        self.assertAlmostEqual(r['p'], psturng(r['q'], 300, 2700), 10)
+
+        D=Anova1way()
+        D.run(listOflists, posthoc='snk')
+        self.assertEqual(len(D.multtest), 300*299//2)
+
+        # about 1 s (about 40 s when the p-values were found one at
+        # a time)
+        self.assertTrue(time.time() - t0 < 15.)
+        
 def suite():
     return unittest.TestSuite((
             unittest.makeSuite(Test_posthoc)
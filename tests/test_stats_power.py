@@ -0,0 +1,122 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+import unittest
+import warnings
+import os
+import math
+import numpy as np
+
+from pyvttbl.stats import *
+from pyvttbl.stats._anova import observed_power
+from pyvttbl.stats._power import _design_df
+from pyvttbl.misc.support import *
+
+class Test_anova_power(unittest.TestCase):
+    def test0(self):
+        """one-way between subjects design (G*Power)"""
+        pw = AnovaPower()
+        pw.run({'GROUP' : 3}, {'GROUP' : [.25, .4]}, [10, 20, 30],
+               bfactors=['GROUP'])
+
+        r = pw[('GROUP',)]
+        self.assertEqual(r['df'], 2.)
+        self.assertEqual(r['dfe'].tolist(), [27., 57., 87.])
+        self.assertAlmostEqual(r['lambda'][1,1], 9.6)
+        self.assertEqual(r['power'].shape, (2, 3))
+
+        for k, f in enumerate([.25, .4]):
+            for j, n in enumerate([10, 20, 30]):
+                self.assertAlmostEqual(r['power'][k,j],
+                    observed_power(2., 3.*n-3., f**2*3.*n))
+
+        self.assertAlmostEqual(r['power'][1,2], 0.926, 3)
+
+    def test1(self):
+        """degrees of freedom and non-centrality of a mixed design"""
+        pw = AnovaPower()
+        pw.run({'CYCLE' : 4, 'PHASE' : 2, 'GROUP' : ['AA', 'AB', 'LAB']},
+               {'CYCLE' : .3, ('GROUP', 'CYCLE') : .2}, 8,
+               wfactors=['CYCLE', 'PHASE'], bfactors=['GROUP'])
+
+        self.assertEqual(pw.keys(),
+                         [('CYCLE',), ('PHASE',), ('GROUP',),
+                          ('CYCLE', 'PHASE'), ('CYCLE', 'GROUP'),
+                          ('PHASE', 'GROUP'), ('CYCLE', 'PHASE', 'GROUP')])
+
+        # 24 subjects in 3 groups, 8 observations each
+        self.assertEqual(pw[('GROUP',)]['dfe'].tolist(), [21.])
+        self.assertEqual(pw[('CYCLE',)]['dfe'].tolist(), [63.])
+        self.assertEqual(pw[('CYCLE', 'GROUP')]['df'], 6.)
+        self.assertEqual(pw[('CYCLE', 'PHASE', 'GROUP')]['dfe'].tolist(),
+                         [63.])
+        self.assertAlmostEqual(pw[('CYCLE',)]['lambda'][0,0], .09*192)
+        self.assertAlmostEqual(pw[('CYCLE', 'GROUP')]['lambda'][0,0],
+                               .04*192)
+
+        # effects without a size have power = alpha
+        self.assertAlmostEqual(pw[('PHASE',)]['power'][0,0], .05)
+
+    def test2(self):
+        """sample sizes are found on the grid"""
+        pw = AnovaPower()
+        pw.run({'GROUP' : 3}, {'GROUP' : [.25, .4]}, range(5, 41),
+               bfactors=['GROUP'])
+        
+        n = pw.sample_size(.8)[('GROUP',)]
+        self.assertTrue(math.isnan(n[0]))
+        self.assertEqual(n[1], 22.)
+
+    def test3(self):
+        """simulated designs match the pivot of the DataFrame"""
+        df, valid = _design_df(4, ['CYCLE'], ['GROUP'], [3, 2])
+        rs = np.random.RandomState(0)
+        X = np.empty(valid.shape)
+        X.fill(np.nan)
+        X[valid] = rs.randn(np.sum(valid))
+        df['Y'] = X[valid]
+
+        aov = df.anova('Y', wfactors=['CYCLE'], bfactors=['GROUP'])
+        pt = np.array(aov.pt, dtype=np.float64)
+        self.assertEqual(pt.shape, (8, 6))
+        self.assertTrue(np.all(np.isnan(pt) == ~valid))
+        self.assertTrue(np.all(pt[valid] == X[valid]))
+        
+    def test4(self):
+        """the simulations validate the analytic power"""
+        pw = AnovaPower()
+        pw.run({'CYCLE' : 3, 'GROUP' : 2},
+               {'CYCLE' : .5, 'GROUP' : .4, ('CYCLE', 'GROUP') : .3}, 6,
+               wfactors=['CYCLE'], bfactors=['GROUP'],
+               simulations=500, seed=3)
+
+        pw2 = AnovaPower()
+        pw2.run({'CYCLE' : 3, 'GROUP' : 2},
+                {'CYCLE' : .5, 'GROUP' : .4, ('CYCLE', 'GROUP') : .3}, 6,
+                wfactors=['CYCLE'], bfactors=['GROUP'],
+                simulations=500, seed=3, n_jobs=2)
+
+        for efs, r in pw.items():
+            # about 3 standard errors
+            self.assertTrue(abs(r['power_sim'][0,0] -
+                                r['power'][0,0]) < .065)
+            self.assertEqual(r['power_sim'][0,0],
+                             pw2[efs]['power_sim'][0,0])
+
+    def test5(self):
+        pw = AnovaPower()
+        self.assertRaises(KeyError, pw.run, {'GROUP' : 3},
+                          {'AGE' : .25}, 10, bfactors=['GROUP'])
+        self.assertEqual(str(pw), '(no data in object)')
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_anova_power)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
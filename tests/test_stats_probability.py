@@ -0,0 +1,106 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+
+import numpy as np
+import scipy.special
+import scipy.stats
+
+from pyvttbl.stats import _stats
+
+class Test_probability(unittest.TestCase):
+    def setUp(self):
+        rs = np.random.RandomState(1)
+        self.x = rs.uniform(0., 1., 1000)
+        self.a = rs.uniform(.5, 50., 1000)
+        self.b = rs.uniform(.5, 50., 1000)
+        self.chisq = rs.uniform(0., 60., 1000)
+        self.df = rs.randint(1, 30, 1000)
+        
+    def test0(self):
+        """betai against scipy.special.betainc"""
+        D = scipy.special.betainc(self.a, self.b, self.x)
+        R = _stats.betai(self.a, self.b, self.x)
+        np.testing.assert_allclose(R, D, rtol=1e-12, atol=1e-15)
+
+        # the scalar (continued fraction) version agrees
+        for a, b, x, d in zip(self.a[:50], self.b[:50], self.x[:50], D):
+            self.assertAlmostEqual(_stats.betai(a, b, x), d, 6)
+
+    def test1(self):
+        """chisqprob, fprob and zprob against scipy.stats"""
+        D = scipy.stats.chi2.sf(self.chisq, self.df)
+        R = _stats.chisqprob(self.chisq, self.df)
+        np.testing.assert_allclose(R, D, rtol=1e-10, atol=1e-15)
+
+        F = self.chisq / 10.
+        D = scipy.stats.f.sf(F, self.df, self.df + 10)
+        R = _stats.fprob(self.df, self.df + 10, F)
+        np.testing.assert_allclose(R, D, rtol=1e-10, atol=1e-15)
+
+        z = self.chisq / 10. - 3.
+        np.testing.assert_allclose(_stats.zprob(z),
+                                   scipy.stats.norm.cdf(z), rtol=1e-12)
+        np.testing.assert_allclose(_stats.erfcc(z),
+                                   scipy.special.erfc(z), rtol=1e-12)
+
+        for c, df in zip(self.chisq[:50], self.df[:50]):
+            self.assertAlmostEqual(_stats.chisqprob(c, int(df)),
+                                   scipy.stats.chi2.sf(c, df), 6)
+
+    def test2(self):
+        """gammln against scipy.special.gammaln"""
+        np.testing.assert_allclose(_stats.gammln(self.a),
+                                   scipy.special.gammaln(self.a),
+                                   rtol=1e-12)
+
+        for a in self.a[:50]:
+            self.assertAlmostEqual(_stats.gammln(a),
+                                   scipy.special.gammaln(a), 8)
+
+    def test3(self):
+        """arguments are broadcast"""
+        chisq = self.chisq[:12].reshape(3, 4)
+        R = _stats.chisqprob(chisq, [1, 2, 3, 4])
+        self.assertEqual(R.shape, (3, 4))
+        self.assertAlmostEqual(R[2, 3], _stats.chisqprob(chisq[2, 3], 4), 6)
+
+        R = _stats.betai(2., 3., self.x[:5])
+        self.assertEqual(R.shape, (5,))
+
+        R = _stats.betai([[1.], [2.]], 3., self.x[:5])
+        self.assertEqual(R.shape, (2, 5))
+
+        self.assertEqual(_stats.fprob(2, [10, 20], 3.).shape, (2,))
+        self.assertTrue(isinstance(_stats.betai(2., 3., .5), float))
+
+    def test4(self):
+        """edge cases"""
+        self.assertEqual(_stats.chisqprob([-1., 0.], 3).tolist(), [1., 1.])
+        self.assertEqual(_stats.chisqprob([5., 10.], 0).tolist(), [1., 1.])
+        self.assertEqual(_stats.betai(2., 3., [0., 1.]).tolist(), [0., 1.])
+        self.assertRaises(ValueError, _stats.betai, 2., 3., [.5, 1.5])
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_probability)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
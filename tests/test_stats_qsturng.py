@@ -0,0 +1,126 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import itertools
+
+import numpy as np
+
+from pyvttbl.stats import qsturng
+
+_qsturng_mod = sys.modules['pyvttbl.stats.qsturng']
+
+class Test_qsturng(unittest.TestCase):
+    def test0(self):
+        """array results match the scalar implementation"""
+        ps = [.1, .3, .5, .6, .675, .8, .87, .9, .93, .95,
+              .975, .98, .99, .995, .997, .999]
+        rs = [2, 3, 4, 7.5, 20, 100]
+        vs = [1, 1.5, 2, 2.3, 3, 3.4, 5, 7.7, 19, 19.6,
+              22, 24, 45, 120, 500, np.inf]
+
+        P, R, V = [], [], []
+        for p, r, v in itertools.product(ps, rs, vs):
+            if p < .9 and v < 2:
+                continue
+            P.append(p)
+            R.append(r)
+            V.append(v)
+
+        D = qsturng(P, R, V)
+        
+        for p, r, v, d in zip(P, R, V, D):
+            self.assertAlmostEqual(_qsturng_mod._qsturng(p, r, v), d, 10)
+
+    def test1(self):
+        """arguments are broadcast"""
+        D = qsturng([.9, .95, .99], 3, [[10], [20]])
+
+        self.assertEqual(D.shape, (2, 3))
+        self.assertAlmostEqual(D[0,1], 3.8742391362900381, 10)
+        self.assertAlmostEqual(D[1,2], qsturng(.99, 3, 20), 10)
+
+    def test2(self):
+        """scalar results are cached"""
+        _qsturng_mod._cache.clear()
+        q = qsturng(.95, 5, 12)
+        
+        self.assertEqual(list(_qsturng_mod._cache.keys()), [(.95, 5., 12.)])
+        self.assertEqual(qsturng(.95, 5, 12), q)
+        self.assertEqual(len(_qsturng_mod._cache), 1)
+
+    def test3(self):
+        """the least recently used results are dropped"""
+        _qsturng_mod._cache.clear()
+        cachesize = _qsturng_mod.CACHESIZE
+        _qsturng_mod.CACHESIZE = 2
+        try:
+            qsturng(.95, 3, 10)
+            qsturng(.95, 4, 10)
+            qsturng(.95, 3, 10)
+            qsturng(.95, 5, 10)
+        finally:
+            _qsturng_mod.CACHESIZE = cachesize
+
+        self.assertEqual(list(_qsturng_mod._cache.keys()),
+                         [(.95, 3., 10.), (.95, 5., 10.)])
+
+    def test4(self):
+        """out of range array values raise ValueError"""
+        self.assertRaises(ValueError, qsturng, [.95, .05], 3, 10)
+        self.assertRaises(ValueError, qsturng, [.5, .95], 3, [1.5, 10])
+
+    def test5(self):
+        """array psturng matches the scalar implementation"""
+        psturng = _qsturng_mod.psturng
+        Q = [0., .5, 1., 2., 3., 3.5, 4., 5., 6., 8., 20.]
+        R = [2, 3, 5, 20, 300]
+        V = [2, 3, 12, 45, 500, np.inf]
+
+        for r, v in itertools.product(R, V):
+            D = psturng(Q, r, v)
+            for q, d in zip(Q, D):
+                self.assertAlmostEqual(psturng(q, r, v), d, 10)
+
+        # distinct r and v for every element
+        D = psturng([3., 4., 5.], [3, 5, 20], [10, 45, np.inf])
+        self.assertAlmostEqual(D[1], psturng(4., 5, 45), 10)
+
+    def test6(self):
+        """p values are bound and are the inverse of qsturng"""
+        psturng = _qsturng_mod.psturng
+        D = psturng([0., 100., qsturng(.95, 5, 20)], 5, 20)
+
+        self.assertEqual(list(D[:2]), [.9, .001])
+        self.assertAlmostEqual(D[2], .05, 10)
+        self.assertAlmostEqual(psturng([qsturng(.99, 3, 1)], 3, 1)[0], .01, 10)
+
+    def test7(self):
+        """scalar psturng evaluates the quantiles through the cache"""
+        _qsturng_mod._cache.clear()
+        _qsturng_mod.psturng(3.5, 4, 20)
+
+        self.assertTrue((.1, 4., 20.) in _qsturng_mod._cache)
+        self.assertTrue((.999, 4., 20.) in _qsturng_mod._cache)
+        self.assertTrue(len(_qsturng_mod._cache) > 2)
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_qsturng)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,96 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import pickle
+
+import numpy as np
+
+from pyvttbl.stats import Descriptives, StreamingDescriptives
+
+class Test_streaming_descriptives(unittest.TestCase):
+    def test0(self):
+        """small data sets are summarized exactly"""
+        rs = np.random.RandomState(1)
+        V = rs.randint(0, 20, 150).astype(np.float64)
+
+        S = StreamingDescriptives(seed=2)
+        for chunk in np.array_split(V, 7):
+            S.update(chunk)
+        D = S.descriptives('x')
+
+        R = Descriptives()
+        R.run(V, 'x')
+
+        self.assertEqual(D.keys(), R.keys())
+        self.assertEqual(D.cname, 'x')
+        for k in R.keys():
+            self.assertAlmostEqual(D[k], R[k], 10)
+
+    def test1(self):
+        """merging shards matches a single pass"""
+        rs = np.random.RandomState(3)
+        V = rs.normal(10., 2., 20000)
+
+        shards = []
+        for i, chunk in enumerate(np.array_split(V, 4)):
+            S = StreamingDescriptives(seed=i)
+            for part in np.array_split(chunk, 5):
+                S.update(part)
+            shards.append(pickle.loads(pickle.dumps(S)))
+
+        S = shards[0]
+        for other in shards[1:]:
+            S.merge(other)
+        D = S.descriptives()
+
+        R = Descriptives()
+        R.run(V)
+
+        for k in ['count', 'mean', 'var', 'stdev', 'sem', 'rms',
+                  'min', 'max', 'range', '95ci_lower', '95ci_upper']:
+            self.assertAlmostEqual(D[k], R[k], 8)
+
+        # the quartiles are approximate (rank error of a few percent)
+        for k, q in [('Q1', .25), ('median', .5), ('Q3', .75)]:
+            rank = np.mean(V <= D[k])
+            self.assertAlmostEqual(rank, q, delta=.03)
+
+        # too many distinct values to track the mode
+        self.assertTrue(np.isnan(D['mode']))
+
+    def test2(self):
+        """masked and nan values are ignored"""
+        V = np.ma.array([1., 2., np.nan, 4., 100.],
+                        mask=[0, 0, 0, 0, 1])
+        S = StreamingDescriptives()
+        S.update(V)
+        S.update([])
+        self.assertEqual(S.count, 3)
+        self.assertAlmostEqual(S.descriptives()['mean'], 7./3.)
+
+    def test3(self):
+        S = StreamingDescriptives()
+        self.assertEqual(str(S), '(no data in object)')
+        self.assertRaises(Exception, S.descriptives)
+
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_streaming_descriptives),
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,141 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _strobj = basestring
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _strobj = str
+    _xrange = range
+    
+import unittest
+import warnings
+import os
+
+import numpy as np
+from numpy import array
+
+from pyvttbl import DataFrame
+from pyvttbl.stats import Ttest, TtestMany
+from pyvttbl.stats._ttest_many import holm, fdr
+
+class Test_ttest_many(unittest.TestCase):
+    def setUp(self):
+        self.df = DataFrame()
+        self.df.read_tbl('data/example2_prepost.csv')
+
+        self.keys = ['t', 'p2tail', 'df', 'mu1', 'mu2', 'var1', 'var2']
+
+    def assertAgrees(self, D, i, T, keys):
+        for k in keys:
+            self.assertAlmostEqual(D[k][i], T[k], 8)
+        
+    def test0(self):
+        """pairs of columns agree with Ttest"""
+        for paired in [False, True]:
+            D = self.df.ttest_many([('PRE', 'POST'), ('POST', 'PRE')],
+                                   paired=paired)
+            T = self.df.ttest('PRE', 'POST', paired=paired)
+
+            self.assertEqual(D.comparisons,
+                             [('PRE', 'POST'), ('POST', 'PRE')])
+            self.assertAgrees(D, 0, T, self.keys + ['cohen_d'])
+            self.assertAlmostEqual(D['t'][1], -T['t'], 8)
+
+        T = self.df.ttest('PRE', 'POST', paired=True)
+        self.assertAlmostEqual(D['r'][0], T['r'], 8)
+            
+    def test1(self):
+        """groups of by agree with Ttest"""
+        for equal_variance in [True, False]:
+            D = self.df.ttest_many(['PRE', 'POST'], by='CONDITION',
+                                   equal_variance=equal_variance)
+
+            levels = sorted(set(self.df['CONDITION']))
+            k = len(levels)*(len(levels) - 1)//2
+            self.assertEqual(len(D['t']), 2*k)
+            self.assertEqual(D.comparisons[0], ('PRE', levels[0], levels[1]))
+
+            for i, (c, a, b) in enumerate(D.comparisons):
+                T = self.df.ttest(c, c, equal_variance=equal_variance)
+                T.run(self.df.select_col(c, where=[('CONDITION', '=', a)]),
+                      self.df.select_col(c, where=[('CONDITION', '=', b)]),
+                      equal_variance=equal_variance)
+                self.assertAgrees(D, i, T, self.keys)
+
+    def test2(self):
+        """one-sample tests and where"""
+        where = [('TIME', '=', 'day')]
+        D = self.df.ttest_many(['PRE', 'POST'], pop_mean=90., where=where)
+
+        for i, c in enumerate(['PRE', 'POST']):
+            T = self.df.ttest(c, pop_mean=90., where=where)
+            self.assertAgrees(D, i, T, ['t', 'p2tail', 'df', 'mu', 'var',
+                                        'cohen_d', 'power2tail'])
+
+    def test3(self):
+        """masked and nan values are dropped"""
+        A = [np.ma.array([1., 2., 3., 40.], mask=[0, 0, 0, 1]),
+             [1., 2., np.nan, 5.]]
+        B = [[2., 2., 5., 1.], [3., 1., 4., 2.]]
+        
+        D = TtestMany()
+        D.run(A, B, paired=True)
+        self.assertEqual(D['n1'].tolist(), [3., 3.])
+
+        T = Ttest()
+        T.run([1., 2., 3.], [2., 2., 5.], paired=True)
+        self.assertAlmostEqual(D['t'][0], T['t'], 8)
+
+        T.run([1., 2., 5.], [3., 1., 2.], paired=True)
+        self.assertAlmostEqual(D['t'][1], T['t'], 8)
+
+    def test4(self):
+        """multiple comparison corrections"""
+        p = np.array([.01, .04, .03, np.nan, .005])
+
+        np.testing.assert_allclose(holm(p)[[0, 1, 2, 4]],
+                                   [.03, .06, .06, .02])
+        np.testing.assert_allclose(fdr(p)[[0, 1, 2, 4]],
+                                   [.02, .04, .04, .02])
+        self.assertTrue(np.isnan(holm(p)[3]))
+
+        D = self.df.ttest_many(['PRE', 'POST'], by='CONDITION',
+                               correction='holm')
+        np.testing.assert_allclose(D['p_adj'], holm(D['p2tail']))
+        self.assertTrue('P adj.' in str(D))
+
+        self.assertRaises(ValueError, self.df.ttest_many,
+                          ['PRE'], correction='bonferroni')
+
+    def test5(self):
+        """many tests"""
+        rs = np.random.RandomState(3)
+        A = [rs.randn(rs.randint(5, 20)) for i in _xrange(500)]
+        B = [rs.randn(rs.randint(5, 20)) + .5 for i in _xrange(500)]
+
+        D = TtestMany()
+        D.run(A, B, equal_variance=False)
+
+        for i in [0, 250, 499]:
+            T = Ttest()
+            T.run(A[i], B[i], equal_variance=False)
+            self.assertAlmostEqual(D['t'][i], T['t'], 8)
+            self.assertAlmostEqual(D['df'][i], T['df'], 8)
+            self.assertAlmostEqual(D['p2tail'][i], T['p2tail'], 6)
+
+        self.assertEqual(eval(repr(D)).comparisons, D.comparisons)
+        
+def suite():
+    return unittest.TestSuite((
+            unittest.makeSuite(Test_ttest_many)
+                              ))
+
+if __name__ == "__main__":
+    # run tests
+    runner = unittest.TextTestRunner()
+    runner.run(suite())
@@ -0,0 +1,78 @@
+from __future__ import print_function
+
+# Copyright (c) 2011, Roger Lew [see LICENSE.txt]
+# This software is funded in part by NIH Grant P20 RR016454.
+
+"""
+Times Kendall's tau-b for 10**3 to 10**6 pairs.
+
+Usage: python bench_kendalltau.py [max_exponent]
+
+akendalltau (O(n log n)) is timed for every size. lkendalltau (O(n**2))
+is timed up to 2,000 pairs, and scipy.stats.kendalltau is timed as a
+reference when scipy is available.
+"""
+
+# Python 2 to 3 workarounds
+import sys
+if sys.version_info[0] == 2:
+    _xrange = xrange
+elif sys.version_info[0] == 3:
+    _xrange = range
+
+import time
+
+import numpy as np
+
+from pyvttbl.stats._stats import akendalltau, lkendalltau
+
+try:
+    import scipy.stats
+except ImportError:
+    scipy = None
+
+def _timeit(func, *args):
+    """
+    Returns the result of func(*args) and the seconds it took.
+    """
+    t0 = time.time()
+    result = func(*args)
+    return result, time.time() - t0
+
+def main(max_exponent=6):
+    rs = np.random.RandomState(0)
+
+    print('%10s %12s %12s %12s'%('n', 'akendalltau', 'lkendalltau', 'scipy'))
+    for e in _xrange(3, max_exponent + 1):
+        for n in [10**e, 2*10**e, 5*10**e]:
+            if n > 10**max_exponent:
+                break
+
+            # integer data so that there are ties in x and y
+            x = rs.randint(0, n//10 + 2, n)
+            y = x + rs.randint(0, n//10 + 2, n)
+
+            (tau, p), t = _timeit(akendalltau, x, y)
+            row = ['%10i'%n, '%12.3f'%t]
+
+            if n <= 2000:
+                (ltau, lp), t = _timeit(lkendalltau, list(x), list(y))
+                assert abs(tau - ltau) < 1e-10
+                row.append('%12.3f'%t)
+            else:
+                row.append('%12s'%'-')
+
+            if scipy is not None:
+                (stau, sp), t = _timeit(scipy.stats.kendalltau, x, y)
+                assert abs(tau - stau) < 1e-10
+                row.append('%12.3f'%t)
+            else:
+                row.append('%12s'%'-')
+
+            print(' '.join(row))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()